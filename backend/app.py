@@ -18,11 +18,52 @@ app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-change-in
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///cyberlab.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+app.config['ACTIVITY_TIMEZONE'] = os.getenv('ACTIVITY_TIMEZONE', 'UTC')
+app.config['PROGRESS_FLUSH_INTERVAL'] = int(os.getenv('PROGRESS_FLUSH_INTERVAL', '30'))
+app.config['HEARTBEAT_MAX_SECONDS'] = int(os.getenv('HEARTBEAT_MAX_SECONDS', '300'))
+app.config['REDIS_URL'] = os.getenv('REDIS_URL')
+app.config['CACHE_DIR'] = os.getenv('CACHE_DIR')
+app.config['ADMIN_DASHBOARD_CACHE_TTL'] = int(os.getenv('ADMIN_DASHBOARD_CACHE_TTL', '30'))
+app.config['FILE_DELIVERY'] = os.getenv('FILE_DELIVERY', 'direct')  # 'direct', 'x-accel' (nginx) or 'x-sendfile'
+app.config['FILE_ACCEL_PREFIX'] = os.getenv('FILE_ACCEL_PREFIX', '/protected-files/challenges/')
+app.config['FILE_ACCEL_BLOB_PREFIX'] = os.getenv('FILE_ACCEL_BLOB_PREFIX', '/protected-files/blobs/')  # Precompressed variants
+app.config['UPLOAD_CHUNK_MAX_BYTES'] = int(os.getenv('UPLOAD_CHUNK_MAX_BYTES', str(8 * 1024 * 1024)))  # Keep below nginx client_max_body_size
+app.config['UPLOAD_MAX_BYTES'] = int(os.getenv('UPLOAD_MAX_BYTES', str(4 * 1024 * 1024 * 1024)))
+app.config['BUNDLE_MAX_BYTES'] = int(os.getenv('BUNDLE_MAX_BYTES', str(16 * 1024 * 1024 * 1024)))  # All attachments in one bundle import
+app.config['UPLOAD_ORPHAN_GRACE_HOURS'] = int(os.getenv('UPLOAD_ORPHAN_GRACE_HOURS', '24'))
+app.config['FILE_URL_SECRET'] = os.getenv('FILE_URL_SECRET') or app.config['SECRET_KEY']
+app.config['FILE_URL_SIGNATURE'] = os.getenv('FILE_URL_SIGNATURE', 'hmac')  # 'hmac' or 'secure-link' (nginx verifies)
+app.config['FILE_URL_TTL'] = int(os.getenv('FILE_URL_TTL', '300'))
+app.config['DOWNLOAD_MAX_CONCURRENT_PER_USER'] = int(os.getenv('DOWNLOAD_MAX_CONCURRENT_PER_USER', '0'))  # 0 = unlimited
+app.config['DOWNLOAD_USER_RATE'] = int(os.getenv('DOWNLOAD_USER_RATE', '0'))  # Bytes/s per user, 0 = unlimited
+app.config['DOWNLOAD_TOTAL_RATE'] = int(os.getenv('DOWNLOAD_TOTAL_RATE', '0'))  # Bytes/s shared fairly by active users
+app.config['IDENTITY_CACHE_TTL'] = int(os.getenv('IDENTITY_CACHE_TTL', '30'))  # Seconds; 0 loads the user on every request
+app.config['IDENTITY_CACHE_SIZE'] = int(os.getenv('IDENTITY_CACHE_SIZE', '10000'))
+app.config['FUNNEL_CACHE_TTL'] = int(os.getenv('FUNNEL_CACHE_TTL', '600'))
+app.config['ADMIN_JOB_CHUNK_SIZE'] = int(os.getenv('ADMIN_JOB_CHUNK_SIZE', '1000'))
+app.config['ADMIN_JOB_STALE_SECONDS'] = int(os.getenv('ADMIN_JOB_STALE_SECONDS', '120'))  # No heartbeat for this long = worker died
+app.config['USER_IMPORT_HASH_THREADS'] = int(os.getenv('USER_IMPORT_HASH_THREADS', '0')) or os.cpu_count()  # 0 = one per CPU
 
 # Initialize database
 from database import db
 db.init_app(app)
 
+# Buffered progress writes (heartbeats, time tracking)
+from utils.progress_buffer import progress_buffer
+progress_buffer.init_app(app)
+
+# Cache shared across workers (Redis if configured, otherwise files)
+from utils.cache import shared_cache
+shared_cache.init_app(app)
+
+# Per-user download slots and bandwidth, tracked in the shared cache
+from utils.download_limiter import download_limiter
+download_limiter.init_app(app)
+
+# Per-worker cache of JWT users (username, active and admin flags)
+from utils.identity_cache import identity_cache
+identity_cache.init_app(app)
+
 # Initialize other extensions
 jwt = JWTManager(app)
 migrate = Migrate(app, db)
@@ -39,6 +80,9 @@ from models.user import User
 from models.challenge import Challenge, ChallengeCategory, Submission
 from models.progress import UserProgress
 from models.password_reset import PasswordReset
+from models.stats import UserStatsRollup
+from models.job import AdminJob
+from models.upload import FileBlob, StoredFile, UploadSession
 
 # Import routes
 from routes.auth import auth_bp
@@ -47,6 +91,7 @@ from routes.admin import admin_bp
 from routes.progress import progress_bp
 from routes.files import files_bp
 from routes.password_reset import password_reset_bp
+from routes.dashboard import dashboard_bp
 
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -55,6 +100,7 @@ app.register_blueprint(admin_bp, url_prefix='/api/admin')
 app.register_blueprint(progress_bp, url_prefix='/api/progress')
 app.register_blueprint(files_bp, url_prefix='/api/files')
 app.register_blueprint(password_reset_bp, url_prefix='/api/password-reset')
+app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
 
 @app.route('/api/health')
 def health_check():
@@ -118,6 +164,14 @@ def revoked_token_callback(jwt_header, jwt_payload):
 # Create tables
 with app.app_context():
     db.create_all()
+    
+    # Jobs left running by a worker that has since restarted
+    try:
+        from utils.admin_jobs import fail_stale_jobs
+        fail_stale_jobs()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Could not check for interrupted admin jobs: {e}")
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
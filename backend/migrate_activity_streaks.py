@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Migration script for timezone-aware activity streaks
+Adds the user timezone and rollup streak/heatmap columns, then rebuilds all rollups
+"""
+
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from database import db
+from models.stats import UserStatsRollup
+
+NEW_COLUMNS = [
+    ('users', 'timezone', 'VARCHAR(64)'),
+    ('user_stats_rollups', 'longest_streak', 'INTEGER NOT NULL DEFAULT 0'),
+    ('user_stats_rollups', 'daily_activity', 'JSON'),
+]
+
+def migrate_activity_streaks():
+    """Add missing columns and rebuild streaks in each user's timezone"""
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+
+            with db.engine.connect() as conn:
+                for table, column, column_type in NEW_COLUMNS:
+                    columns = [col['name'] for col in inspector.get_columns(table)]
+                    if column in columns:
+                        print(f"{table}.{column} already exists")
+                        continue
+                    print(f"Adding {column} column to {table} table...")
+                    conn.execute(db.text(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}'))
+                conn.commit()
+
+            rebuilt = UserStatsRollup.rebuild()
+            print(f"Rebuilt activity streaks for {rebuilt} users")
+
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            db.session.rollback()
+
+if __name__ == '__main__':
+    print("Running activity streak migration...")
+    migrate_activity_streaks()
+    print("Migration completed!")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Migration script for admin job heartbeats
+Adds admin_jobs.heartbeat_at, used to detect jobs whose worker stopped mid-run
+"""
+
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from database import db
+from utils.admin_jobs import fail_stale_jobs
+
+def migrate_admin_job_heartbeat():
+    """Add the heartbeat_at column and fail jobs left in flight without one"""
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('admin_jobs')]
+            
+            if 'heartbeat_at' not in columns:
+                print("Adding heartbeat_at column to admin_jobs table...")
+                with db.engine.connect() as conn:
+                    conn.execute(db.text('ALTER TABLE admin_jobs ADD COLUMN heartbeat_at TIMESTAMP'))
+                    conn.commit()
+            else:
+                print("heartbeat_at column already exists")
+            
+            # Jobs without a heartbeat fall back to created_at, so old stuck ones are released now
+            failed = fail_stale_jobs()
+            print(f"Marked {failed} interrupted jobs as failed")
+            
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            db.session.rollback()
+
+if __name__ == '__main__':
+    print("Running admin job heartbeat migration...")
+    migrate_admin_job_heartbeat()
+    print("Migration completed!")
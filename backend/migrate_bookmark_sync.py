@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Migration script for batched bookmark listing and incremental sync
+Adds user_progress.bookmark_updated_at and the indexes the bookmarks query uses
+"""
+
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from database import db
+from models.progress import UserProgress
+
+def migrate_bookmark_sync():
+    """Add the bookmark timestamp column, backfill it and create indexes"""
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('user_progress')]
+            
+            with db.engine.connect() as conn:
+                if 'bookmark_updated_at' not in columns:
+                    print("Adding bookmark_updated_at column to user_progress table...")
+                    conn.execute(db.text('ALTER TABLE user_progress ADD COLUMN bookmark_updated_at TIMESTAMP'))
+                else:
+                    print("bookmark_updated_at column already exists")
+                
+                conn.execute(db.text(
+                    'CREATE INDEX IF NOT EXISTS ix_user_progress_user_bookmark_updated '
+                    'ON user_progress (user_id, bookmark_updated_at)'
+                ))
+                conn.execute(db.text(
+                    'CREATE INDEX IF NOT EXISTS ix_submissions_challenge_correct '
+                    'ON submissions (challenge_id, is_correct)'
+                ))
+                conn.commit()
+            
+            # Existing bookmarks were last touched no later than last_accessed
+            backfilled = UserProgress.query.filter(
+                UserProgress.is_bookmarked == True,
+                UserProgress.bookmark_updated_at.is_(None)
+            ).update({'bookmark_updated_at': UserProgress.last_accessed}, synchronize_session=False)
+            db.session.commit()
+            
+            print(f"Backfilled bookmark timestamps for {backfilled} bookmarks")
+            
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            db.session.rollback()
+
+if __name__ == '__main__':
+    print("Running bookmark sync migration...")
+    migrate_bookmark_sync()
+    print("Migration completed!")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Migration script for the challenge attachment index
+Creates the challenge_files table and fills it from every challenge's file_attachments
+"""
+
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from database import db
+from models.challenge import Challenge, ChallengeFile
+
+def migrate_challenge_files():
+    """Create and backfill the challenge_files index"""
+    with app.app_context():
+        try:
+            ChallengeFile.__table__.create(db.engine, checkfirst=True)
+            
+            synced = 0
+            conflicts = []
+            challenges = Challenge.query.filter(Challenge.file_attachments.isnot(None)).order_by(Challenge.id)
+            for challenge in challenges.yield_per(200):
+                skipped = ChallengeFile.sync(challenge)
+                conflicts.extend((challenge.id, filename) for filename in skipped)
+                synced += 1
+                
+                # Flush as we go so later challenges see earlier owners
+                db.session.flush()
+            
+            db.session.commit()
+            
+            indexed = ChallengeFile.query.count()
+            print(f"Synced attachments for {synced} challenges ({indexed} files indexed)")
+            for challenge_id, filename in conflicts:
+                print(f"  Skipped {filename} on challenge {challenge_id}: already attached to another challenge")
+            
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            db.session.rollback()
+
+if __name__ == '__main__':
+    print("Running challenge files migration...")
+    migrate_challenge_files()
+    print("Migration completed!")
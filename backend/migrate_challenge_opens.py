@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Migration script for recording challenge opens
+Adds user_progress.opened_at, used by the "opened" stage of the challenge funnel
+"""
+
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from database import db
+from models.progress import UserProgress
+
+def migrate_challenge_opens():
+    """Add the opened_at column and backfill it for challenges already started"""
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            inspector = inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('user_progress')]
+            
+            if 'opened_at' not in columns:
+                print("Adding opened_at column to user_progress table...")
+                with db.engine.connect() as conn:
+                    conn.execute(db.text('ALTER TABLE user_progress ADD COLUMN opened_at TIMESTAMP'))
+                    conn.commit()
+            else:
+                print("opened_at column already exists")
+            
+            # Starting a challenge meant opening it first; bookmark- or notes-only rows stay unopened
+            backfilled = UserProgress.query.filter(
+                UserProgress.opened_at.is_(None),
+                db.or_(UserProgress.started_at.isnot(None), UserProgress.status != 'not_started')
+            ).update(
+                {'opened_at': db.func.coalesce(UserProgress.started_at, UserProgress.last_accessed)},
+                synchronize_session=False
+            )
+            db.session.commit()
+            
+            print(f"Backfilled opened_at for {backfilled} progress rows")
+            
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            db.session.rollback()
+
+if __name__ == '__main__':
+    print("Running challenge opens migration...")
+    migrate_challenge_opens()
+    print("Migration completed!")
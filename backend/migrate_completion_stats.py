@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Migration script to add streaming completion-time stats to challenges
+Adds the histogram columns and backfills them from existing correct submissions
+"""
+
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from database import db
+from models.challenge import Challenge, Submission
+from utils.completion_histogram import CompletionHistogram
+
+def add_completion_columns():
+    """Add completion stats columns to the challenges table if missing"""
+    from sqlalchemy import inspect
+    inspector = inspect(db.engine)
+    columns = [col['name'] for col in inspector.get_columns('challenges')]
+
+    with db.engine.connect() as conn:
+        if 'completion_time_count' not in columns:
+            print("Adding completion_time_count column to challenges table...")
+            conn.execute(db.text('ALTER TABLE challenges ADD COLUMN completion_time_count INTEGER NOT NULL DEFAULT 0'))
+        if 'completion_time_histogram' not in columns:
+            print("Adding completion_time_histogram column to challenges table...")
+            conn.execute(db.text('ALTER TABLE challenges ADD COLUMN completion_time_histogram JSON'))
+        conn.commit()
+
+def backfill_completion_stats():
+    """Rebuild every challenge's completion stats in a single pass over solves"""
+    histograms = {}
+    totals = {}
+
+    rows = db.session.query(
+        Submission.challenge_id,
+        Submission.completion_time
+    ).filter(
+        Submission.is_correct == True,
+        Submission.completion_time.isnot(None)
+    ).yield_per(1000)
+
+    for challenge_id, completion_time in rows:
+        histograms.setdefault(challenge_id, CompletionHistogram()).add(completion_time)
+        count, total = totals.get(challenge_id, (0, 0.0))
+        totals[challenge_id] = (count + 1, total + completion_time)
+
+    updated = 0
+    for challenge in Challenge.query.all():
+        histogram = histograms.get(challenge.id)
+        if histogram is None:
+            challenge.reset_completion_stats()
+            continue
+
+        count, total = totals[challenge.id]
+        challenge.completion_time_histogram = histogram.to_json()
+        challenge.completion_time_count = count
+        challenge.average_completion_time = total / count
+        updated += 1
+
+    db.session.commit()
+    return updated
+
+def migrate_completion_stats():
+    """Add and backfill completion-time statistics"""
+    with app.app_context():
+        try:
+            add_completion_columns()
+            updated = backfill_completion_stats()
+            print(f"Backfilled completion stats for {updated} challenges")
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            db.session.rollback()
+
+if __name__ == '__main__':
+    print("Running completion stats migration...")
+    migrate_completion_stats()
+    print("Migration completed!")
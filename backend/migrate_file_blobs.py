@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Migration script for content-addressed attachment storage
+Creates file_blobs and stored_files, moves existing attachments into uploads/blobs
+and replaces duplicate copies with hard links to a single blob
+"""
+
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from database import db
+from models.upload import FileBlob, StoredFile
+from utils.blob_store import add_reference, attachment_path, blob_path, hash_file, link_file
+
+def migrate_file_blobs():
+    """Register every attachment under uploads/challenges in the blob store"""
+    with app.app_context():
+        try:
+            FileBlob.__table__.create(db.engine, checkfirst=True)
+            StoredFile.__table__.create(db.engine, checkfirst=True)
+            
+            upload_dir = os.path.dirname(attachment_path('x'))
+            if not os.path.isdir(upload_dir):
+                print("No uploads directory, nothing to migrate")
+                return
+            
+            known = {filename for filename, in db.session.query(StoredFile.filename)}
+            registered = 0
+            deduplicated = 0
+            reclaimed_bytes = 0
+            
+            for entry in os.scandir(upload_dir):
+                if not entry.is_file() or entry.name in known:
+                    continue
+                
+                sha256 = hash_file(entry.path)
+                size_bytes = entry.stat().st_size
+                path = blob_path(sha256)
+                
+                if os.path.exists(path):
+                    # Identical content is already stored; keep one copy
+                    if not os.path.samefile(entry.path, path):
+                        os.remove(entry.path)
+                        link_file(path, entry.path)
+                        reclaimed_bytes += size_bytes
+                    deduplicated += 1
+                else:
+                    link_file(entry.path, path)
+                
+                # The blob file is in place, so this only records the reference
+                add_reference(sha256, size_bytes)
+                db.session.add(StoredFile(filename=entry.name, sha256=sha256))
+                db.session.commit()
+                registered += 1
+            
+            print(f"Registered {registered} attachments ({deduplicated} duplicates, {reclaimed_bytes} bytes reclaimed)")
+            
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            db.session.rollback()
+
+if __name__ == '__main__':
+    print("Running file blob migration...")
+    migrate_file_blobs()
+    print("Migration completed!")
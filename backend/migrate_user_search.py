@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Migration script for admin user search
+Creates the lower-cased username/email prefix indexes and the score index
+"""
+
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from database import db
+from models.user import User
+
+SEARCH_INDEXES = ['ix_users_username_lower', 'ix_users_email_lower', 'ix_users_total_score']
+
+def migrate_user_search():
+    """Create the user search indexes if they are missing"""
+    with app.app_context():
+        try:
+            from sqlalchemy.schema import CreateIndex
+            
+            # DDL comes from the model so PostgreSQL gets text_pattern_ops
+            with db.engine.connect() as conn:
+                for index in User.__table__.indexes:
+                    if index.name in SEARCH_INDEXES:
+                        print(f"Creating {index.name} if missing...")
+                        conn.execute(CreateIndex(index, if_not_exists=True))
+                conn.commit()
+            
+        except Exception as e:
+            print(f"Migration failed: {e}")
+
+if __name__ == '__main__':
+    print("Running user search migration...")
+    migrate_user_search()
+    print("Migration completed!")
@@ -1,6 +1,7 @@
 from datetime import datetime
 import re
 from database import db
+from utils.completion_histogram import CompletionHistogram
 
 class ChallengeCategory(db.Model):
     __tablename__ = 'challenge_categories'
@@ -18,15 +19,31 @@ class ChallengeCategory(db.Model):
     def __repr__(self):
         return f'<ChallengeCategory {self.name}>'
     
-    def to_dict(self):
+    def to_dict(self, challenge_count=None):
+        """Convert category to dictionary; pass challenge_count to skip the count query"""
+        if challenge_count is None:
+            challenge_count = self.challenges.filter_by(is_published=True).count()
+        
         return {
             'id': self.id,
             'name': self.name,
             'description': self.description,
             'icon': self.icon,
             'color': self.color,
-            'challenge_count': self.challenges.filter_by(is_published=True).count()
+            'challenge_count': challenge_count
         }
+    
+    @staticmethod
+    def published_challenge_counts():
+        """Map of category id to published challenge count, in one grouped query"""
+        rows = db.session.query(
+            Challenge.category_id,
+            db.func.count(Challenge.id)
+        ).filter(
+            Challenge.is_published == True
+        ).group_by(Challenge.category_id).all()
+        
+        return dict(rows)
 
 class Challenge(db.Model):
     __tablename__ = 'challenges'
@@ -77,12 +94,15 @@ class Challenge(db.Model):
     total_attempts = db.Column(db.Integer, default=0, nullable=False)
     successful_attempts = db.Column(db.Integer, default=0, nullable=False)
     average_completion_time = db.Column(db.Float)  
+    completion_time_count = db.Column(db.Integer, default=0, nullable=False)
+    completion_time_histogram = db.Column(db.JSON)  # Bucket counts, see utils/completion_histogram.py
     
     # Foreign keys
     category_id = db.Column(db.Integer, db.ForeignKey('challenge_categories.id'), nullable=False)
     
     # Relationships
     submissions = db.relationship('Submission', backref='challenge', lazy='dynamic', cascade='all, delete-orphan')
+    files = db.relationship('ChallengeFile', backref='challenge', lazy='dynamic', cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<Challenge {self.title}>'
@@ -114,6 +134,61 @@ class Challenge(db.Model):
             slug = f"{base_slug}-{counter}"
             counter += 1
     
+    @staticmethod
+    def recompute_counters_range(after_id, upper_id):
+        """Set-based rebuild of attempt counters for challenges with after_id < id <= upper_id
+        
+        The submissions table is the source of truth, as for user totals:
+        total_attempts is the number of submission rows and
+        successful_attempts the number of correct ones, which is also what
+        submit_answer adds as it creates rows. Counters wiped by clearing a
+        challenge's submissions stay wiped. Returns (changed, scanned).
+        """
+        from sqlalchemy import select, update
+        
+        for_challenge = Submission.challenge_id == Challenge.id
+        attempts = select(db.func.count(Submission.id)).where(for_challenge).scalar_subquery()
+        successes = select(db.func.count(Submission.id)).where(
+            for_challenge,
+            Submission.is_correct == True
+        ).scalar_subquery()
+        in_range = db.and_(Challenge.id > after_id, Challenge.id <= upper_id)
+        
+        result = db.session.execute(
+            update(Challenge).where(
+                in_range,
+                db.or_(Challenge.total_attempts != attempts, Challenge.successful_attempts != successes)
+            ).values(total_attempts=attempts, successful_attempts=successes).execution_options(synchronize_session=False)
+        )
+        scanned = db.session.query(db.func.count(Challenge.id)).filter(in_range).scalar()
+        
+        return result.rowcount, scanned
+    
+    @classmethod
+    def create_unique_slugs(cls, titles):
+        """Create unique slugs for many titles with a single lookup query"""
+        base_slugs = [cls.generate_slug(title) for title in titles]
+        distinct_bases = set(base_slugs)
+        if not distinct_bases:
+            return []
+        
+        # Every existing slug that could collide with a base or its numbered variants
+        conditions = [cls.slug.in_(distinct_bases)]
+        conditions.extend(cls.slug.like(f'{base}-%') for base in distinct_bases)
+        taken = {slug for slug, in db.session.query(cls.slug).filter(db.or_(*conditions))}
+        
+        slugs = []
+        for base_slug in base_slugs:
+            slug = base_slug
+            counter = 1
+            while slug in taken:
+                slug = f"{base_slug}-{counter}"
+                counter += 1
+            taken.add(slug)
+            slugs.append(slug)
+        
+        return slugs
+    
     def to_dict(self, include_sensitive=False):
         """Convert challenge to dictionary"""
         data = {
@@ -143,6 +218,7 @@ class Challenge(db.Model):
             'successful_attempts': self.successful_attempts,
             'solves': self.submissions.filter_by(is_correct=True).count(),
             'success_rate': round((self.successful_attempts / max(self.total_attempts, 1)) * 100, 1),
+            'completion_stats': self.completion_stats(),
             'category': self.category.to_dict() if self.category else None
         }
         
@@ -164,6 +240,45 @@ class Challenge(db.Model):
         if self.total_attempts == 0:
             return 0
         return round((self.successful_attempts / self.total_attempts) * 100, 1)
+    
+    def get_completion_histogram(self):
+        """Return the completion-time histogram for this challenge"""
+        return CompletionHistogram.from_json(self.completion_time_histogram)
+    
+    def record_completion_time(self, completion_time):
+        """Fold a solve's completion time (minutes) into the running stats"""
+        if completion_time is None or completion_time < 0:
+            return
+        
+        histogram = self.get_completion_histogram()
+        histogram.add(completion_time)
+        # Reassign so the JSON column is flagged as modified
+        self.completion_time_histogram = histogram.to_json()
+        
+        count = (self.completion_time_count or 0) + 1
+        average = self.average_completion_time or 0.0
+        self.average_completion_time = average + (completion_time - average) / count
+        self.completion_time_count = count
+    
+    def reset_completion_stats(self):
+        """Clear all completion-time statistics"""
+        self.average_completion_time = None
+        self.completion_time_count = 0
+        self.completion_time_histogram = None
+    
+    def faster_than_percent(self, completion_time):
+        """Percentage of recorded solves slower than the given completion time"""
+        return self.get_completion_histogram().faster_than_percent(completion_time)
+    
+    def completion_stats(self):
+        """Summary of completion times (minutes) without scanning submissions"""
+        histogram = self.get_completion_histogram()
+        return {
+            'count': self.completion_time_count or 0,
+            'average': round(self.average_completion_time, 2) if self.average_completion_time is not None else None,
+            'median': histogram.percentile(0.5),
+            'p90': histogram.percentile(0.9)
+        }
 
 class Submission(db.Model):
     __tablename__ = 'submissions'
@@ -189,6 +304,11 @@ class Submission(db.Model):
     # File submissions (for challenges requiring file uploads)
     submitted_files = db.Column(db.JSON)  # Array of uploaded file paths
     
+    __table_args__ = (
+        db.Index('ix_submissions_user_submitted_at', 'user_id', 'submitted_at'),
+        db.Index('ix_submissions_challenge_correct', 'challenge_id', 'is_correct'),
+    )
+    
     def __repr__(self):
         return f'<Submission {self.id}: User {self.user_id} -> Challenge {self.challenge_id}>'
     
@@ -206,3 +326,83 @@ class Submission(db.Model):
             'feedback': self.feedback,
             'hint_count': self.hint_count
         }
+
+class ChallengeFile(db.Model):
+    """Index of challenge attachments by stored filename, mirrored from Challenge.file_attachments"""
+    __tablename__ = 'challenge_files'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    challenge_id = db.Column(db.Integer, db.ForeignKey('challenges.id'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False, unique=True, index=True)  # Name on disk
+    name = db.Column(db.String(255))  # Original name offered on download
+    attachment_id = db.Column(db.String(64))  # 'id' of the JSON attachment entry
+    size = db.Column(db.String(50))
+    size_bytes = db.Column(db.BigInteger)
+    uploaded_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<ChallengeFile {self.filename} -> Challenge {self.challenge_id}>'
+    
+    def to_dict(self, challenge_title=None):
+        return {
+            'id': self.attachment_id,
+            'name': self.name,
+            'filename': self.filename,
+            'size': self.size,
+            'size_bytes': self.size_bytes,
+            'challenge_id': self.challenge_id,
+            'challenge_title': challenge_title,
+            'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None
+        }
+    
+    @staticmethod
+    def _parse_uploaded_at(value):
+        try:
+            return datetime.fromisoformat(value) if value else None
+        except (TypeError, ValueError):
+            return None
+    
+    @staticmethod
+    def sync(challenge):
+        """Make a challenge's index rows match its file_attachments JSON
+        
+        The challenge must have an id (flush first). A filename already indexed
+        under another challenge keeps its first owner. Returns filenames skipped
+        for that reason.
+        """
+        attachments = {
+            attachment['filename']: attachment
+            for attachment in challenge.file_attachments or []
+            if isinstance(attachment, dict) and attachment.get('filename')
+        }
+        
+        existing = {}
+        if attachments:
+            existing = {
+                row.filename: row
+                for row in ChallengeFile.query.filter(ChallengeFile.filename.in_(attachments))
+            }
+        
+        # Rows for attachments that were removed from the challenge
+        ChallengeFile.query.filter(
+            ChallengeFile.challenge_id == challenge.id,
+            ChallengeFile.filename.notin_(attachments) if attachments else db.true()
+        ).delete(synchronize_session=False)
+        
+        skipped = []
+        for filename, attachment in attachments.items():
+            row = existing.get(filename)
+            if row is not None and row.challenge_id != challenge.id:
+                skipped.append(filename)
+                continue
+            if row is None:
+                row = ChallengeFile(challenge_id=challenge.id, filename=filename)
+                db.session.add(row)
+            row.name = attachment.get('name') or filename
+            row.attachment_id = attachment.get('id')
+            row.size = attachment.get('size')
+            row.size_bytes = attachment.get('size_bytes')
+            row.uploaded_at = ChallengeFile._parse_uploaded_at(attachment.get('uploaded_at'))
+        
+        return skipped
@@ -0,0 +1,48 @@
+from datetime import datetime
+from database import db
+
+class AdminJob(db.Model):
+    """Long-running admin operation executed in the background, with progress for polling"""
+    __tablename__ = 'admin_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)  # 'clear_challenge_submissions', 'delete_user'
+    status = db.Column(db.String(20), default='pending', nullable=False)  # 'pending', 'running', 'completed', 'failed'
+    target_id = db.Column(db.Integer, nullable=False)
+    target_label = db.Column(db.String(255))
+    created_by = db.Column(db.Integer)  # Admin user id; no FK so the job outlives deleted accounts
+    
+    # Progress, in rows deleted out of the rows found when the job started
+    total = db.Column(db.Integer, default=0, nullable=False)
+    processed = db.Column(db.Integer, default=0, nullable=False)
+    
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # Refreshed while a worker runs the job; stale means it died
+    
+    def __repr__(self):
+        return f'<AdminJob {self.job_type}:{self.target_id} {self.status}>'
+    
+    def to_dict(self):
+        """Convert job to dictionary"""
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'target_id': self.target_id,
+            'target_label': self.target_label,
+            'created_by': self.created_by,
+            'total': self.total,
+            'processed': self.processed,
+            'progress_percent': round((self.processed / self.total) * 100, 1) if self.total else (100.0 if self.status == 'completed' else 0.0),
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None
+        }
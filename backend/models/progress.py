@@ -10,6 +10,7 @@ class UserProgress(db.Model):
     
     # Progress tracking
     status = db.Column(db.String(20), nullable=False, default='not_started')  
+    opened_at = db.Column(db.DateTime)  # First time the challenge page was loaded
     started_at = db.Column(db.DateTime)
     completed_at = db.Column(db.DateTime)
     last_accessed = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -21,6 +22,7 @@ class UserProgress(db.Model):
     
     # Bookmarking and notes
     is_bookmarked = db.Column(db.Boolean, default=False, nullable=False)
+    bookmark_updated_at = db.Column(db.DateTime)  # Last bookmark toggle, for incremental sync
     notes = db.Column(db.Text)  # User's personal notes
     
     # Achievement tracking
@@ -28,7 +30,10 @@ class UserProgress(db.Model):
     speed_bonus_earned = db.Column(db.Boolean, default=False, nullable=False)
     
     # Unique constraint to prevent duplicate progress entries
-    __table_args__ = (db.UniqueConstraint('user_id', 'challenge_id', name='unique_user_challenge_progress'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'challenge_id', name='unique_user_challenge_progress'),
+        db.Index('ix_user_progress_user_bookmark_updated', 'user_id', 'bookmark_updated_at'),
+    )
     
     def __repr__(self):
         return f'<UserProgress User:{self.user_id} Challenge:{self.challenge_id} Status:{self.status}>'
@@ -38,6 +43,7 @@ class UserProgress(db.Model):
             'id': self.id,
             'challenge_id': self.challenge_id,
             'status': self.status,
+            'opened_at': self.opened_at.isoformat() if self.opened_at else None,
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
             'last_accessed': self.last_accessed.isoformat() if self.last_accessed else None,
@@ -50,6 +56,35 @@ class UserProgress(db.Model):
             'speed_bonus_earned': self.speed_bonus_earned
         }
     
+    @staticmethod
+    def record_open(user_id, challenge_id):
+        """Stamp the first time a user opens a challenge, creating the progress row if needed
+        
+        Only the first open writes; later page loads are read-only. Returns the progress row.
+        """
+        from sqlalchemy.exc import IntegrityError
+        
+        now = datetime.utcnow()
+        changed = False
+        progress = UserProgress.query.filter_by(user_id=user_id, challenge_id=challenge_id).first()
+        if not progress:
+            try:
+                # Two tabs opening at once race on the unique constraint
+                with db.session.begin_nested():
+                    progress = UserProgress(user_id=user_id, challenge_id=challenge_id, opened_at=now, last_accessed=now)
+                    db.session.add(progress)
+                changed = True
+            except IntegrityError:
+                progress = UserProgress.query.filter_by(user_id=user_id, challenge_id=challenge_id).first()
+        
+        if progress.opened_at is None:
+            progress.opened_at = now
+            progress.last_accessed = now
+            changed = True
+        if changed:
+            db.session.commit()
+        return progress
+    
     def start_challenge(self):
         """Mark challenge as started"""
         if self.status == 'not_started':
@@ -87,10 +122,9 @@ class UserProgress(db.Model):
         db.session.commit()
     
     def update_time_spent(self, additional_time):
-        """Add time to total time spent"""
-        self.time_spent += additional_time
-        self.last_accessed = datetime.utcnow()
-        db.session.commit()
+        """Queue time (minutes) to add to time spent; written by the periodic progress flush"""
+        from utils.progress_buffer import progress_buffer
+        progress_buffer.record(self.user_id, self.challenge_id, time_spent=additional_time)
 
 class Achievement(db.Model):
     __tablename__ = 'achievements'
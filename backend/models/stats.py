@@ -0,0 +1,252 @@
+from datetime import datetime, timedelta
+from database import db
+from utils.timezones import get_timezone, local_date, local_today
+
+# Days of per-day activity kept on the rollup for the heatmap
+HEATMAP_RETENTION_DAYS = 400
+
+class UserStatsRollup(db.Model):
+    """Per-user aggregates backing /api/progress/user-stats, kept up to date on submission"""
+    __tablename__ = 'user_stats_rollups'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+
+    # {"<category_id>": {"completed": n, "points": p}} and the same keyed by difficulty
+    category_stats = db.Column(db.JSON)
+    difficulty_stats = db.Column(db.JSON)
+
+    # Running average of completion time over correct submissions
+    completion_time_count = db.Column(db.Integer, default=0, nullable=False)
+    completion_time_total = db.Column(db.Float, default=0.0, nullable=False)
+
+    # Activity streak state, with dates in the user's timezone
+    current_streak = db.Column(db.Integer, default=0, nullable=False)
+    longest_streak = db.Column(db.Integer, default=0, nullable=False)
+    last_active_date = db.Column(db.Date)
+    daily_activity = db.Column(db.JSON)  # {"YYYY-MM-DD": submissions} for the heatmap
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<UserStatsRollup User:{self.user_id}>'
+
+    @staticmethod
+    def _add_to_bucket(stats, key, completed, points):
+        """Return a copy of a stats map with counts added to one bucket"""
+        stats = dict(stats or {})
+        bucket = dict(stats.get(str(key), {'completed': 0, 'points': 0}))
+        bucket['completed'] += completed
+        bucket['points'] += points
+        stats[str(key)] = bucket
+        return stats
+
+    def record_activity(self, activity_date):
+        """Count activity on a (local) date and advance the streak"""
+        daily = dict(self.daily_activity or {})
+        key = activity_date.isoformat()
+        daily[key] = daily.get(key, 0) + 1
+        if len(daily) > HEATMAP_RETENTION_DAYS:
+            cutoff = (activity_date - timedelta(days=HEATMAP_RETENTION_DAYS)).isoformat()
+            daily = {day: count for day, count in daily.items() if day > cutoff}
+        self.daily_activity = daily
+
+        if self.last_active_date and self.last_active_date >= activity_date:
+            return
+
+        if self.last_active_date == activity_date - timedelta(days=1):
+            self.current_streak = (self.current_streak or 0) + 1
+        else:
+            self.current_streak = 1
+        self.longest_streak = max(self.longest_streak or 0, self.current_streak)
+        self.last_active_date = activity_date
+
+    def record_solve(self, category_id, difficulty, points, new_solve=True, completion_time=None):
+        """Fold a correct submission into the category and difficulty aggregates"""
+        completed = 1 if new_solve else 0
+        self.category_stats = self._add_to_bucket(self.category_stats, category_id, completed, points or 0)
+        self.difficulty_stats = self._add_to_bucket(self.difficulty_stats, difficulty, completed, points or 0)
+
+        if new_solve and completion_time is not None:
+            self.completion_time_count = (self.completion_time_count or 0) + 1
+            self.completion_time_total = (self.completion_time_total or 0.0) + completion_time
+
+    def get_activity_streak(self, today):
+        """Current streak, or 0 if the user has not been active since yesterday"""
+        if not self.last_active_date or self.last_active_date < today - timedelta(days=1):
+            return 0
+        return self.current_streak or 0
+
+    def get_avg_completion_time(self):
+        if not self.completion_time_count:
+            return 0
+        return round(self.completion_time_total / self.completion_time_count, 2)
+
+    def get_heatmap(self, today, days=365):
+        """Per-day submission counts for the last `days` days, oldest first"""
+        daily = self.daily_activity or {}
+        first_day = today - timedelta(days=days - 1)
+        return [
+            {'date': day.isoformat(), 'count': daily.get(day.isoformat(), 0)}
+            for day in (first_day + timedelta(days=offset) for offset in range(days))
+        ]
+
+    def to_dict(self, tz):
+        today = local_today(tz)
+        return {
+            'category_progress': [
+                {
+                    'category_id': int(category_id),
+                    'completed': bucket['completed'],
+                    'points': bucket['points']
+                } for category_id, bucket in (self.category_stats or {}).items()
+            ],
+            'difficulty_progress': [
+                {
+                    'difficulty': difficulty,
+                    'completed': bucket['completed'],
+                    'points': bucket['points']
+                } for difficulty, bucket in (self.difficulty_stats or {}).items()
+            ],
+            'activity_streak': self.get_activity_streak(today),
+            'longest_streak': self.longest_streak or 0,
+            'avg_completion_time': self.get_avg_completion_time()
+        }
+
+    @classmethod
+    def record_submission(cls, submission, challenge, points_awarded, new_submission):
+        """Update the rollup for a created or updated submission (caller commits)"""
+        from models.user import User
+
+        rollup = cls.query.get(submission.user_id)
+        if rollup is None:
+            # No rollup yet (e.g. first submit since the table was introduced):
+            # build it from all of the user's submissions, this one included,
+            # instead of starting from zero
+            db.session.flush()
+            cls.rebuild([submission.user_id], commit=False)
+            return cls.query.get(submission.user_id)
+
+        user = User.query.get(submission.user_id)
+        tz = get_timezone(user.timezone if user else None)
+        rollup.record_activity(local_date(submission.submitted_at or datetime.utcnow(), tz))
+
+        if submission.is_correct:
+            rollup.record_solve(
+                challenge.category_id,
+                challenge.difficulty,
+                points_awarded,
+                new_solve=new_submission,
+                completion_time=submission.completion_time
+            )
+        return rollup
+
+    @staticmethod
+    def _streak_from_dates(dates):
+        """Return (current_streak, longest_streak, last_active_date) from ascending distinct dates"""
+        streak = 0
+        longest = 0
+        previous = None
+        for activity_date in dates:
+            if previous and activity_date == previous + timedelta(days=1):
+                streak += 1
+            else:
+                streak = 1
+            longest = max(longest, streak)
+            previous = activity_date
+        return streak, longest, previous
+
+    @classmethod
+    def rebuild(cls, user_ids=None, batch_size=500, commit=True):
+        """Recompute rollups from submissions for the given users (all users if None)
+
+        With commit=False the new rows are only flushed, for callers that commit
+        them as part of their own transaction.
+        """
+        from models.user import User
+        from models.challenge import Challenge, Submission
+
+        if user_ids is None:
+            user_ids = [user_id for user_id, in db.session.query(User.id).order_by(User.id)]
+        user_ids = list(user_ids)
+
+        rebuilt = 0
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            rollups = {
+                user_id: cls(
+                    user_id=user_id,
+                    category_stats={},
+                    difficulty_stats={},
+                    completion_time_count=0,
+                    completion_time_total=0.0,
+                    current_streak=0,
+                    longest_streak=0,
+                    daily_activity={}
+                ) for user_id in batch
+            }
+            timezones = {
+                user_id: get_timezone(tz_name)
+                for user_id, tz_name in db.session.query(User.id, User.timezone).filter(User.id.in_(batch))
+            }
+
+            solved = db.session.query(
+                Submission.user_id,
+                Challenge.category_id,
+                Challenge.difficulty,
+                db.func.count(Submission.id),
+                db.func.coalesce(db.func.sum(Submission.points_awarded), 0)
+            ).join(
+                Challenge, Challenge.id == Submission.challenge_id
+            ).filter(
+                Submission.user_id.in_(batch),
+                Submission.is_correct == True
+            ).group_by(Submission.user_id, Challenge.category_id, Challenge.difficulty)
+
+            for user_id, category_id, difficulty, completed, points in solved:
+                rollup = rollups[user_id]
+                rollup.category_stats = cls._add_to_bucket(rollup.category_stats, category_id, completed, points)
+                rollup.difficulty_stats = cls._add_to_bucket(rollup.difficulty_stats, difficulty, completed, points)
+
+            timings = db.session.query(
+                Submission.user_id,
+                db.func.count(Submission.completion_time),
+                db.func.coalesce(db.func.sum(Submission.completion_time), 0.0)
+            ).filter(
+                Submission.user_id.in_(batch),
+                Submission.is_correct == True,
+                Submission.completion_time.isnot(None)
+            ).group_by(Submission.user_id)
+
+            for user_id, count, total in timings:
+                rollups[user_id].completion_time_count = count
+                rollups[user_id].completion_time_total = float(total)
+
+            daily_counts = {}
+            for user_id, submitted_at in db.session.query(
+                Submission.user_id,
+                Submission.submitted_at
+            ).filter(Submission.user_id.in_(batch)).yield_per(1000):
+                activity_date = local_date(submitted_at, timezones.get(user_id) or get_timezone())
+                counts = daily_counts.setdefault(user_id, {})
+                counts[activity_date] = counts.get(activity_date, 0) + 1
+
+            for user_id, counts in daily_counts.items():
+                current, longest, last_active = cls._streak_from_dates(sorted(counts))
+                cutoff = last_active - timedelta(days=HEATMAP_RETENTION_DAYS)
+                rollup = rollups[user_id]
+                rollup.current_streak = current
+                rollup.longest_streak = longest
+                rollup.last_active_date = last_active
+                rollup.daily_activity = {
+                    day.isoformat(): count for day, count in counts.items() if day > cutoff
+                }
+
+            cls.query.filter(cls.user_id.in_(batch)).delete()
+            db.session.add_all(rollups.values())
+            if commit:
+                db.session.commit()
+            else:
+                db.session.flush()
+            rebuilt += len(batch)
+
+        return rebuilt
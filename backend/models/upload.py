@@ -0,0 +1,61 @@
+from datetime import datetime
+from database import db
+
+class UploadSession(db.Model):
+    """Resumable chunked upload in progress; bytes accumulate in uploads/partial/<id>.part"""
+    __tablename__ = 'upload_sessions'
+    
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    original_name = db.Column(db.String(255), nullable=False)
+    password = db.Column(db.String(255))  # Archive password shown with the attachment
+    
+    # Declared size up front; received is the next offset the client must send
+    total_size = db.Column(db.BigInteger, nullable=False)
+    received = db.Column(db.BigInteger, default=0, nullable=False)
+    
+    status = db.Column(db.String(20), default='uploading', nullable=False)  # 'uploading', 'completed'
+    sha256 = db.Column(db.String(64))
+    stored_filename = db.Column(db.String(255))
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<UploadSession {self.id} {self.received}/{self.total_size}>'
+    
+    def to_dict(self):
+        return {
+            'upload_id': self.id,
+            'name': self.original_name,
+            'size': self.total_size,
+            'offset': self.received,
+            'status': self.status,
+            'sha256': self.sha256,
+            'filename': self.stored_filename,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class FileBlob(db.Model):
+    """Attachment content stored once under uploads/blobs, shared by every filename with the same hash"""
+    __tablename__ = 'file_blobs'
+    
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size_bytes = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, default=0, nullable=False)  # stored_files rows pointing here
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<FileBlob {self.sha256[:12]} x{self.ref_count}>'
+
+class StoredFile(db.Model):
+    """Attachment filename under uploads/challenges and the blob it is a hard link to"""
+    __tablename__ = 'stored_files'
+    
+    filename = db.Column(db.String(255), primary_key=True)
+    sha256 = db.Column(db.String(64), db.ForeignKey('file_blobs.sha256'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<StoredFile {self.filename} {self.sha256[:12]}>'
@@ -14,6 +14,7 @@ class User(db.Model):
     last_name = db.Column(db.String(50))
     bio = db.Column(db.Text)
     avatar_url = db.Column(db.String(255))
+    timezone = db.Column(db.String(64))  # IANA name, e.g. 'Africa/Kampala'
     
     # User status and permissions
     is_active = db.Column(db.Boolean, default=True, nullable=False)
@@ -33,6 +34,16 @@ class User(db.Model):
     # Relationships
     submissions = db.relationship('Submission', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     progress = db.relationship('UserProgress', backref='user', lazy='dynamic', cascade='all, delete-orphan')
+    stats_rollup = db.relationship('UserStatsRollup', backref='user', uselist=False, cascade='all, delete-orphan')
+    
+    # Case-insensitive prefix search (text_pattern_ops lets PostgreSQL use them for LIKE 'abc%')
+    __table_args__ = (
+        db.Index('ix_users_username_lower', db.func.lower(username).label('username_lower'),
+                 postgresql_ops={'username_lower': 'text_pattern_ops'}),
+        db.Index('ix_users_email_lower', db.func.lower(email).label('email_lower'),
+                 postgresql_ops={'email_lower': 'text_pattern_ops'}),
+        db.Index('ix_users_total_score', 'total_score'),
+    )
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -59,6 +70,7 @@ class User(db.Model):
             data.update({
                 'is_admin': self.is_admin,
                 'is_active': self.is_active,
+                'timezone': self.timezone,
                 'updated_at': self.updated_at.isoformat() if self.updated_at else None
             })
         
@@ -71,6 +83,117 @@ class User(db.Model):
         self.total_score = sum(submission.points_awarded for submission in completed_submissions if submission.points_awarded)
         db.session.commit()
     
+    @staticmethod
+    def summary_columns():
+        """Columns for lightweight admin listings, loaded without building User objects"""
+        return [
+            User.id, User.username, User.email, User.first_name, User.last_name,
+            User.is_active, User.is_admin, User.is_verified, User.total_score,
+            User.challenges_completed, User.rank_position, User.created_at, User.last_login
+        ]
+    
+    @staticmethod
+    def summary_to_dict(row):
+        """Convert a summary_columns() row to a dictionary"""
+        data = dict(row._mapping)
+        for field in ('created_at', 'last_login'):
+            data[field] = data[field].isoformat() if data[field] else None
+        return data
+    
+    @staticmethod
+    def recompute_totals(user_ids, batch_size=500):
+        """Recompute total_score and challenges_completed from correct submissions
+        for the given users, with one grouped query and one batched UPDATE per batch"""
+        from sqlalchemy import bindparam, update
+        from models.challenge import Submission
+        
+        user_ids = list(user_ids)
+        statement = update(User.__table__).where(
+            User.__table__.c.id == bindparam('b_id')
+        ).values(
+            total_score=bindparam('b_total_score'),
+            challenges_completed=bindparam('b_completed')
+        )
+        
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            totals = {
+                user_id: (completed, score)
+                for user_id, completed, score in db.session.query(
+                    Submission.user_id,
+                    db.func.count(Submission.id),
+                    db.func.coalesce(db.func.sum(Submission.points_awarded), 0)
+                ).filter(
+                    Submission.user_id.in_(batch),
+                    Submission.is_correct == True
+                ).group_by(Submission.user_id)
+            }
+            db.session.execute(statement, [
+                {
+                    'b_id': user_id,
+                    'b_completed': totals.get(user_id, (0, 0))[0],
+                    'b_total_score': totals.get(user_id, (0, 0))[1]
+                } for user_id in batch
+            ])
+        
+        db.session.commit()
+    
+    @staticmethod
+    def recompute_totals_range(after_id, upper_id):
+        """Set-based rebuild of totals for users with after_id < id <= upper_id
+        
+        Only rows whose values differ are written. Returns (changed, scanned).
+        """
+        from sqlalchemy import select, update
+        from models.challenge import Submission
+        
+        correct = db.and_(Submission.user_id == User.id, Submission.is_correct == True)
+        score = select(db.func.coalesce(db.func.sum(Submission.points_awarded), 0)).where(correct).scalar_subquery()
+        completed = select(db.func.count(Submission.id)).where(correct).scalar_subquery()
+        in_range = db.and_(User.id > after_id, User.id <= upper_id)
+        
+        result = db.session.execute(
+            update(User).where(
+                in_range,
+                db.or_(User.total_score != score, User.challenges_completed != completed)
+            ).values(total_score=score, challenges_completed=completed).execution_options(synchronize_session=False)
+        )
+        scanned = db.session.query(db.func.count(User.id)).filter(in_range).scalar()
+        
+        return result.rowcount, scanned
+    
+    @staticmethod
+    def update_rankings():
+        """Re-rank every user with points in one window-function UPDATE
+        
+        Solves do not re-rank, so stored ranks can be stale or NULL anywhere
+        in the table and the whole ranking is always recomputed. Only rows
+        whose rank changes are written. Returns the number of users whose
+        rank changed.
+        """
+        from sqlalchemy import select, update
+        
+        # Users without points drop out of the rankings
+        cleared = User.query.filter(
+            User.total_score <= 0,
+            User.rank_position.isnot(None)
+        ).update({'rank_position': None}, synchronize_session=False)
+        
+        ranked = select(
+            User.id,
+            db.func.row_number().over(order_by=(User.total_score.desc(), User.id)).label('new_rank')
+        ).where(User.total_score > 0).subquery()
+        
+        result = db.session.execute(
+            update(User).where(
+                User.id == ranked.c.id,
+                db.or_(User.rank_position.is_(None), User.rank_position != ranked.c.new_rank)
+            ).values(rank_position=ranked.c.new_rank).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        
+        return cleared + result.rowcount
+    
     @staticmethod
     def update_all_rankings():
         """Update rank positions for all users"""
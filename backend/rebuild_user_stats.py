@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Rebuild the per-user stats rollups backing /api/progress/user-stats
+Run after importing submissions or fixing data by hand
+
+Usage: python rebuild_user_stats.py [user_id ...]
+"""
+
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from database import db
+from models.stats import UserStatsRollup
+
+def ensure_indexes():
+    """Create the submission index used for recent activity on existing databases"""
+    with db.engine.connect() as conn:
+        conn.execute(db.text(
+            'CREATE INDEX IF NOT EXISTS ix_submissions_user_submitted_at '
+            'ON submissions (user_id, submitted_at)'
+        ))
+        conn.commit()
+
+def rebuild_user_stats(user_ids=None):
+    """Recompute stats rollups for the given users, or everyone"""
+    with app.app_context():
+        try:
+            ensure_indexes()
+            rebuilt = UserStatsRollup.rebuild(user_ids)
+            print(f"Rebuilt stats rollups for {rebuilt} users")
+        except Exception as e:
+            print(f"Rebuild failed: {e}")
+            db.session.rollback()
+            return False
+    return True
+
+if __name__ == '__main__':
+    user_ids = [int(arg) for arg in sys.argv[1:]] or None
+    print("Rebuilding user stats rollups...")
+    if not rebuild_user_stats(user_ids):
+        sys.exit(1)
+    print("Rebuild completed!")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Recompute user scores, challenge attempt counters and rankings from raw data
+Run after imports, manual DB fixes or anything else that leaves them stale
+
+Work is committed in batches with a checkpoint on an admin_jobs row, so an
+interrupted run picks up where it stopped the next time it is started.
+
+Usage: python recompute_stats.py [--restart] [--batch-size N]
+"""
+
+import sys
+import os
+import argparse
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from database import db
+from models.job import AdminJob
+from utils.admin_jobs import find_in_flight, run_job
+
+def find_resumable_job():
+    """Most recent recompute that did not finish"""
+    return AdminJob.query.filter(
+        AdminJob.job_type == 'recompute_stats',
+        AdminJob.status == 'failed'
+    ).order_by(AdminJob.id.desc()).first()
+
+def recompute_stats(restart=False, batch_size=None):
+    """Run (or resume) a full stats recompute and print what changed"""
+    with app.app_context():
+        if batch_size:
+            app.config['ADMIN_JOB_CHUNK_SIZE'] = batch_size
+        
+        # Interrupted runs are marked failed here; a live one is left alone
+        running = find_in_flight('recompute_stats')
+        if running:
+            print(f"Job {running.id} is still running (last heartbeat {running.heartbeat_at})")
+            return False
+        
+        job = None if restart else find_resumable_job()
+        if job:
+            checkpoint = job.result or {}
+            print(f"Resuming job {job.id} at phase '{checkpoint.get('phase', 'users')}' after id {checkpoint.get('last_id', 0)}")
+        else:
+            job = AdminJob(job_type='recompute_stats', target_id=0, target_label='all users and challenges')
+            db.session.add(job)
+            db.session.commit()
+            print(f"Started job {job.id}")
+        job_id = job.id
+    
+    run_job(app, job_id)
+    
+    with app.app_context():
+        job = AdminJob.query.get(job_id)
+        if job.status != 'completed':
+            print(f"Recompute failed: {job.error}")
+            print("Run the command again to resume from the last checkpoint")
+            return False
+        
+        changed = job.result.get('changed', {})
+        print(f"Scanned {job.processed} rows")
+        print(f"Users with changed totals: {changed.get('users', 0)}")
+        print(f"Challenges with changed counters: {changed.get('challenges', 0)}")
+        print(f"Users with changed ranks: {changed.get('ranks', 0)}")
+    return True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recompute scores, counters and rankings')
+    parser.add_argument('--restart', action='store_true', help='Ignore any unfinished run and start over')
+    parser.add_argument('--batch-size', type=int, help='Rows per committed batch')
+    args = parser.parse_args()
+    
+    print("Recomputing stats...")
+    if not recompute_stats(args.restart, args.batch_size):
+        sys.exit(1)
+    print("Recompute completed!")
@@ -1,24 +1,43 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, request, jsonify, session, current_app, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
 from werkzeug.security import generate_password_hash
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import sys
 import os
+import json
 
 from database import db
 from models.user import User
-from models.challenge import Challenge, ChallengeCategory, Submission
+from models.challenge import Challenge, ChallengeCategory, ChallengeFile, Submission
+from models.stats import UserStatsRollup
+from models.job import AdminJob
+from utils.admin_jobs import fail_stale_jobs, find_in_flight, start_job
+from utils.cache import SUBMISSIONS_GENERATION, shared_cache
+from utils.download_limiter import download_limiter
+from utils.identity_cache import current_identity, identity_cache
+from models.progress import UserProgress
+from utils.challenge_bundle import BundleError, export_bundle, import_bundle
+from utils.blob_store import release, remove_released
+from utils.user_import import detect_format, import_users, parse_rows
 # Security imports removed for simplified deployment
 
 admin_bp = Blueprint('admin', __name__)
 
+DASHBOARD_CACHE_KEY = 'admin:dashboard'
+FUNNEL_CACHE_KEY = 'admin:funnel:{generation}'
+FUNNEL_STAGES = ['opened', 'started', 'attempted', 'hinted', 'solved']
+
+# Stage each conversion rate is measured against; hints are optional, so solves compare to attempts
+FUNNEL_CONVERSION_BASE = {'started': 'opened', 'attempted': 'started', 'hinted': 'attempted', 'solved': 'attempted'}
+
 def require_admin():
     """Decorator to require admin privileges"""
     def decorator(f):
         def wrapper(*args, **kwargs):
-            user_id = int(get_jwt_identity())
-            user = User.query.get(user_id)
-            if not user or not user.is_admin:
+            # Cached per worker; role changes invalidate it in every worker
+            identity = current_identity()
+            if not identity or not identity.is_admin:
                 return jsonify({'error': 'Admin privileges required'}), 403
             return f(*args, **kwargs)
         wrapper.__name__ = f.__name__
@@ -97,61 +116,181 @@ def setup_admin():
 @jwt_required()
 @require_admin()
 def admin_dashboard():
-    """Get admin dashboard statistics"""
+    """Get admin dashboard statistics (cached briefly; ?refresh=true recomputes)"""
     try:
-        # User statistics
-        total_users = User.query.count()
-        active_users = User.query.filter_by(is_active=True).count()
-        new_users_today = User.query.filter(
-            User.created_at >= datetime.utcnow().date()
-        ).count()
-        
-        # Challenge statistics
-        total_challenges = Challenge.query.count()
-        published_challenges = Challenge.query.filter_by(is_published=True).count()
-        featured_challenges = Challenge.query.filter_by(is_featured=True).count()
-        
-        # Submission statistics
-        total_submissions = Submission.query.count()
-        successful_submissions = Submission.query.filter_by(is_correct=True).count()
-        submissions_today = Submission.query.filter(
-            Submission.submitted_at >= datetime.utcnow().date()
-        ).count()
-        
-        # Category statistics
-        categories = ChallengeCategory.query.all()
-        category_stats = []
-        for category in categories:
-            category_stats.append({
-                'category': category.to_dict(),
-                'challenge_count': category.challenges.filter_by(is_published=True).count(),
-                'total_attempts': sum(c.total_attempts for c in category.challenges),
-                'success_rate': calculate_category_success_rate(category)
-            })
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
         
-        return jsonify({
-            'users': {
-                'total': total_users,
-                'active': active_users,
-                'new_today': new_users_today
-            },
-            'challenges': {
-                'total': total_challenges,
-                'published': published_challenges,
-                'featured': featured_challenges
-            },
-            'submissions': {
-                'total': total_submissions,
-                'successful': successful_submissions,
-                'today': submissions_today,
-                'success_rate': round((successful_submissions / max(total_submissions, 1)) * 100, 1)
-            },
-            'categories': category_stats
-        }), 200
+        data = None if refresh else shared_cache.get(DASHBOARD_CACHE_KEY)
+        cached = data is not None
+        if not cached:
+            data = build_dashboard_stats()
+            shared_cache.set(DASHBOARD_CACHE_KEY, data, current_app.config['ADMIN_DASHBOARD_CACHE_TTL'])
+        
+        return jsonify({**data, 'cached': cached}), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to fetch dashboard data', 'details': str(e)}), 500
 
+def count_where(condition):
+    """SUM of a boolean condition, usable alongside COUNT in one query"""
+    return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+
+def build_dashboard_stats():
+    """Compute dashboard figures with a handful of grouped aggregate queries"""
+    today = datetime.utcnow().date()
+    
+    # User statistics
+    total_users, active_users, new_users_today = db.session.query(
+        db.func.count(User.id),
+        count_where(User.is_active == True),
+        count_where(User.created_at >= today)
+    ).one()
+    
+    # Challenge statistics
+    total_challenges, published_challenges, featured_challenges = db.session.query(
+        db.func.count(Challenge.id),
+        count_where(Challenge.is_published == True),
+        count_where(Challenge.is_featured == True)
+    ).one()
+    
+    # Submission statistics
+    total_submissions, successful_submissions, submissions_today = db.session.query(
+        db.func.count(Submission.id),
+        count_where(Submission.is_correct == True),
+        count_where(Submission.submitted_at >= today)
+    ).one()
+    
+    # Category statistics, aggregated per category in one query
+    category_rows = db.session.query(
+        Challenge.category_id,
+        count_where(Challenge.is_published == True),
+        db.func.coalesce(db.func.sum(Challenge.total_attempts), 0),
+        db.func.coalesce(db.func.sum(Challenge.successful_attempts), 0)
+    ).group_by(Challenge.category_id).all()
+    category_totals = {row[0]: row[1:] for row in category_rows}
+    
+    category_stats = []
+    for category in ChallengeCategory.query.all():
+        published, attempts, successes = category_totals.get(category.id, (0, 0, 0))
+        category_stats.append({
+            'category': category.to_dict(challenge_count=published),
+            'challenge_count': published,
+            'total_attempts': attempts,
+            'success_rate': round((successes / attempts) * 100, 1) if attempts else 0
+        })
+    
+    return {
+        'users': {
+            'total': total_users,
+            'active': active_users,
+            'new_today': new_users_today
+        },
+        'challenges': {
+            'total': total_challenges,
+            'published': published_challenges,
+            'featured': featured_challenges
+        },
+        'submissions': {
+            'total': total_submissions,
+            'successful': successful_submissions,
+            'today': submissions_today,
+            'success_rate': round((successful_submissions / max(total_submissions, 1)) * 100, 1)
+        },
+        'categories': category_stats,
+        'generated_at': datetime.utcnow().isoformat()
+    }
+
+@admin_bp.route('/analytics/funnel', methods=['GET'])
+@jwt_required()
+@require_admin()
+def challenge_funnel():
+    """Per-challenge opened/started/attempted/hinted/solved funnel (?refresh=true recomputes)"""
+    try:
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        
+        # New submissions advance the generation, which retires older entries
+        generation = shared_cache.get_generation(SUBMISSIONS_GENERATION)
+        cache_key = FUNNEL_CACHE_KEY.format(generation=generation)
+        
+        data = None if refresh else shared_cache.get(cache_key)
+        cached = data is not None
+        if not cached:
+            data = build_funnel_stats()
+            data['generation'] = generation
+            shared_cache.set(cache_key, data, current_app.config['FUNNEL_CACHE_TTL'])
+        
+        return jsonify({**data, 'cached': cached}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch funnel analytics', 'details': str(e)}), 500
+
+def build_funnel_stats():
+    """Compute the funnel for every challenge with three grouped queries"""
+    challenges = db.session.query(
+        Challenge.id,
+        Challenge.title,
+        Challenge.difficulty,
+        Challenge.is_published,
+        ChallengeCategory.name
+    ).join(ChallengeCategory, ChallengeCategory.id == Challenge.category_id).order_by(Challenge.id).all()
+    
+    # Opened, started, hinted and solved all come from the progress rows. Rows
+    # made only by a bookmark or notes are not opens; a start implies an open
+    # for rows from before opens were recorded.
+    started = db.or_(UserProgress.started_at.isnot(None), UserProgress.status != 'not_started')
+    progress_rows = db.session.query(
+        UserProgress.challenge_id,
+        count_where(db.or_(UserProgress.opened_at.isnot(None), started)),
+        count_where(started),
+        count_where(UserProgress.hints_used > 0),
+        count_where(UserProgress.status == 'completed'),
+        db.func.avg(db.case((UserProgress.status == 'completed', UserProgress.time_spent)))
+    ).group_by(UserProgress.challenge_id).all()
+    progress_totals = {row[0]: row[1:] for row in progress_rows}
+    
+    # Attempted means at least one submitted answer
+    submission_rows = db.session.query(
+        Submission.challenge_id,
+        db.func.count(db.distinct(Submission.user_id)),
+        db.func.count(Submission.id)
+    ).group_by(Submission.challenge_id).all()
+    submission_totals = {row[0]: row[1:] for row in submission_rows}
+    
+    results = []
+    for challenge_id, title, difficulty, is_published, category_name in challenges:
+        opened, started, hinted, solved, avg_solve_time = progress_totals.get(challenge_id, (0, 0, 0, 0, None))
+        attempted, submissions = submission_totals.get(challenge_id, (0, 0))
+        funnel = {
+            'opened': opened,
+            'started': started,
+            'attempted': attempted,
+            'hinted': hinted,
+            'solved': solved
+        }
+        
+        conversion = {}
+        for stage, base in FUNNEL_CONVERSION_BASE.items():
+            conversion[stage] = round((funnel[stage] / funnel[base]) * 100, 1) if funnel[base] else 0
+        
+        results.append({
+            'challenge_id': challenge_id,
+            'title': title,
+            'difficulty': difficulty,
+            'category': category_name,
+            'is_published': is_published,
+            'funnel': funnel,
+            'conversion': conversion,
+            'solve_rate': round((solved / opened) * 100, 1) if opened else 0,
+            'submissions': submissions,
+            'avg_solve_time': round(avg_solve_time, 1) if avg_solve_time is not None else None
+        })
+    
+    return {
+        'stages': FUNNEL_STAGES,
+        'challenges': results,
+        'generated_at': datetime.utcnow().isoformat()
+    }
+
 @admin_bp.route('/categories', methods=['POST'])
 @jwt_required()
 @require_admin()
@@ -253,6 +392,8 @@ def create_challenge():
             challenge.publish_date = datetime.utcnow()
         
         db.session.add(challenge)
+        db.session.flush()
+        ChallengeFile.sync(challenge)
         db.session.commit()
         
         return jsonify({
@@ -298,6 +439,9 @@ def update_challenge(challenge_id):
         if data.get('is_published') and not challenge.publish_date:
             challenge.publish_date = datetime.utcnow()
         
+        if 'file_attachments' in data:
+            ChallengeFile.sync(challenge)
+        
         challenge.updated_at = datetime.utcnow()
         db.session.commit()
         
@@ -327,8 +471,14 @@ def delete_challenge(challenge_id):
                 'error': f'Cannot delete challenge with {submissions_count} submissions. Consider unpublishing instead.'
             }), 400
         
+        # Drop the attachments' blob references; files go once the delete is committed
+        released = []
+        for challenge_file in challenge.files:
+            released.extend(release(challenge_file.filename))
+        
         db.session.delete(challenge)
         db.session.commit()
+        remove_released(released)
         
         return jsonify({'message': 'Challenge deleted successfully'}), 200
         
@@ -364,6 +514,68 @@ def get_all_challenges():
     except Exception as e:
         return jsonify({'error': 'Failed to fetch challenges', 'details': str(e)}), 500
 
+@admin_bp.route('/challenges/export', methods=['GET'])
+@jwt_required()
+@require_admin()
+def export_challenges():
+    """Stream a bundle of challenges and their attachments (all, or ?ids=1,2,3)"""
+    try:
+        from routes.files import get_upload_dir
+        
+        query = Challenge.query.options(db.joinedload(Challenge.category)).order_by(Challenge.id)
+        ids = request.args.get('ids')
+        if ids:
+            try:
+                challenge_ids = [int(value) for value in ids.split(',') if value]
+            except ValueError:
+                return jsonify({'error': 'ids must be a comma separated list of integers'}), 400
+            query = query.filter(Challenge.id.in_(challenge_ids))
+        
+        challenges = query.all()
+        if not challenges:
+            return jsonify({'error': 'No challenges to export'}), 404
+        
+        filename = f"challenges-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.zip"
+        return Response(
+            export_bundle(challenges, get_upload_dir()),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to export challenges', 'details': str(e)}), 500
+
+@admin_bp.route('/challenges/import', methods=['POST'])
+@jwt_required()
+@require_admin()
+def import_challenges():
+    """Import a challenge bundle (multipart field 'bundle') in one transaction"""
+    try:
+        from routes.files import allowed_file, get_upload_dir
+        
+        user_id = int(get_jwt_identity())
+        
+        bundle = request.files.get('bundle')
+        if not bundle or bundle.filename == '':
+            return jsonify({'error': 'No bundle provided'}), 400
+        
+        challenges = import_bundle(bundle.stream, user_id, get_upload_dir(), allowed_file)
+        shared_cache.delete(DASHBOARD_CACHE_KEY)
+        
+        return jsonify({
+            'message': f'Imported {len(challenges)} challenges',
+            'challenges': [
+                {'id': challenge.id, 'title': challenge.title, 'slug': challenge.slug}
+                for challenge in challenges
+            ]
+        }), 201
+        
+    except BundleError as e:
+        return jsonify({'error': str(e), 'errors': e.errors}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to import challenges', 'details': str(e)}), 500
+
 @admin_bp.route('/users', methods=['GET'])
 @jwt_required()
 @require_admin()
@@ -392,6 +604,80 @@ def get_all_users():
     except Exception as e:
         return jsonify({'error': 'Failed to fetch users', 'details': str(e)}), 500
 
+USER_SORT_COLUMNS = {
+    'created_at': User.created_at,
+    'username': User.username,
+    'total_score': User.total_score,
+    'last_login': User.last_login
+}
+
+def parse_bool_arg(name):
+    """Read a true/false query argument; None when absent or unrecognised"""
+    value = request.args.get(name, '').lower()
+    if value in ('true', '1', 'yes'):
+        return True
+    if value in ('false', '0', 'no'):
+        return False
+    return None
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+@admin_bp.route('/users/search', methods=['GET'])
+@jwt_required()
+@require_admin()
+def search_users():
+    """Search users by username/email prefix with status and score filters"""
+    try:
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+        
+        query = db.session.query(*User.summary_columns())
+        
+        # Prefix match on the lower-cased username/email indexes
+        term = request.args.get('q', '').strip().lower()
+        if term:
+            pattern = escape_like(term) + '%'
+            query = query.filter(db.or_(
+                db.func.lower(User.username).like(pattern, escape='\\'),
+                db.func.lower(User.email).like(pattern, escape='\\')
+            ))
+        
+        for name in ('is_active', 'is_admin', 'is_verified'):
+            value = parse_bool_arg(name)
+            if value is not None:
+                query = query.filter(getattr(User, name) == value)
+        
+        min_score = request.args.get('min_score', type=int)
+        max_score = request.args.get('max_score', type=int)
+        if min_score is not None:
+            query = query.filter(User.total_score >= min_score)
+        if max_score is not None:
+            query = query.filter(User.total_score <= max_score)
+        
+        total = query.count()
+        
+        sort_column = USER_SORT_COLUMNS.get(request.args.get('sort'), User.created_at)
+        ordering = sort_column.asc() if request.args.get('order') == 'asc' else sort_column.desc()
+        rows = query.order_by(ordering, User.id).limit(per_page).offset((page - 1) * per_page).all()
+        
+        pages = (total + per_page - 1) // per_page
+        
+        return jsonify({
+            'users': [User.summary_to_dict(row) for row in rows],
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': total,
+                'pages': pages,
+                'has_next': page < pages,
+                'has_prev': page > 1
+            }
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to search users', 'details': str(e)}), 500
+
 @admin_bp.route('/users', methods=['POST'])
 @jwt_required()
 @require_admin()
@@ -448,6 +734,48 @@ def create_user():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@admin_bp.route('/users/import', methods=['POST'])
+@jwt_required()
+@require_admin()
+def import_users_bulk():
+    """Create many users from a CSV/JSON upload (field 'file') or a JSON body
+    
+    Streams newline-delimited JSON: one result per row, then a summary line.
+    """
+    try:
+        upload = request.files.get('file')
+        if upload and upload.filename:
+            fmt = request.form.get('format') or detect_format(upload.filename)
+            if not fmt:
+                return jsonify({'error': 'File must be .csv or .json'}), 400
+            rows = parse_rows(upload.read(), fmt)
+        else:
+            data = request.get_json(silent=True)
+            rows = data.get('users') if isinstance(data, dict) else data
+            if not isinstance(rows, list):
+                return jsonify({'error': 'Provide a file or a JSON body with a users list'}), 400
+        
+        if not rows:
+            return jsonify({'error': 'No users to import'}), 400
+        
+        batch_size = min(max(request.args.get('batch_size', 200, type=int), 1), 1000)
+        hash_threads = current_app.config['USER_IMPORT_HASH_THREADS']
+        
+        def generate():
+            # hashlib's scrypt/pbkdf2 release the GIL, so threads hash in parallel
+            # without forking or re-importing the app
+            with ThreadPoolExecutor(max_workers=hash_threads, thread_name_prefix='user-import') as executor:
+                for entry in import_users(rows, batch_size=batch_size, executor=executor):
+                    yield json.dumps(entry) + '\n'
+            shared_cache.delete(DASHBOARD_CACHE_KEY)
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson'), 200
+        
+    except ValueError as e:
+        return jsonify({'error': 'Invalid import file', 'details': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Failed to import users', 'details': str(e)}), 500
+
 @admin_bp.route('/users/<int:user_id>/toggle-active', methods=['POST'])
 @jwt_required()
 @require_admin()
@@ -466,6 +794,7 @@ def toggle_user_active(user_id):
         user.is_active = not user.is_active
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        identity_cache.invalidate(user.id)
         
         status = 'activated' if user.is_active else 'deactivated'
         return jsonify({
@@ -497,6 +826,7 @@ def toggle_user_admin(user_id):
         user.is_admin = not user.is_admin
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        identity_cache.invalidate(user.id)
         
         action = 'promoted to admin' if user.is_admin else 'removed from admin'
         return jsonify({
@@ -512,30 +842,23 @@ def toggle_user_admin(user_id):
 @jwt_required()
 @require_admin()
 def clear_challenge_submissions(challenge_id):
-    """Clear all submissions for a specific challenge"""
+    """Start a background job clearing all submissions for a specific challenge"""
     try:
         challenge = Challenge.query.get(challenge_id)
         if not challenge:
             return jsonify({'error': 'Challenge not found'}), 404
         
-        # Get submission count before deletion
-        submission_count = challenge.submissions.count()
-        
-        # Delete all submissions for this challenge
-        challenge.submissions.delete()
-        
-        # Reset challenge statistics
-        challenge.total_attempts = 0
-        challenge.successful_attempts = 0
-        challenge.average_completion_time = None
-        challenge.updated_at = datetime.utcnow()
-        
-        db.session.commit()
+        job = start_job(
+            'clear_challenge_submissions',
+            challenge.id,
+            int(get_jwt_identity()),
+            target_label=challenge.title
+        )
         
         return jsonify({
-            'message': f'Successfully cleared {submission_count} submissions for challenge "{challenge.title}"',
-            'cleared_count': submission_count
-        }), 200
+            'message': f'Clearing submissions for challenge "{challenge.title}"',
+            'job': job.to_dict()
+        }), 202
         
     except Exception as e:
         db.session.rollback()
@@ -545,7 +868,7 @@ def clear_challenge_submissions(challenge_id):
 @jwt_required()
 @require_admin()
 def delete_user(user_id):
-    """Delete a user"""
+    """Start a background job deleting a user and their data"""
     try:
         user = User.query.get(user_id)
         if not user:
@@ -561,40 +884,96 @@ def delete_user(user_id):
         if user.is_admin:
             return jsonify({'error': 'Cannot delete admin users'}), 403
         
-        # Get user info before deletion
-        username = user.username
-        email = user.email
+        # Refuse a second delete while one is still in flight (stale ones count as failed)
+        in_flight = find_in_flight('delete_user', user.id)
+        if in_flight:
+            return jsonify({'error': 'User is already being deleted', 'job': in_flight.to_dict()}), 409
         
-        # Delete all submissions by this user
-        Submission.query.filter_by(user_id=user_id).delete()
-        
-        # Delete the user
-        db.session.delete(user)
-        db.session.commit()
+        job = start_job('delete_user', user.id, current_user_id, target_label=f'{user.username} ({user.email})')
         
         return jsonify({
-            'message': f'Successfully deleted user "{username}" ({email})',
+            'message': f'Deleting user "{user.username}" ({user.email})',
             'deleted_user': {
-                'id': user_id,
-                'username': username,
-                'email': email
-            }
-        }), 200
+                'id': user.id,
+                'username': user.username,
+                'email': user.email
+            },
+            'job': job.to_dict()
+        }), 202
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to delete user', 'details': str(e)}), 500
 
-def calculate_category_success_rate(category):
-    """Calculate overall success rate for a category"""
-    total_attempts = 0
-    successful_attempts = 0
-    
-    for challenge in category.challenges:
-        total_attempts += challenge.total_attempts
-        successful_attempts += challenge.successful_attempts
-    
-    if total_attempts == 0:
-        return 0
-    
-    return round((successful_attempts / total_attempts) * 100, 1)
+@admin_bp.route('/uploads/scan', methods=['POST'])
+@jwt_required()
+@require_admin()
+def scan_upload_store():
+    """Start a background integrity scan of the upload store ({"reclaim": true} also removes orphans)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        mode = 'reclaim' if data.get('reclaim') else 'report'
+        
+        # One scan at a time; a second reclaim would race the first
+        in_flight = find_in_flight('scan_uploads')
+        if in_flight:
+            return jsonify({'error': 'An upload scan is already running', 'job': in_flight.to_dict()}), 409
+        
+        job = start_job('scan_uploads', 0, int(get_jwt_identity()), target_label=mode)
+        
+        return jsonify({
+            'message': 'Reclaiming orphaned uploads' if mode == 'reclaim' else 'Scanning upload store',
+            'job': job.to_dict()
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to start upload scan', 'details': str(e)}), 500
+
+@admin_bp.route('/downloads', methods=['GET'])
+@jwt_required()
+@require_admin()
+def get_download_stats():
+    """Download limits, active downloads and throttled/rejected counters"""
+    try:
+        return jsonify(download_limiter.stats()), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get download stats', 'details': str(e)}), 500
+
+@admin_bp.route('/jobs', methods=['GET'])
+@jwt_required()
+@require_admin()
+def get_jobs():
+    """Recent background jobs, newest first (?status= to filter)"""
+    try:
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        fail_stale_jobs()
+        
+        query = AdminJob.query
+        status = request.args.get('status')
+        if status:
+            query = query.filter(AdminJob.status == status)
+        
+        jobs = query.order_by(AdminJob.created_at.desc(), AdminJob.id.desc()).limit(limit).all()
+        
+        return jsonify({'jobs': [job.to_dict() for job in jobs]}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch jobs', 'details': str(e)}), 500
+
+@admin_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+@require_admin()
+def get_job(job_id):
+    """Progress and result of a background job"""
+    try:
+        fail_stale_jobs()
+        job = AdminJob.query.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        return jsonify({'job': job.to_dict()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch job', 'details': str(e)}), 500
@@ -7,6 +7,9 @@ import os
 
 from database import db
 from models.user import User
+from models.stats import UserStatsRollup
+from utils.timezones import is_valid_timezone
+from utils.identity_cache import identity_cache
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -138,6 +141,7 @@ def update_profile():
                 setattr(user, field, data[field])
         
         # Handle username update with validation
+        username_changed = False
         if 'username' in data:
             new_username = data['username'].strip()
             if len(new_username) < 3:
@@ -148,11 +152,26 @@ def update_profile():
             if existing_user and existing_user.id != user.id:
                 return jsonify({'error': 'Username already exists'}), 409
             
+            username_changed = new_username != user.username
             user.username = new_username
         
+        # Handle timezone update; activity days are re-bucketed in the new zone
+        timezone_changed = False
+        if 'timezone' in data:
+            new_timezone = data['timezone'] or None
+            if new_timezone and not is_valid_timezone(new_timezone):
+                return jsonify({'error': 'Invalid timezone'}), 400
+            timezone_changed = new_timezone != user.timezone
+            user.timezone = new_timezone
+        
         user.updated_at = datetime.utcnow()
         db.session.commit()
         
+        if username_changed:
+            identity_cache.invalidate(user.id)
+        if timezone_changed:
+            UserStatsRollup.rebuild([user.id])
+        
         return jsonify({
             'message': 'Profile updated successfully',
             'user': user.to_dict(include_sensitive=True)
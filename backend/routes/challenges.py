@@ -1,8 +1,10 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from datetime import datetime
 import json
+import math
 import re
+import time
 import sys
 import os
 
@@ -10,6 +12,10 @@ from database import db
 from models.user import User
 from models.challenge import Challenge, ChallengeCategory, Submission
 from models.progress import UserProgress
+from models.stats import UserStatsRollup
+from utils.completion_histogram import CompletionHistogram
+from utils.progress_buffer import progress_buffer
+from utils.cache import SUBMISSIONS_GENERATION, shared_cache
 
 challenges_bp = Blueprint('challenges', __name__)
 
@@ -17,13 +23,18 @@ challenges_bp = Blueprint('challenges', __name__)
 def get_categories():
     """Get all challenge categories"""
     try:
-        categories = ChallengeCategory.query.all()
-        return jsonify({
-            'categories': [cat.to_dict() for cat in categories]
-        }), 200
+        return jsonify({'categories': build_categories()}), 200
     except Exception as e:
         return jsonify({'error': 'Failed to fetch categories', 'details': str(e)}), 500
 
+def build_categories():
+    """All categories with published challenge counts, in two queries"""
+    counts = ChallengeCategory.published_challenge_counts()
+    return [
+        category.to_dict(challenge_count=counts.get(category.id, 0))
+        for category in ChallengeCategory.query.all()
+    ]
+
 @challenges_bp.route('/', methods=['GET'])
 def get_challenges():
     """Get all published challenges with optional filtering"""
@@ -102,12 +113,14 @@ def get_challenge(challenge_identifier):
         user_identity = get_jwt_identity()
         if user_identity:
             user_id = int(user_identity)
-            progress = UserProgress.query.filter_by(
-                user_id=user_id,
-                challenge_id=challenge.id
-            ).first()
+            # First open feeds the "opened" stage of the admin funnel
+            progress = UserProgress.record_open(user_id, challenge.id)
             
-            challenge_data['user_progress'] = progress.to_dict() if progress else None
+            challenge_data['user_progress'] = progress.to_dict()
+            # Include heartbeat time that has not been flushed yet
+            challenge_data['user_progress']['time_spent'] += progress_buffer.pending_time_spent(
+                user_id, challenge.id
+            )
             
             # Check if user has already completed this challenge
             completed_submission = Submission.query.filter_by(
@@ -121,6 +134,7 @@ def get_challenge(challenge_identifier):
         return jsonify({'challenge': challenge_data}), 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': 'Failed to fetch challenge', 'details': str(e)}), 500
 
 @challenges_bp.route('/<challenge_identifier>/start', methods=['POST'])
@@ -167,6 +181,44 @@ def start_challenge(challenge_identifier):
         db.session.rollback()
         return jsonify({'error': 'Failed to start challenge', 'details': str(e)}), 500
 
+@challenges_bp.route('/<int:challenge_id>/heartbeat', methods=['POST'])
+@jwt_required()
+def challenge_heartbeat(challenge_id):
+    """Record time spent on a challenge; buffered and written in periodic batches"""
+    try:
+        user_id = int(get_jwt_identity())
+        data = request.get_json(silent=True) or {}
+        
+        max_seconds = current_app.config['HEARTBEAT_MAX_SECONDS']
+        try:
+            seconds = float(data.get('seconds', 0))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'seconds must be a number'}), 400
+        if not math.isfinite(seconds):
+            return jsonify({'error': 'seconds must be a finite number'}), 400
+        
+        # The buffered flush only updates existing rows, so make sure there is one;
+        # pairs this worker has already seen skip the lookup entirely
+        if not progress_buffer.has_progress_row(user_id, challenge_id):
+            if not db.session.query(Challenge.id).filter_by(id=challenge_id, is_published=True).scalar():
+                return jsonify({'error': 'Challenge not found'}), 404
+            UserProgress.record_open(user_id, challenge_id)
+            progress_buffer.mark_progress_row(user_id, challenge_id)
+        
+        # Credit no more than the wall time since this user's previous heartbeat
+        now = time.time()
+        last_beat = progress_buffer.swap_beat(user_id, challenge_id, now, max_seconds * 2)
+        elapsed = now - last_beat if last_beat is not None else max_seconds
+        seconds = min(max(seconds, 0), max_seconds, max(elapsed, 0))
+        
+        progress_buffer.record(user_id, challenge_id, time_spent=seconds / 60)
+        
+        return jsonify({'message': 'Heartbeat recorded', 'seconds': seconds}), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to record heartbeat', 'details': str(e)}), 500
+
 @challenges_bp.route('/<challenge_identifier>/submit', methods=['POST'])
 @jwt_required()
 def submit_answer(challenge_identifier):
@@ -344,11 +396,27 @@ def submit_answer(challenge_identifier):
             print(f"DEBUG: Submission created successfully")
             db.session.add(submission)
         
-        # Update challenge statistics
-        challenge.total_attempts += 1
+        # Keep the per-user stats rollup in step with the submission record
+        new_submission = submission is not existing_correct
+        if new_submission or is_correct:
+            UserStatsRollup.record_submission(
+                submission,
+                challenge,
+                points_awarded,
+                new_submission=new_submission
+            )
+        
+        # Update challenge statistics. Like Challenge.recompute_counters_range,
+        # they count submission rows and correct submission rows, so answers
+        # merged into (or rejected against) an existing correct row add nothing
+        if new_submission:
+            challenge.total_attempts += 1
+            if is_correct:
+                challenge.successful_attempts += 1
         
         # Check if challenge is fully completed (all questions answered correctly)
         challenge_fully_completed = False
+        faster_than_percent = None
         if is_correct:
             try:
                 # Get all answers from the submission
@@ -365,7 +433,8 @@ def submit_answer(challenge_identifier):
                 
                 if answered_questions >= total_questions:
                     challenge_fully_completed = True
-                    challenge.successful_attempts += 1
+                    faster_than_percent = challenge.faster_than_percent(completion_time)
+                    challenge.record_completion_time(completion_time)
                     
                     # Update user progress only when fully completed
                     first_attempt = progress.attempts_count == 1
@@ -380,7 +449,8 @@ def submit_answer(challenge_identifier):
                     print("DEBUG: Challenge partially completed, waiting for more answers")
             except (json.JSONDecodeError, TypeError, KeyError) as e:
                 print(f"DEBUG: Error checking challenge completion: {e}")
-                challenge.successful_attempts += 1
+                faster_than_percent = challenge.faster_than_percent(completion_time)
+                challenge.record_completion_time(completion_time)
                 first_attempt = progress.attempts_count == 1
                 progress.complete_challenge(first_attempt=first_attempt, completion_time=completion_time)
                 user = User.query.get(user_id)
@@ -388,6 +458,7 @@ def submit_answer(challenge_identifier):
                 challenge_fully_completed = True
         
         db.session.commit()
+        shared_cache.bump_generation(SUBMISSIONS_GENERATION)
         
         response_data = {
             'is_correct': is_correct,
@@ -401,6 +472,7 @@ def submit_answer(challenge_identifier):
             if challenge_fully_completed:
                 response_data['message'] = 'Congratulations! You have completed the entire challenge!'
                 response_data['challenge_completed'] = True
+                response_data['faster_than_percent'] = faster_than_percent
             else:
                 response_data['message'] = 'Correct answer! Continue with the remaining questions.'
                 response_data['challenge_completed'] = False
@@ -473,53 +545,123 @@ def get_hint(challenge_id):
 @challenges_bp.route('/my-progress', methods=['GET'])
 @jwt_required()
 def get_my_progress():
-    """Get current user's progress across all challenges"""
+    """Get current user's progress across all challenges, optionally paged and filtered"""
     try:
         user_id = int(get_jwt_identity())
         
-        # Get user progress
-        progress_records = UserProgress.query.filter_by(user_id=user_id).all()
-        
-        # Get user submissions
-        submissions = Submission.query.filter_by(user_id=user_id).all()
-        
-        # Organize data
-        progress_data = []
-        for progress in progress_records:
-            progress_dict = progress.to_dict()
-            
-            # Add challenge information
-            challenge = Challenge.query.get(progress.challenge_id)
-            if challenge:
-                progress_dict['challenge'] = {
-                    'id': challenge.id,
-                    'title': challenge.title,
-                    'difficulty': challenge.difficulty,
-                    'points': challenge.points,
-                    'category': challenge.category.to_dict() if challenge.category else None
-                }
-            
-            # Add submission information
-            user_submissions = [s.to_dict() for s in submissions if s.challenge_id == progress.challenge_id]
-            progress_dict['submissions'] = user_submissions
-            
-            progress_data.append(progress_dict)
-        
-        # Get user statistics
-        user = User.query.get(user_id)
-        
-        return jsonify({
-            'progress': progress_data,
-            'user_stats': {
-                'total_score': user.total_score,
-                'challenges_completed': user.challenges_completed,
-                'rank_position': user.rank_position
-            }
-        }), 200
+        # Query parameters; without page/per_page every record is returned
+        statuses = [status for status in request.args.get('status', '').split(',') if status]
+        bookmarked_only = request.args.get('bookmarked', 'false').lower() == 'true'
+        include_submissions = request.args.get('include_submissions', 'true').lower() != 'false'
+        page = request.args.get('page', type=int)
+        per_page = request.args.get('per_page', type=int)
+        
+        data = build_my_progress(
+            user_id,
+            statuses=statuses,
+            bookmarked_only=bookmarked_only,
+            include_submissions=include_submissions,
+            page=page,
+            per_page=per_page
+        )
+        if data is None:
+            return jsonify({'error': 'User not found'}), 404
+        
+        return jsonify(data), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to fetch progress', 'details': str(e)}), 500
 
+def build_my_progress(user_id, statuses=None, bookmarked_only=False, include_submissions=True,
+                      page=None, per_page=None, user=None):
+    """Build the my-progress payload with a fixed number of queries"""
+    if user is None:
+        user = db.session.query(
+            User.total_score,
+            User.challenges_completed,
+            User.rank_position
+        ).filter(User.id == user_id).first()
+        if not user:
+            return None
+    
+    # Progress rows joined with their challenge and category
+    query = db.session.query(UserProgress, Challenge, ChallengeCategory).outerjoin(
+        Challenge, Challenge.id == UserProgress.challenge_id
+    ).outerjoin(
+        ChallengeCategory, ChallengeCategory.id == Challenge.category_id
+    ).filter(UserProgress.user_id == user_id)
+    
+    if statuses:
+        query = query.filter(UserProgress.status.in_(statuses))
+    if bookmarked_only:
+        query = query.filter(UserProgress.is_bookmarked == True)
+    
+    query = query.order_by(UserProgress.last_accessed.desc(), UserProgress.id.desc())
+    
+    pagination = None
+    if page or per_page:
+        page = max(page or 1, 1)
+        per_page = min(max(per_page or 20, 1), 100)
+        paginated = query.paginate(page=page, per_page=per_page, error_out=False)
+        rows = paginated.items
+        pagination = {
+            'page': page,
+            'per_page': per_page,
+            'total': paginated.total,
+            'pages': paginated.pages,
+            'has_next': paginated.has_next,
+            'has_prev': paginated.has_prev
+        }
+    else:
+        rows = query.all()
+    
+    # Published challenge counts for every category in one grouped query
+    category_counts = ChallengeCategory.published_challenge_counts() if rows else {}
+    
+    # Submissions for the listed challenges only, grouped in a single pass
+    submissions_by_challenge = {}
+    if include_submissions and rows:
+        challenge_ids = [progress.challenge_id for progress, _, _ in rows]
+        submissions = Submission.query.filter(
+            Submission.user_id == user_id,
+            Submission.challenge_id.in_(challenge_ids)
+        ).order_by(Submission.submitted_at.asc()).all()
+        for submission in submissions:
+            submissions_by_challenge.setdefault(submission.challenge_id, []).append(submission.to_dict())
+    
+    progress_data = []
+    for progress, challenge, category in rows:
+        progress_dict = progress.to_dict()
+        
+        if challenge:
+            progress_dict['challenge'] = {
+                'id': challenge.id,
+                'title': challenge.title,
+                'difficulty': challenge.difficulty,
+                'points': challenge.points,
+                'category': category.to_dict(
+                    challenge_count=category_counts.get(category.id, 0)
+                ) if category else None
+            }
+        
+        if include_submissions:
+            progress_dict['submissions'] = submissions_by_challenge.get(progress.challenge_id, [])
+        
+        progress_data.append(progress_dict)
+    
+    data = {
+        'progress': progress_data,
+        'user_stats': {
+            'total_score': user.total_score,
+            'challenges_completed': user.challenges_completed,
+            'rank_position': user.rank_position
+        }
+    }
+    if pagination:
+        data['pagination'] = pagination
+    
+    return data
+
 def validate_answer(challenge, submitted_answer, question_key=None):
     """Validate submitted answer against challenge solution"""
     import json
@@ -807,6 +949,8 @@ def get_challenge_leaderboard(challenge_id):
             Submission.submitted_at.asc()  
         ).limit(10)
         
+        histogram = challenge.get_completion_histogram() if challenge else CompletionHistogram()
+        
         leaderboard_data = []
         for rank, result in enumerate(leaderboard_query.all(), 1):
             user_id, username, avatar_url, points, completion_time, submitted_at, hint_count = result
@@ -829,6 +973,7 @@ def get_challenge_leaderboard(challenge_id):
                 'points_awarded': points,
                 'completion_time': completion_time,
                 'time_display': time_display,
+                'faster_than_percent': histogram.faster_than_percent(completion_time),
                 'submitted_at': submitted_at.isoformat(),
                 'hint_count': hint_count
             })
@@ -838,7 +983,8 @@ def get_challenge_leaderboard(challenge_id):
             'timeline': timeline_data,
             'total_completions': len(all_submissions),
             'max_points': max_points,
-            'total_users': len(user_progressions)
+            'total_users': len(user_progressions),
+            'completion_stats': challenge.completion_stats() if challenge else None
         }), 200
         
     except Exception as e:
@@ -0,0 +1,84 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+import hashlib
+import json
+
+from database import db
+from models.user import User
+from models.stats import UserStatsRollup
+from routes.challenges import build_categories, build_my_progress
+from routes.progress import build_bookmarks, build_user_stats
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+# Client-side cache hints per bundle part (seconds)
+PART_CACHE_HINTS = {
+    'profile': {'max_age': 300, 'scope': 'private'},
+    'user_stats': {'max_age': 60, 'scope': 'private'},
+    'my_progress': {'max_age': 30, 'scope': 'private'},
+    'bookmarks': {'max_age': 120, 'scope': 'private'},
+    'categories': {'max_age': 3600, 'scope': 'public'}
+}
+
+def part_etag(data):
+    """Stable short hash of a part's payload"""
+    encoded = json.dumps(data, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+@dashboard_bp.route('/bootstrap', methods=['GET'])
+@jwt_required()
+def get_bootstrap():
+    """Everything the SPA needs after login, built from a single user lookup"""
+    try:
+        user_id = int(get_jwt_identity())
+        
+        # Which parts to build; all of them by default
+        requested = request.args.get('parts')
+        parts = [part for part in requested.split(',') if part in PART_CACHE_HINTS] if requested else list(PART_CACHE_HINTS)
+        
+        # Part etags the client already holds, as "part:etag,part:etag"
+        known_etags = dict(
+            item.split(':', 1) for item in request.args.get('etags', '').split(',') if ':' in item
+        )
+        
+        # The only user lookup for the whole bundle
+        result = db.session.query(User, UserStatsRollup).outerjoin(
+            UserStatsRollup, UserStatsRollup.user_id == User.id
+        ).filter(User.id == user_id).first()
+        
+        if not result:
+            return jsonify({'error': 'User not found'}), 404
+        
+        user, rollup = result
+        
+        builders = {
+            'profile': lambda: {'user': user.to_dict(include_sensitive=True)},
+            'user_stats': lambda: build_user_stats(user, rollup),
+            'my_progress': lambda: build_my_progress(
+                user.id,
+                statuses=[status for status in request.args.get('progress_status', '').split(',') if status],
+                page=request.args.get('progress_page', type=int),
+                per_page=request.args.get('progress_per_page', type=int),
+                user=user
+            ),
+            'bookmarks': lambda: {'bookmarks': build_bookmarks(user.id)[0]},
+            'categories': lambda: {'categories': build_categories()}
+        }
+        
+        bundle = {}
+        for part in parts:
+            data = builders[part]()
+            etag = part_etag(data)
+            entry = {'etag': etag, 'cache': PART_CACHE_HINTS[part]}
+            if known_etags.get(part) == etag:
+                entry['not_modified'] = True
+            else:
+                entry['data'] = data
+            bundle[part] = entry
+        
+        response = jsonify({'bundle': bundle})
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response, 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to load dashboard bundle', 'details': str(e)}), 500
@@ -1,13 +1,22 @@
-from flask import Blueprint, request, jsonify, send_from_directory, current_app
+from flask import Blueprint, request, jsonify, send_from_directory, current_app, Response
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.utils import secure_filename
+from werkzeug.exceptions import HTTPException
+from werkzeug.utils import secure_filename, send_file
 import os
 import uuid
 from datetime import datetime
 
 from database import db
-from models.user import User
-from models.challenge import Challenge
+from models.challenge import Challenge, ChallengeFile
+from models.upload import StoredFile, UploadSession
+from utils.blob_store import get_blob_dir, link_existing, release, remove_released, save_stream, store_file
+from utils.precompress import is_compressible, negotiate, schedule
+from utils.signed_urls import make_url, verify
+from utils.text_preview import NotTextError, is_previewable, preview_lines
+from utils.zip_stream import should_compress, stream_zip, unique_arcname
+from utils.chunked_upload import ChunkTooLarge, discard, finish_hash, write_chunk
+from utils.download_limiter import DownloadRejected, ThrottledBody, download_limiter
+from utils.identity_cache import identity_cache
 
 files_bp = Blueprint('files', __name__)
 
@@ -28,12 +37,141 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def get_file_size_mb(file):
-    """Get file size in MB"""
-    file.seek(0, 2)  # Seek to end
-    size = file.tell()
-    file.seek(0)  # Reset to beginning
-    return round(size / (1024 * 1024), 2)
+def get_upload_dir():
+    """Directory challenge attachments are stored in"""
+    return os.path.join(current_app.root_path, 'uploads', 'challenges')
+
+def get_partial_dir():
+    """Directory resumable uploads accumulate in until they are finalized"""
+    return os.path.join(current_app.root_path, 'uploads', 'partial')
+
+def offload_file(file_path, accel_uri, download_name):
+    """Bodiless response that hands the transfer to the front-end server
+    
+    FILE_DELIVERY 'x-accel' points nginx at accel_uri, an internal location,
+    with X-Accel-Redirect; 'x-sendfile' gives Apache/lighttpd file_path.
+    The server then sends the file itself, including Range/If-Range handling.
+    """
+    response = send_file(
+        file_path,
+        request.environ,
+        as_attachment=True,
+        download_name=download_name,
+        use_x_sendfile=True,
+        response_class=current_app.response_class,
+        conditional=False,
+        etag=False
+    )
+    
+    if current_app.config['FILE_DELIVERY'] == 'x-accel':
+        del response.headers['X-Sendfile']
+        response.headers['X-Accel-Redirect'] = accel_uri
+    
+    # The server supplies the real length and body
+    response.content_length = 0
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+def attachment_metadata(filename):
+    """Original name from the attachment index and content hash, in one query"""
+    return db.session.query(
+        db.select(ChallengeFile.name).where(ChallengeFile.filename == filename).scalar_subquery(),
+        db.select(StoredFile.sha256).where(StoredFile.filename == filename).scalar_subquery()
+    ).one()
+
+def limit_download(response, user_id, size_bytes=None):
+    """Apply the user's download slot and fair-share rate to a file response
+    
+    Offloaded responses carry the rate to nginx in X-Accel-Limit-Rate; bodies
+    the worker sends are paced and free the slot when they finish.
+    """
+    if not download_limiter.enabled or response.status_code not in (200, 206):
+        return response
+    
+    offloaded = current_app.config['FILE_DELIVERY'] in ('x-accel', 'x-sendfile')
+    try:
+        lease = download_limiter.acquire(user_id, size_bytes if offloaded else None)
+    except DownloadRejected as e:
+        response.close()
+        rejected = jsonify({'error': str(e), 'retry_after': e.retry_after})
+        rejected.headers['Retry-After'] = str(e.retry_after)
+        return rejected, 429
+    
+    if offloaded:
+        # Apache/lighttpd have no per-response equivalent; the slot still counts
+        if lease.rate and current_app.config['FILE_DELIVERY'] == 'x-accel':
+            response.headers['X-Accel-Limit-Rate'] = str(lease.rate)
+            download_limiter.record_offloaded(lease)
+    else:
+        response.response = ThrottledBody(download_limiter, lease, response.response)
+    return response
+
+def serve_attachment(upload_dir, filename, original_filename, sha256, user_id):
+    """Download response for a stored attachment, in the configured delivery mode
+    
+    The content hash is a strong ETag shared by identical files. Text
+    artifacts may have a gzip/zstd variant; each encoding gets its own ETag.
+    Every download counts against user_id's slots and bandwidth.
+    """
+    file_path = os.path.join(upload_dir, filename)
+    encoding, variant = negotiate(sha256, filename, request.accept_encodings)
+    etag = f'{sha256}-{encoding}' if encoding else sha256
+    vary = is_compressible(filename)
+    
+    if current_app.config['FILE_DELIVERY'] in ('x-accel', 'x-sendfile'):
+        if etag and request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            if vary:
+                response.vary.add('Accept-Encoding')
+            return response
+        
+        if encoding:
+            accel_uri = current_app.config['FILE_ACCEL_BLOB_PREFIX'] + os.path.relpath(variant, get_blob_dir())
+            response = offload_file(variant, accel_uri, original_filename)
+        else:
+            accel_uri = current_app.config['FILE_ACCEL_PREFIX'] + filename
+            response = offload_file(file_path, accel_uri, original_filename)
+        if etag:
+            response.set_etag(etag)
+    else:
+        # Served by the worker; conditional responses answer Range, If-Range and If-None-Match
+        if encoding:
+            response = send_from_directory(
+                os.path.dirname(variant),
+                os.path.basename(variant),
+                as_attachment=True,
+                download_name=original_filename,
+                etag=etag
+            )
+        else:
+            response = send_from_directory(
+                upload_dir, 
+                filename, 
+                as_attachment=True,
+                download_name=original_filename,
+                etag=sha256 or True
+            )
+        response.headers['Accept-Ranges'] = 'bytes'
+    
+    if encoding:
+        response.content_encoding = encoding
+    if vary:
+        response.vary.add('Accept-Encoding')
+    return limit_download(response, user_id, os.path.getsize(variant if encoding else file_path))
+
+def build_file_info(original_filename, unique_filename, size_bytes, password, sha256):
+    """Attachment entry returned by every upload path, ready for file_attachments"""
+    return {
+        'id': str(uuid.uuid4()),
+        'name': original_filename,
+        'filename': unique_filename,
+        'size': f"{round(size_bytes / (1024 * 1024), 2)} MB",
+        'size_bytes': size_bytes,
+        'password': password,
+        'sha256': sha256,
+        'uploaded_at': datetime.utcnow().isoformat()
+    }
 
 @files_bp.route('/upload', methods=['POST'])
 @jwt_required()
@@ -42,7 +180,7 @@ def upload_file():
     try:
         # Check if user is admin
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = identity_cache.get(user_id)
         if not user or not user.is_admin:
             return jsonify({'error': 'Admin privileges required'}), 403
         
@@ -60,41 +198,262 @@ def upload_file():
         # Get file password if provided
         password = request.form.get('password', '')
         
-        # Generate unique filename
         original_filename = secure_filename(file.filename)
         file_extension = original_filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"{uuid.uuid4().hex}.{file_extension}"
-        
-        # Create uploads directory if it doesn't exist
-        upload_dir = os.path.join(current_app.root_path, 'uploads', 'challenges')
-        os.makedirs(upload_dir, exist_ok=True)
         
-        # Save file
-        file_path = os.path.join(upload_dir, unique_filename)
-        file.save(file_path)
-        
-        # Get file size
-        file_size_mb = get_file_size_mb(file)
+        # Hash while saving; content that is already stored only gains a link
+        temp_path, sha256, size_bytes = save_stream(file.stream)
+        unique_filename, sha256, size_bytes, deduplicated = store_file(temp_path, file_extension, sha256, size_bytes)
+        db.session.commit()
+        schedule(sha256, unique_filename)
         
         # Return file information
-        file_info = {
-            'id': str(uuid.uuid4()),
-            'name': original_filename,
-            'filename': unique_filename,
-            'size': f"{file_size_mb} MB",
-            'size_bytes': int(file_size_mb * 1024 * 1024),
-            'password': password,
-            'uploaded_at': datetime.utcnow().isoformat()
-        }
+        file_info = build_file_info(original_filename, unique_filename, size_bytes, password, sha256)
         
         return jsonify({
             'message': 'File uploaded successfully',
-            'file': file_info
+            'file': file_info,
+            'deduplicated': deduplicated
         }), 201
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': 'Failed to upload file', 'details': str(e)}), 500
 
+@files_bp.route('/uploads', methods=['POST'])
+@jwt_required()
+def start_chunked_upload():
+    """Start a resumable upload; chunks are then PUT by offset (admin only)"""
+    try:
+        # Check if user is admin
+        user_id = int(get_jwt_identity())
+        user = identity_cache.get(user_id)
+        if not user or not user.is_admin:
+            return jsonify({'error': 'Admin privileges required'}), 403
+        
+        data = request.get_json() or {}
+        original_filename = secure_filename(data.get('filename') or '')
+        if not original_filename:
+            return jsonify({'error': 'No file selected'}), 400
+        
+        if not allowed_file(original_filename):
+            return jsonify({'error': 'File type not allowed'}), 400
+        
+        size = data.get('size')
+        if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+            return jsonify({'error': 'size must be a positive number of bytes'}), 400
+        
+        if size > current_app.config['UPLOAD_MAX_BYTES']:
+            return jsonify({'error': f"File exceeds the {current_app.config['UPLOAD_MAX_BYTES']} byte limit"}), 413
+        
+        upload = UploadSession(
+            id=uuid.uuid4().hex,
+            created_by=user_id,
+            original_name=original_filename,
+            password=data.get('password', ''),
+            total_size=size
+        )
+        
+        # Content already stored: complete immediately without sending any bytes
+        sha256 = (data.get('sha256') or '').lower()
+        if sha256:
+            file_extension = original_filename.rsplit('.', 1)[1].lower()
+            unique_filename = link_existing(sha256, size, file_extension)
+            if unique_filename:
+                upload.received = size
+                upload.status = 'completed'
+                upload.sha256 = sha256
+                upload.stored_filename = unique_filename
+                db.session.add(upload)
+                db.session.commit()
+                schedule(sha256, unique_filename)
+                
+                return jsonify({
+                    'message': 'File uploaded successfully',
+                    'upload': upload.to_dict(),
+                    'file': build_file_info(original_filename, unique_filename, size, upload.password, sha256),
+                    'deduplicated': True
+                }), 201
+        
+        db.session.add(upload)
+        db.session.commit()
+        
+        # Create the empty partial file so every chunk opens it in place
+        partial_dir = get_partial_dir()
+        os.makedirs(partial_dir, exist_ok=True)
+        open(os.path.join(partial_dir, f'{upload.id}.part'), 'wb').close()
+        
+        return jsonify({
+            'upload': upload.to_dict(),
+            'chunk_size': current_app.config['UPLOAD_CHUNK_MAX_BYTES']
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to start upload', 'details': str(e)}), 500
+
+@files_bp.route('/uploads/<upload_id>', methods=['GET'])
+@jwt_required()
+def get_chunked_upload(upload_id):
+    """Current offset of a resumable upload, where the client should resume (admin only)"""
+    try:
+        # Check if user is admin
+        user_id = int(get_jwt_identity())
+        user = identity_cache.get(user_id)
+        if not user or not user.is_admin:
+            return jsonify({'error': 'Admin privileges required'}), 403
+        
+        upload = UploadSession.query.get(upload_id)
+        if not upload:
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        return jsonify({'upload': upload.to_dict()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get upload', 'details': str(e)}), 500
+
+@files_bp.route('/uploads/<upload_id>', methods=['PUT'])
+@jwt_required()
+def put_upload_chunk(upload_id):
+    """Append one chunk (raw request body) at ?offset= or the Upload-Offset header (admin only)"""
+    try:
+        # Check if user is admin
+        user_id = int(get_jwt_identity())
+        user = identity_cache.get(user_id)
+        if not user or not user.is_admin:
+            return jsonify({'error': 'Admin privileges required'}), 403
+        
+        upload = UploadSession.query.get(upload_id)
+        if not upload:
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        if upload.status != 'uploading':
+            return jsonify({'error': 'Upload already finalized', 'upload': upload.to_dict()}), 409
+        
+        offset = request.args.get('offset', request.headers.get('Upload-Offset'))
+        if offset is None or not str(offset).isdigit():
+            return jsonify({'error': 'offset must be a non-negative integer'}), 400
+        offset = int(offset)
+        
+        # Chunks must arrive in order; tell the client where to resume
+        if offset != upload.received:
+            return jsonify({'error': 'Offset does not match the bytes received', 'upload': upload.to_dict()}), 409
+        
+        limit = min(current_app.config['UPLOAD_CHUNK_MAX_BYTES'], upload.total_size - upload.received)
+        if request.content_length is not None and request.content_length > limit:
+            return jsonify({'error': f'Chunk exceeds the {limit} byte limit', 'upload': upload.to_dict()}), 413
+        
+        partial_path = os.path.join(get_partial_dir(), f'{upload.id}.part')
+        try:
+            written = write_chunk(upload.id, partial_path, offset, request.stream, limit)
+        except ChunkTooLarge as e:
+            return jsonify({'error': str(e), 'upload': upload.to_dict()}), 413
+        
+        # Only advance from the offset we wrote at, so concurrent retries cannot skip bytes
+        advanced = db.session.query(UploadSession).filter(
+            UploadSession.id == upload.id,
+            UploadSession.received == offset
+        ).update({
+            UploadSession.received: offset + written,
+            UploadSession.updated_at: datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+        
+        upload = UploadSession.query.get(upload_id)
+        if not advanced:
+            return jsonify({'error': 'Another chunk was written concurrently', 'upload': upload.to_dict()}), 409
+        
+        return jsonify({'upload': upload.to_dict()}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to store chunk', 'details': str(e)}), 500
+
+@files_bp.route('/uploads/<upload_id>/finalize', methods=['POST'])
+@jwt_required()
+def finalize_chunked_upload(upload_id):
+    """Verify a completed upload and move it into the challenge attachments (admin only)"""
+    try:
+        # Check if user is admin
+        user_id = int(get_jwt_identity())
+        user = identity_cache.get(user_id)
+        if not user or not user.is_admin:
+            return jsonify({'error': 'Admin privileges required'}), 403
+        
+        upload = UploadSession.query.get(upload_id)
+        if not upload:
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        if upload.status != 'uploading':
+            return jsonify({'error': 'Upload already finalized', 'upload': upload.to_dict()}), 409
+        
+        if upload.received != upload.total_size:
+            return jsonify({'error': 'Upload is incomplete', 'upload': upload.to_dict()}), 409
+        
+        partial_path = os.path.join(get_partial_dir(), f'{upload.id}.part')
+        digest = finish_hash(upload.id, partial_path, upload.total_size)
+        
+        data = request.get_json(silent=True) or {}
+        expected = (data.get('sha256') or '').lower()
+        if expected and expected != digest:
+            return jsonify({'error': 'Checksum mismatch', 'sha256': digest, 'upload': upload.to_dict()}), 422
+        
+        file_extension = upload.original_name.rsplit('.', 1)[1].lower()
+        unique_filename, digest, size_bytes, deduplicated = store_file(
+            partial_path, file_extension, digest, upload.total_size
+        )
+        
+        upload.status = 'completed'
+        upload.sha256 = digest
+        upload.stored_filename = unique_filename
+        db.session.commit()
+        schedule(digest, unique_filename)
+        
+        # Same shape as a single-request upload
+        file_info = build_file_info(upload.original_name, unique_filename, size_bytes, upload.password or '', digest)
+        
+        return jsonify({
+            'message': 'File uploaded successfully',
+            'file': file_info,
+            'deduplicated': deduplicated
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to finalize upload', 'details': str(e)}), 500
+
+@files_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@jwt_required()
+def abort_chunked_upload(upload_id):
+    """Abandon a resumable upload and remove its partial data (admin only)"""
+    try:
+        # Check if user is admin
+        user_id = int(get_jwt_identity())
+        user = identity_cache.get(user_id)
+        if not user or not user.is_admin:
+            return jsonify({'error': 'Admin privileges required'}), 403
+        
+        upload = UploadSession.query.get(upload_id)
+        if not upload:
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        if upload.status != 'uploading':
+            return jsonify({'error': 'Upload already finalized'}), 409
+        
+        partial_path = os.path.join(get_partial_dir(), f'{upload.id}.part')
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        discard(upload.id)
+        
+        db.session.delete(upload)
+        db.session.commit()
+        
+        return jsonify({'message': 'Upload cancelled'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to cancel upload', 'details': str(e)}), 500
+
 @files_bp.route('/download/<filename>', methods=['GET'])
 @jwt_required()
 def download_file(filename):
@@ -102,7 +461,7 @@ def download_file(filename):
     try:
         # Check if user is authenticated
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = identity_cache.get(user_id)
         if not user:
             return jsonify({'error': 'Authentication required'}), 401
         
@@ -111,36 +470,165 @@ def download_file(filename):
             return jsonify({'error': 'Invalid filename'}), 400
         
         # Get file path
-        upload_dir = os.path.join(current_app.root_path, 'uploads', 'challenges')
+        upload_dir = get_upload_dir()
         file_path = os.path.join(upload_dir, filename)
         
         # Check if file exists
         if not os.path.exists(file_path):
             return jsonify({'error': 'File not found'}), 404
         
-        # Get original filename from challenge data (if available)
-        # For now, we'll use the stored filename
-        original_filename = filename
-        
-        # Find the challenge that contains this file
-        challenges = Challenge.query.all()
-        for challenge in challenges:
-            if challenge.file_attachments:
-                for file_attachment in challenge.file_attachments:
-                    if file_attachment.get('filename') == filename:
-                        original_filename = file_attachment.get('name', filename)
-                        break
-        
-        return send_from_directory(
-            upload_dir, 
-            filename, 
-            as_attachment=True,
-            download_name=original_filename
+        # Original filename from the attachment index (falls back to the stored name)
+        original_name, sha256 = attachment_metadata(filename)
+        original_filename = original_name or filename
+        
+        return serve_attachment(upload_dir, filename, original_filename, sha256, user_id)
+        
+    except HTTPException:
+        # e.g. 416 Range Not Satisfiable
+        raise
+    except Exception as e:
+        return jsonify({'error': 'Failed to download file', 'details': str(e)}), 500
+
+@files_bp.route('/download-url/<filename>', methods=['GET'])
+@jwt_required()
+def get_download_url(filename):
+    """Issue a short-lived signed URL for a challenge file (authenticated users only)"""
+    try:
+        # Check if user is authenticated
+        user_id = int(get_jwt_identity())
+        user = identity_cache.get(user_id)
+        if not user or not user.is_active:
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        # Security: Only allow alphanumeric filenames with dots
+        if not filename.replace('.', '').replace('-', '').replace('_', '').isalnum():
+            return jsonify({'error': 'Invalid filename'}), 400
+        
+        if not os.path.exists(os.path.join(get_upload_dir(), filename)):
+            return jsonify({'error': 'File not found'}), 404
+        
+        original_name, sha256 = attachment_metadata(filename)
+        url, expires = make_url(filename, user_id, sha256, original_name or filename)
+        
+        return jsonify({
+            'url': url,
+            'expires_at': datetime.utcfromtimestamp(expires).isoformat(),
+            'expires_in': current_app.config['FILE_URL_TTL']
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to create download link', 'details': str(e)}), 500
+
+@files_bp.route('/signed/<filename>', methods=['GET'])
+def download_signed_file(filename):
+    """Download a challenge file with a signed URL; checked without any database access"""
+    try:
+        # Security: Only allow alphanumeric filenames with dots
+        if not filename.replace('.', '').replace('-', '').replace('_', '').isalnum():
+            return jsonify({'error': 'Invalid filename'}), 400
+        
+        valid, error, status = verify(filename, request.args)
+        if not valid:
+            return jsonify({'error': error}), status
+        
+        upload_dir = get_upload_dir()
+        if not os.path.exists(os.path.join(upload_dir, filename)):
+            return jsonify({'error': 'File not found'}), 404
+        
+        # Name and hash were signed along with the file, so they need no lookup
+        original_filename = request.args.get('name') or filename
+        return serve_attachment(
+            upload_dir,
+            filename,
+            original_filename,
+            request.args.get('h') or None,
+            int(request.args['uid'])
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': 'Failed to download file', 'details': str(e)}), 500
 
+@files_bp.route('/preview/<filename>', methods=['GET'])
+@jwt_required()
+def preview_file(filename):
+    """First lines, or ?start=&lines= range, of a text attachment (authenticated users only)"""
+    try:
+        # Check if user is authenticated
+        user_id = int(get_jwt_identity())
+        user = identity_cache.get(user_id)
+        if not user:
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        # Security: Only allow alphanumeric filenames with dots
+        if not filename.replace('.', '').replace('-', '').replace('_', '').isalnum():
+            return jsonify({'error': 'Invalid filename'}), 400
+        
+        if not is_previewable(filename):
+            return jsonify({'error': 'Preview is only available for text files'}), 415
+        
+        file_path = os.path.join(get_upload_dir(), filename)
+        if not os.path.exists(file_path):
+            return jsonify({'error': 'File not found'}), 404
+        
+        start = request.args.get('start', 1, type=int)
+        count = request.args.get('lines', 100, type=int)
+        
+        try:
+            preview = preview_lines(file_path, start, count)
+        except NotTextError as e:
+            return jsonify({'error': str(e)}), 415
+        
+        original_name = db.session.query(ChallengeFile.name).filter_by(filename=filename).scalar()
+        preview.update({'filename': filename, 'name': original_name or filename})
+        return jsonify(preview), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to preview file', 'details': str(e)}), 500
+
+@files_bp.route('/challenge/<int:challenge_id>/archive', methods=['GET'])
+@jwt_required()
+def download_challenge_archive(challenge_id):
+    """Stream a ZIP of every attachment of a challenge (authenticated users only)"""
+    try:
+        # Check if user is authenticated
+        user_id = int(get_jwt_identity())
+        user = identity_cache.get(user_id)
+        if not user:
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        challenge = Challenge.query.get(challenge_id)
+        if not challenge or not (challenge.is_published or user.is_admin):
+            return jsonify({'error': 'Challenge not found'}), 404
+        
+        upload_dir = get_upload_dir()
+        entries = []
+        used_names = set()
+        for challenge_file in challenge.files.order_by(ChallengeFile.id):
+            path = os.path.join(upload_dir, challenge_file.filename)
+            if not os.path.isfile(path):
+                continue
+            
+            # Players see the original names; the stored extension decides store vs deflate
+            arcname = unique_arcname(secure_filename(challenge_file.name or '') or challenge_file.filename, used_names)
+            entries.append((arcname, path, should_compress(challenge_file.filename)))
+        
+        if not entries:
+            return jsonify({'error': 'Challenge has no files'}), 404
+        
+        # Written while it is sent; memory is bounded by the zip_stream chunk size
+        archive_name = f"{challenge.slug}-files.zip"
+        response = Response(
+            stream_zip(entries),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="{archive_name}"'}
+        )
+        return limit_download(response, user_id)
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to download files', 'details': str(e)}), 500
+
 @files_bp.route('/list', methods=['GET'])
 @jwt_required()
 def list_files():
@@ -148,29 +636,35 @@ def list_files():
     try:
         # Check if user is admin
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = identity_cache.get(user_id)
         if not user or not user.is_admin:
             return jsonify({'error': 'Admin privileges required'}), 403
         
-        # Get all challenges with file attachments
-        challenges = Challenge.query.all()
-        files = []
-        
-        for challenge in challenges:
-            if challenge.file_attachments:
-                for file_attachment in challenge.file_attachments:
-                    file_info = {
-                        'id': file_attachment.get('id'),
-                        'name': file_attachment.get('name'),
-                        'filename': file_attachment.get('filename'),
-                        'size': file_attachment.get('size'),
-                        'challenge_id': challenge.id,
-                        'challenge_title': challenge.title,
-                        'uploaded_at': file_attachment.get('uploaded_at')
-                    }
-                    files.append(file_info)
-        
-        return jsonify({'files': files}), 200
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 50, type=int), 1), 200)
+        
+        query = db.session.query(ChallengeFile, Challenge.title).join(
+            Challenge, Challenge.id == ChallengeFile.challenge_id
+        )
+        challenge_id = request.args.get('challenge_id', type=int)
+        if challenge_id:
+            query = query.filter(ChallengeFile.challenge_id == challenge_id)
+        
+        total = query.count()
+        rows = query.order_by(ChallengeFile.id.desc()).limit(per_page).offset((page - 1) * per_page).all()
+        pages = (total + per_page - 1) // per_page
+        
+        return jsonify({
+            'files': [challenge_file.to_dict(challenge_title=title) for challenge_file, title in rows],
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': total,
+                'pages': pages,
+                'has_next': page < pages,
+                'has_prev': page > 1
+            }
+        }), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to list files', 'details': str(e)}), 500
@@ -182,7 +676,7 @@ def delete_file(filename):
     try:
         # Check if user is admin
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = identity_cache.get(user_id)
         if not user or not user.is_admin:
             return jsonify({'error': 'Admin privileges required'}), 403
         
@@ -191,30 +685,30 @@ def delete_file(filename):
             return jsonify({'error': 'Invalid filename'}), 400
         
         # Get file path
-        upload_dir = os.path.join(current_app.root_path, 'uploads', 'challenges')
+        upload_dir = get_upload_dir()
         file_path = os.path.join(upload_dir, filename)
         
         # Check if file exists
         if not os.path.exists(file_path):
             return jsonify({'error': 'File not found'}), 404
         
-        # Remove file from disk
-        os.remove(file_path)
-        
-        # Remove file reference from challenges
-        challenges = Challenge.query.all()
-        for challenge in challenges:
-            if challenge.file_attachments:
-                updated_files = []
-                for file_attachment in challenge.file_attachments:
-                    if file_attachment.get('filename') != filename:
-                        updated_files.append(file_attachment)
-                
-                if len(updated_files) != len(challenge.file_attachments):
-                    challenge.file_attachments = updated_files
-                    db.session.commit()
+        # Remove this filename; the stored content goes only with its last reference
+        released = release(filename)
+        
+        # Remove the file reference from the challenge that owns it
+        challenge_file = ChallengeFile.query.filter_by(filename=filename).first()
+        if challenge_file:
+            challenge = challenge_file.challenge
+            challenge.file_attachments = [
+                file_attachment for file_attachment in challenge.file_attachments or []
+                if not (isinstance(file_attachment, dict) and file_attachment.get('filename') == filename)
+            ]
+            db.session.delete(challenge_file)
+        db.session.commit()
+        remove_released(released)
         
         return jsonify({'message': 'File deleted successfully'}), 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': 'Failed to delete file', 'details': str(e)}), 500
@@ -1,13 +1,17 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime, timedelta
+from sqlalchemy.orm import joinedload
+from datetime import datetime, timedelta, timezone
+import re
 import sys
 import os
 
 from database import db
 from models.user import User
-from models.challenge import Challenge, Submission
+from models.challenge import Challenge, ChallengeCategory, Submission
 from models.progress import UserProgress
+from models.stats import UserStatsRollup
+from utils.timezones import get_timezone, local_today
 
 progress_bp = Blueprint('progress', __name__)
 
@@ -92,104 +96,195 @@ def get_user_stats():
     """Get detailed statistics for the current user"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
         
-        if not user:
+        # User row and stats rollup in a single primary-key lookup
+        result = db.session.query(User, UserStatsRollup).outerjoin(
+            UserStatsRollup, UserStatsRollup.user_id == User.id
+        ).filter(User.id == user_id).first()
+        
+        if not result:
             return jsonify({'error': 'User not found'}), 404
         
-        # Basic user stats
-        user_stats = user.to_dict(include_sensitive=True)
-        
-        # Progress by category
-        category_progress = db.session.query(
-            Challenge.category_id,
-            db.func.count(Submission.id).label('completed'),
-            db.func.sum(Submission.points_awarded).label('points')
-        ).join(
-            Submission, Challenge.id == Submission.challenge_id
-        ).filter(
-            Submission.user_id == user_id,
-            Submission.is_correct == True
-        ).group_by(Challenge.category_id).all()
-        
-        # Progress by difficulty
-        difficulty_progress = db.session.query(
-            Challenge.difficulty,
-            db.func.count(Submission.id).label('completed'),
-            db.func.sum(Submission.points_awarded).label('points')
-        ).join(
-            Submission, Challenge.id == Submission.challenge_id
-        ).filter(
-            Submission.user_id == user_id,
-            Submission.is_correct == True
-        ).group_by(Challenge.difficulty).all()
-        
-        # Recent activity (last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        recent_submissions = Submission.query.filter(
-            Submission.user_id == user_id,
-            Submission.submitted_at >= thirty_days_ago
-        ).order_by(Submission.submitted_at.desc()).limit(10).all()
-        
-        # Activity streak (consecutive days with submissions)
-        streak = calculate_activity_streak(user_id)
-        
-        # Average completion time
-        avg_completion_time = db.session.query(
-            db.func.avg(Submission.completion_time)
-        ).filter(
-            Submission.user_id == user_id,
-            Submission.is_correct == True,
-            Submission.completion_time.isnot(None)
-        ).scalar() or 0
+        user, rollup = result
+        return jsonify(build_user_stats(user, rollup)), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch user stats', 'details': str(e)}), 500
+
+def build_user_stats(user, rollup):
+    """Build the user-stats payload from a loaded user and their rollup (may be None)"""
+    if rollup is None:
+        # First visit since the rollup table was introduced
+        UserStatsRollup.rebuild([user.id])
+        rollup = UserStatsRollup.query.get(user.id)
+    
+    # Recent activity (last 30 days)
+    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+    recent_submissions = Submission.query.options(
+        joinedload(Submission.challenge)
+    ).filter(
+        Submission.user_id == user.id,
+        Submission.submitted_at >= thirty_days_ago
+    ).order_by(Submission.submitted_at.desc()).limit(10).all()
+    
+    return {
+        'user_stats': user.to_dict(include_sensitive=True),
+        **rollup.to_dict(get_timezone(user.timezone)),
+        'recent_activity': [sub.to_dict() for sub in recent_submissions]
+    }
+
+@progress_bp.route('/activity-heatmap', methods=['GET'])
+@jwt_required()
+def get_activity_heatmap():
+    """Get per-day activity counts and streaks for the current user"""
+    try:
+        user_id = int(get_jwt_identity())
+        days = max(1, min(request.args.get('days', 365, type=int), 366))
+        
+        result = db.session.query(User.timezone, UserStatsRollup).outerjoin(
+            UserStatsRollup, UserStatsRollup.user_id == User.id
+        ).filter(User.id == user_id).first()
+        
+        if not result:
+            return jsonify({'error': 'User not found'}), 404
+        
+        timezone_name, rollup = result
+        if rollup is None:
+            UserStatsRollup.rebuild([user_id])
+            rollup = UserStatsRollup.query.get(user_id)
+        
+        tz = get_timezone(timezone_name)
+        today = local_today(tz)
         
         return jsonify({
-            'user_stats': user_stats,
-            'category_progress': [
-                {
-                    'category_id': cat_id,
-                    'completed': completed,
-                    'points': points or 0
-                } for cat_id, completed, points in category_progress
-            ],
-            'difficulty_progress': [
-                {
-                    'difficulty': difficulty,
-                    'completed': completed,
-                    'points': points or 0
-                } for difficulty, completed, points in difficulty_progress
-            ],
-            'recent_activity': [sub.to_dict() for sub in recent_submissions],
-            'activity_streak': streak,
-            'avg_completion_time': round(avg_completion_time, 2) if avg_completion_time else 0
+            'timezone': str(tz),
+            'heatmap': rollup.get_heatmap(today, days),
+            'current_streak': rollup.get_activity_streak(today),
+            'longest_streak': rollup.longest_streak or 0,
+            'last_active_date': rollup.last_active_date.isoformat() if rollup.last_active_date else None
         }), 200
         
     except Exception as e:
-        return jsonify({'error': 'Failed to fetch user stats', 'details': str(e)}), 500
+        return jsonify({'error': 'Failed to fetch activity heatmap', 'details': str(e)}), 500
 
 @progress_bp.route('/bookmarks', methods=['GET'])
 @jwt_required()
 def get_bookmarks():
-    """Get user's bookmarked challenges"""
+    """Get user's bookmarked challenges, or changes since a timestamp with ?since="""
     try:
         user_id = int(get_jwt_identity())
         
-        bookmarked_progress = UserProgress.query.filter_by(
-            user_id=user_id,
-            is_bookmarked=True
-        ).join(Challenge).filter(Challenge.is_published == True).all()
+        since = None
+        if request.args.get('since'):
+            try:
+                since = parse_since(request.args['since'])
+            except ValueError:
+                return jsonify({'error': 'since must be an ISO 8601 timestamp'}), 400
         
-        bookmarks = []
-        for progress in bookmarked_progress:
-            bookmark_data = progress.to_dict()
-            bookmark_data['challenge'] = progress.challenge.to_dict() if hasattr(progress, 'challenge') else None
-            bookmarks.append(bookmark_data)
+        synced_at = datetime.utcnow()
+        bookmarks, removed = build_bookmarks(user_id, since=since)
         
-        return jsonify({'bookmarks': bookmarks}), 200
+        data = {'bookmarks': bookmarks, 'synced_at': synced_at.isoformat()}
+        if since:
+            data['removed'] = removed
+        
+        return jsonify(data), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to fetch bookmarks', 'details': str(e)}), 500
 
+def parse_since(value):
+    """Parse an ISO 8601 timestamp into naive UTC, the form the progress columns use
+    
+    Accepts a Z suffix or any UTC offset; a timestamp without one is taken as UTC.
+    """
+    value = value.strip()
+    if value.endswith(('Z', 'z')):
+        value = value[:-1] + '+00:00'
+    elif 'T' in value:
+        # An unencoded '+' in a query string arrives as a space
+        value = re.sub(r' (\d{2}:?\d{2})$', r'+\1', value)
+    
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def build_bookmarks(user_id, since=None):
+    """Bookmarked challenges as compact cards from one joined query
+    
+    Returns (bookmarks, removed_challenge_ids). With `since`, only rows whose
+    bookmark changed after that time are considered, including removals.
+    """
+    solves = db.session.query(
+        db.func.count(Submission.id)
+    ).filter(
+        Submission.challenge_id == Challenge.id,
+        Submission.is_correct == True
+    ).correlate(Challenge).scalar_subquery()
+    
+    query = db.session.query(
+        UserProgress,
+        Challenge.id,
+        Challenge.title,
+        Challenge.slug,
+        Challenge.difficulty,
+        Challenge.challenge_type,
+        Challenge.points,
+        Challenge.is_featured,
+        Challenge.total_attempts,
+        Challenge.successful_attempts,
+        ChallengeCategory.id,
+        ChallengeCategory.name,
+        ChallengeCategory.icon,
+        ChallengeCategory.color,
+        solves.label('solves')
+    ).join(
+        Challenge, Challenge.id == UserProgress.challenge_id
+    ).outerjoin(
+        ChallengeCategory, ChallengeCategory.id == Challenge.category_id
+    ).filter(
+        UserProgress.user_id == user_id,
+        Challenge.is_published == True
+    )
+    
+    if since:
+        query = query.filter(UserProgress.bookmark_updated_at > since)
+    else:
+        query = query.filter(UserProgress.is_bookmarked == True)
+    
+    bookmarks = []
+    removed = []
+    for (progress, challenge_id, title, slug, difficulty, challenge_type, points, is_featured,
+         total_attempts, successful_attempts, category_id, category_name, category_icon,
+         category_color, solve_count) in query.order_by(UserProgress.bookmark_updated_at.desc()):
+        if not progress.is_bookmarked:
+            removed.append(challenge_id)
+            continue
+        
+        bookmark_data = progress.to_dict()
+        bookmark_data['bookmark_updated_at'] = progress.bookmark_updated_at.isoformat() if progress.bookmark_updated_at else None
+        bookmark_data['challenge'] = {
+            'id': challenge_id,
+            'title': title,
+            'slug': slug,
+            'difficulty': difficulty,
+            'challenge_type': challenge_type,
+            'points': points,
+            'is_featured': is_featured,
+            'solves': solve_count,
+            'success_rate': round((successful_attempts / max(total_attempts, 1)) * 100, 1),
+            'category': {
+                'id': category_id,
+                'name': category_name,
+                'icon': category_icon,
+                'color': category_color
+            } if category_id else None
+        }
+        bookmarks.append(bookmark_data)
+    
+    return bookmarks, removed
+
 @progress_bp.route('/bookmarks/<int:challenge_id>', methods=['POST'])
 @jwt_required()
 def toggle_bookmark(challenge_id):
@@ -219,6 +314,7 @@ def toggle_bookmark(challenge_id):
             progress.is_bookmarked = not progress.is_bookmarked
         
         progress.last_accessed = datetime.utcnow()
+        progress.bookmark_updated_at = progress.last_accessed
         db.session.commit()
         
         action = 'added to' if progress.is_bookmarked else 'removed from'
@@ -274,33 +370,3 @@ def update_notes(challenge_id):
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to update notes', 'details': str(e)}), 500
-
-def calculate_activity_streak(user_id):
-    """Calculate consecutive days with challenge submissions"""
-    try:
-        # Get unique submission dates in descending order
-        submission_dates = db.session.query(
-            db.func.date(Submission.submitted_at).label('submission_date')
-        ).filter(
-            Submission.user_id == user_id
-        ).distinct().order_by(
-            db.func.date(Submission.submitted_at).desc()
-        ).all()
-        
-        if not submission_dates:
-            return 0
-        
-        streak = 0
-        current_date = datetime.utcnow().date()
-        
-        for submission_date, in submission_dates:
-            if submission_date == current_date or submission_date == current_date - timedelta(days=streak):
-                streak += 1
-                current_date = submission_date
-            else:
-                break
-        
-        return streak
-        
-    except Exception:
-        return 0
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Check the upload store against challenge attachment metadata
+Reports orphaned files, missing attachments and disk usage; --reclaim also
+removes orphans and abandoned chunked uploads older than the grace period
+
+Usage: python scan_uploads.py [--reclaim] [--grace-hours N]
+"""
+
+import sys
+import os
+import argparse
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from database import db
+from models.job import AdminJob
+from utils.admin_jobs import run_job
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+def scan_uploads(reclaim=False, grace_hours=None):
+    """Run a scan as an admin job and print its report"""
+    with app.app_context():
+        if grace_hours is not None:
+            app.config['UPLOAD_ORPHAN_GRACE_HOURS'] = grace_hours
+        
+        job = AdminJob(job_type='scan_uploads', target_id=0, target_label='reclaim' if reclaim else 'report')
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+    
+    run_job(app, job_id)
+    
+    with app.app_context():
+        job = AdminJob.query.get(job_id)
+        if job.status != 'completed':
+            print(f"Scan failed: {job.error}")
+            return False
+        
+        report = job.result
+        usage = report['usage_bytes']
+        print(f"Scanned {report['entries_scanned']} files")
+        print(f"Disk usage: {format_bytes(usage['on_disk'])} "
+              f"(blobs {format_bytes(usage['blobs'])}, variants {format_bytes(usage['variants'])}, "
+              f"partial {format_bytes(usage['partial'])}; tracked blobs {format_bytes(usage['tracked_blobs'])})")
+        
+        for category, finding in sorted(report['findings'].items()):
+            print(f"{category}: {finding['count']} ({format_bytes(finding['bytes'])})")
+            for item in finding['items']:
+                print(f"  {item}")
+        
+        if reclaim:
+            print(f"Reclaimed {format_bytes(report['reclaimed_bytes'])}")
+    return True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scan the upload store for orphaned and missing files')
+    parser.add_argument('--reclaim', action='store_true', help='Delete orphans and abandoned uploads')
+    parser.add_argument('--grace-hours', type=int, help='Ignore files younger than this (default UPLOAD_ORPHAN_GRACE_HOURS)')
+    args = parser.parse_args()
+    
+    print("Scanning upload store...")
+    if not scan_uploads(args.reclaim, args.grace_hours):
+        sys.exit(1)
+    print("Scan completed!")
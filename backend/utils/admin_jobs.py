@@ -0,0 +1,292 @@
+"""
+Background runner for destructive admin operations
+
+Jobs are recorded in the admin_jobs table and executed on a daemon thread in
+the worker that accepted the request, so any worker can report progress.
+Rows are deleted in bounded chunks, each in its own short transaction, then
+only the affected users' totals and stats rollups are recomputed, followed
+by a single full re-rank.
+Jobs that checkpoint into job.result (recompute_stats) can be re-run to resume.
+
+While a job runs, a companion thread refreshes its heartbeat_at. A worker
+restart kills the job thread with it, so pending or running jobs whose
+heartbeat is older than ADMIN_JOB_STALE_SECONDS are marked failed (at startup
+and before every in-flight check) and can be started again.
+"""
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import update
+
+from database import db
+from models.challenge import Challenge, Submission
+from models.job import AdminJob
+from models.password_reset import PasswordReset
+from models.progress import UserAchievement, UserProgress
+from models.stats import UserStatsRollup
+from models.user import User
+from utils.cache import SUBMISSIONS_GENERATION, shared_cache
+from utils.identity_cache import identity_cache
+from utils.upload_scanner import scan_uploads
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_STALE_SECONDS = 120
+HEARTBEAT_INTERVAL = 15
+IN_FLIGHT_STATUSES = ['pending', 'running']
+
+JOB_HANDLERS = {}
+
+def job_handler(job_type):
+    """Register a function(job) that performs a job type"""
+    def decorator(f):
+        JOB_HANDLERS[job_type] = f
+        return f
+    return decorator
+
+def start_job(job_type, target_id, created_by, target_label=None):
+    """Record a job and start it in the background; returns the pending job"""
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job type: {job_type}')
+    
+    job = AdminJob(
+        job_type=job_type,
+        target_id=target_id,
+        target_label=target_label,
+        created_by=created_by,
+        heartbeat_at=datetime.utcnow()
+    )
+    db.session.add(job)
+    db.session.commit()
+    
+    thread = threading.Thread(
+        target=run_job,
+        args=(current_app._get_current_object(), job.id),
+        name=f'admin-job-{job.id}',
+        daemon=True
+    )
+    thread.start()
+    return job
+
+def fail_stale_jobs():
+    """Mark pending/running jobs whose heartbeat stopped as failed; returns how many"""
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=current_app.config.get('ADMIN_JOB_STALE_SECONDS', DEFAULT_STALE_SECONDS))
+    failed = AdminJob.query.filter(
+        AdminJob.status.in_(IN_FLIGHT_STATUSES),
+        db.func.coalesce(AdminJob.heartbeat_at, AdminJob.created_at) < cutoff
+    ).update({
+        'status': 'failed',
+        'error': 'Interrupted: the worker running this job stopped; start it again to resume',
+        'finished_at': now
+    }, synchronize_session=False)
+    db.session.commit()
+    return failed
+
+def find_in_flight(job_type, target_id=None):
+    """The live pending or running job of this type (and target), if any"""
+    fail_stale_jobs()
+    query = AdminJob.query.filter(
+        AdminJob.job_type == job_type,
+        AdminJob.status.in_(IN_FLIGHT_STATUSES)
+    )
+    if target_id is not None:
+        query = query.filter(AdminJob.target_id == target_id)
+    return query.first()
+
+def _heartbeat(app, job_id, stop):
+    """Refresh a job's heartbeat_at until stop is set, on a connection of its own"""
+    table = AdminJob.__table__
+    while not stop.wait(HEARTBEAT_INTERVAL):
+        try:
+            with app.app_context(), db.engine.begin() as conn:
+                conn.execute(update(table).where(table.c.id == job_id).values(heartbeat_at=datetime.utcnow()))
+        except Exception as e:
+            print(f"Admin job {job_id} heartbeat failed: {e}")
+
+def run_job(app, job_id):
+    """Execute a job inside its own app context and record the outcome"""
+    stop = threading.Event()
+    threading.Thread(
+        target=_heartbeat,
+        args=(app, job_id, stop),
+        name=f'admin-job-{job_id}-heartbeat',
+        daemon=True
+    ).start()
+    
+    try:
+        _run_job(app, job_id)
+    finally:
+        stop.set()
+
+def _run_job(app, job_id):
+    with app.app_context():
+        job = AdminJob.query.get(job_id)
+        try:
+            job.status = 'running'
+            job.started_at = job.started_at or datetime.utcnow()
+            job.heartbeat_at = datetime.utcnow()
+            job.error = None
+            db.session.commit()
+            
+            job.result = JOB_HANDLERS[job.job_type](job)
+            job.status = 'completed'
+            
+            # Every job type changes submissions or the figures derived from them
+            shared_cache.bump_generation(SUBMISSIONS_GENERATION)
+        except Exception as e:
+            db.session.rollback()
+            job = AdminJob.query.get(job_id)
+            job.status = 'failed'
+            job.error = str(e)
+            print(f"Admin job {job_id} failed: {e}")
+        
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        db.session.remove()
+
+def delete_in_chunks(job, model, condition, chunk_size=None):
+    """Delete matching rows chunk_size at a time, committing and reporting after each chunk"""
+    chunk_size = chunk_size or current_app.config.get('ADMIN_JOB_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    deleted = 0
+    
+    while True:
+        ids = [row_id for row_id, in db.session.query(model.id).filter(condition).limit(chunk_size)]
+        if not ids:
+            break
+        
+        db.session.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+        job.processed += len(ids)
+        db.session.commit()
+        deleted += len(ids)
+    
+    return deleted
+
+@job_handler('clear_challenge_submissions')
+def clear_challenge_submissions(job):
+    """Delete every submission for a challenge and recompute the users who had one"""
+    challenge = Challenge.query.get(job.target_id)
+    if not challenge:
+        raise ValueError('Challenge not found')
+    
+    affected_user_ids = [
+        user_id for user_id, in db.session.query(Submission.user_id).filter_by(
+            challenge_id=challenge.id
+        ).distinct()
+    ]
+    
+    job.total = challenge.submissions.count()
+    db.session.commit()
+    
+    cleared = delete_in_chunks(job, Submission, Submission.challenge_id == challenge.id)
+    
+    challenge = Challenge.query.get(job.target_id)
+    challenge.total_attempts = 0
+    challenge.successful_attempts = 0
+    challenge.reset_completion_stats()
+    challenge.updated_at = datetime.utcnow()
+    db.session.commit()
+    
+    User.recompute_totals(affected_user_ids)
+    reranked = User.update_rankings()
+    UserStatsRollup.rebuild(affected_user_ids)
+    
+    return {
+        'cleared_count': cleared,
+        'affected_users': len(affected_user_ids),
+        'reranked_users': reranked
+    }
+
+@job_handler('delete_user')
+def delete_user(job):
+    """Delete a user's dependent rows in chunks, then the user, then close the ranking gap"""
+    user = User.query.get(job.target_id)
+    if not user:
+        raise ValueError('User not found')
+    
+    deleted_user = {'id': user.id, 'username': user.username, 'email': user.email}
+    
+    dependents = [
+        (Submission, Submission.user_id == user.id),
+        (UserProgress, UserProgress.user_id == user.id),
+        (UserAchievement, UserAchievement.user_id == user.id),
+        (PasswordReset, PasswordReset.user_id == user.id)
+    ]
+    job.total = sum(model.query.filter(condition).count() for model, condition in dependents)
+    db.session.commit()
+    
+    deleted_counts = {}
+    for model, condition in dependents:
+        deleted_counts[model.__tablename__] = delete_in_chunks(job, model, condition)
+    
+    # Relationships are empty now, so the ORM delete is a few single-row statements
+    user = User.query.get(job.target_id)
+    db.session.delete(user)
+    db.session.commit()
+    identity_cache.invalidate(job.target_id)
+    
+    reranked = User.update_rankings()
+    
+    return {
+        'deleted_user': deleted_user,
+        'deleted_rows': deleted_counts,
+        'reranked_users': reranked
+    }
+
+@job_handler('recompute_stats')
+def recompute_stats(job):
+    """Rebuild user totals, challenge counters and ranks, resuming from job.result"""
+    batch_size = current_app.config.get('ADMIN_JOB_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    checkpoint = dict(job.result or {'phase': 'users', 'last_id': 0, 'changed': {}})
+    
+    if not job.total:
+        job.total = User.query.count() + Challenge.query.count()
+        db.session.commit()
+    
+    def save(**updates):
+        checkpoint.update(updates)
+        job.result = dict(checkpoint)
+        db.session.commit()
+    
+    phases = [
+        ('users', User.id, User.recompute_totals_range),
+        ('challenges', Challenge.id, Challenge.recompute_counters_range)
+    ]
+    for phase, id_column, recompute_range in phases:
+        if checkpoint['phase'] != phase:
+            continue
+        
+        # Walk the table in primary key order; each batch commits with its checkpoint
+        while True:
+            last_id = db.session.query(id_column).filter(
+                id_column > checkpoint['last_id']
+            ).order_by(id_column).offset(batch_size - 1).limit(1).scalar()
+            upper_id = last_id if last_id is not None else db.session.query(db.func.max(id_column)).scalar()
+            if upper_id is None or upper_id <= checkpoint['last_id']:
+                break
+            
+            changed, scanned = recompute_range(checkpoint['last_id'], upper_id)
+            job.processed += scanned
+            counts = dict(checkpoint['changed'])
+            counts[phase] = counts.get(phase, 0) + changed
+            save(last_id=upper_id, changed=counts)
+        
+        next_phase = 'challenges' if phase == 'users' else 'ranks'
+        save(phase=next_phase, last_id=0)
+    
+    if checkpoint['phase'] == 'ranks':
+        counts = dict(checkpoint['changed'])
+        counts['ranks'] = User.update_rankings()
+        save(phase='done', changed=counts)
+    
+    return dict(checkpoint)
+
+@job_handler('scan_uploads')
+def scan_upload_store(job):
+    """Cross-check the upload store against attachment metadata; target_label 'reclaim' also cleans up"""
+    def progress(entries):
+        job.processed = entries
+        job.total = max(job.total, entries)
+        db.session.commit()
+    
+    return scan_uploads(reclaim=job.target_label == 'reclaim', progress=progress)
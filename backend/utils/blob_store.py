@@ -0,0 +1,191 @@
+"""
+Content-addressed storage for challenge attachments
+
+Bytes are kept once per SHA-256 under uploads/blobs/<aa>/<sha256>. Every
+attachment filename in uploads/challenges is a hard link to its blob, so
+downloads, X-Accel-Redirect and existing file_attachments are unchanged.
+file_blobs counts the filenames sharing each blob and stored_files maps a
+filename to its hash; uploading known content only adds a link and a row.
+Callers commit; blob files are only removed after the commit succeeds.
+"""
+import hashlib
+import os
+import shutil
+import uuid
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models.upload import FileBlob, StoredFile
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Precompressed variants kept next to a blob, by Content-Encoding
+VARIANT_SUFFIXES = {'zstd': '.zst', 'gzip': '.gz'}
+
+def get_blob_dir():
+    """Directory blobs are stored in, fanned out by the first two hex digits"""
+    return os.path.join(current_app.root_path, 'uploads', 'blobs')
+
+def get_temp_dir():
+    """Scratch space on the same filesystem, so finished files can be renamed into place"""
+    return os.path.join(current_app.root_path, 'uploads', 'partial')
+
+def blob_path(sha256):
+    return os.path.join(get_blob_dir(), sha256[:2], sha256)
+
+def variant_path(sha256, encoding):
+    return blob_path(sha256) + VARIANT_SUFFIXES[encoding]
+
+def attachment_path(filename):
+    return os.path.join(current_app.root_path, 'uploads', 'challenges', filename)
+
+def save_stream(stream):
+    """Copy a stream to a temporary file while hashing it; returns (path, sha256, size)"""
+    temp_dir = get_temp_dir()
+    os.makedirs(temp_dir, exist_ok=True)
+    path = os.path.join(temp_dir, f'{uuid.uuid4().hex}.tmp')
+    hasher = hashlib.sha256()
+    size = 0
+    
+    try:
+        with open(path, 'wb') as f:
+            for block in iter(lambda: stream.read(COPY_BUFFER_SIZE), b''):
+                hasher.update(block)
+                f.write(block)
+                size += len(block)
+    except BaseException:
+        # Aborted copies (client gone, size limit) leave nothing behind
+        os.remove(path)
+        raise
+    
+    return path, hasher.hexdigest(), size
+
+def hash_file(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+def link_file(source, dest):
+    """Hard link dest to source, copying when the filesystem cannot link"""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    try:
+        os.link(source, dest)
+    except OSError:
+        shutil.copyfile(source, dest)
+
+def add_reference(sha256, size_bytes, source_path=None):
+    """Count one more filename for a blob, creating it from source_path if it is new
+    
+    Returns True when the content was already stored (source_path is then
+    discarded), False when source_path became the blob. Without source_path
+    the blob file must already be in place.
+    """
+    existing = db.session.query(FileBlob).filter_by(sha256=sha256).update(
+        {FileBlob.ref_count: FileBlob.ref_count + 1}, synchronize_session=False
+    )
+    path = blob_path(sha256)
+    
+    if not existing:
+        if source_path is None and not os.path.exists(path):
+            raise ValueError(f'No stored blob for {sha256}')
+        try:
+            with db.session.begin_nested():
+                db.session.add(FileBlob(sha256=sha256, size_bytes=size_bytes, ref_count=1))
+        except IntegrityError:
+            # Another upload stored the same content first
+            return add_reference(sha256, size_bytes, source_path)
+        
+        if source_path is not None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(source_path, path)
+        return False
+    
+    if source_path is not None:
+        if os.path.exists(path):
+            os.remove(source_path)
+        else:
+            # Blob went missing on disk; the new copy restores it
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(source_path, path)
+    return True
+
+def store_file(source_path, extension, sha256=None, size_bytes=None):
+    """Store a finished file under a new attachment filename
+    
+    source_path is consumed. Returns (filename, sha256, size_bytes, deduplicated).
+    """
+    if sha256 is None:
+        sha256 = hash_file(source_path)
+    if size_bytes is None:
+        size_bytes = os.path.getsize(source_path)
+    
+    deduplicated = add_reference(sha256, size_bytes, source_path)
+    return new_filename(sha256, extension), sha256, size_bytes, deduplicated
+
+def link_existing(sha256, size_bytes, extension):
+    """New attachment filename for content that is already stored, or None
+    
+    This is the O(1) path for duplicate uploads: no bytes are transferred,
+    only a hard link and two rows are written.
+    """
+    blob = FileBlob.query.get(sha256)
+    if not blob or blob.size_bytes != size_bytes or not os.path.exists(blob_path(sha256)):
+        return None
+    
+    add_reference(sha256, size_bytes)
+    return new_filename(sha256, extension)
+
+def new_filename(sha256, extension):
+    filename = f"{uuid.uuid4().hex}.{extension}"
+    link_file(blob_path(sha256), attachment_path(filename))
+    db.session.add(StoredFile(filename=filename, sha256=sha256))
+    return filename
+
+def release(filename):
+    """Drop one attachment filename and its reference from the session
+    
+    Nothing is removed from disk, so a failed commit leaves rows and files in
+    step. Returns the paths to pass to remove_released once the caller has
+    committed: the attachment link, then the blob if this was its last
+    reference.
+    """
+    paths = [attachment_path(filename)]
+    
+    stored = StoredFile.query.get(filename)
+    if not stored:
+        # Uploaded before content addressing; the file is its only copy
+        return paths
+    
+    sha256 = stored.sha256
+    db.session.delete(stored)
+    db.session.flush()
+    
+    db.session.query(FileBlob).filter_by(sha256=sha256).update(
+        {FileBlob.ref_count: FileBlob.ref_count - 1}, synchronize_session=False
+    )
+    freed = db.session.query(FileBlob).filter(
+        FileBlob.sha256 == sha256,
+        FileBlob.ref_count <= 0
+    ).delete(synchronize_session=False)
+    
+    if freed:
+        paths.append(blob_path(sha256))
+    return paths
+
+def remove_released(paths):
+    """Delete files returned by release after the commit; blobs take their precompressed variants along"""
+    blob_dir = get_blob_dir()
+    for path in paths:
+        candidates = [path]
+        if path.startswith(blob_dir + os.sep):
+            candidates.extend(path + suffix for suffix in VARIANT_SUFFIXES.values())
+        for candidate in candidates:
+            if os.path.exists(candidate):
+                os.remove(candidate)
+
+def file_hash(filename):
+    return db.session.query(StoredFile.sha256).filter_by(filename=filename).scalar()
@@ -0,0 +1,129 @@
+"""
+Small cache shared across worker processes
+
+Uses Redis when REDIS_URL is set and the redis package is installed,
+otherwise a directory of JSON files (CACHE_DIR) that every worker on the
+host can read. Values must be JSON serializable.
+
+Besides TTL entries it keeps named generation counters, which writers bump
+to invalidate everything cached under an older generation.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+class SharedCache:
+    """TTL key/value cache and generation counters shared by all workers"""
+    
+    def __init__(self, app=None):
+        self.redis = None
+        self.directory = None
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        redis_url = app.config.get('REDIS_URL')
+        if redis_url and redis is not None:
+            self.redis = redis.Redis.from_url(redis_url)
+        
+        self.directory = app.config.get('CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'cyberlab-cache')
+        os.makedirs(self.directory, exist_ok=True)
+        app.extensions['shared_cache'] = self
+    
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+    
+    def get(self, key):
+        """Return the cached value, or None if missing or expired"""
+        try:
+            if self.redis is not None:
+                raw = self.redis.get(key)
+                return json.loads(raw) if raw is not None else None
+            
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+            if entry['expires_at'] < time.time():
+                return None
+            return entry['value']
+        except (OSError, ValueError, KeyError):
+            return None
+        except Exception as e:
+            print(f"Shared cache read failed: {e}")
+            return None
+    
+    def set(self, key, value, ttl):
+        """Store a value for ttl seconds"""
+        try:
+            if self.redis is not None:
+                self.redis.setex(key, int(ttl), json.dumps(value))
+                return
+            
+            # Write to a temp file and rename so readers never see partial data
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'expires_at': time.time() + ttl, 'value': value}, f)
+            os.replace(temp_path, self._path(key))
+        except Exception as e:
+            print(f"Shared cache write failed: {e}")
+    
+    def delete(self, key):
+        try:
+            if self.redis is not None:
+                self.redis.delete(key)
+            else:
+                os.remove(self._path(key))
+        except OSError:
+            pass
+        except Exception as e:
+            print(f"Shared cache delete failed: {e}")
+    
+    def get_generation(self, name):
+        """Current value of a generation counter (0 if never bumped)"""
+        try:
+            if self.redis is not None:
+                return int(self.redis.get(f'generation:{name}') or 0)
+            
+            with open(self._path(f'generation:{name}')) as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+        except Exception as e:
+            print(f"Shared cache read failed: {e}")
+            return 0
+    
+    def bump_generation(self, name):
+        """Atomically increment a generation counter and return the new value"""
+        try:
+            if self.redis is not None:
+                return int(self.redis.incr(f'generation:{name}'))
+            
+            path = self._path(f'generation:{name}')
+            with open(path + '.lock', 'a') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                generation = self.get_generation(name) + 1
+                fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+                with os.fdopen(fd, 'w') as f:
+                    f.write(str(generation))
+                os.replace(temp_path, path)
+                return generation
+        except Exception as e:
+            print(f"Shared cache generation bump failed: {e}")
+            return 0
+
+# Generation advanced whenever submissions change; caches derived from them key on it
+SUBMISSIONS_GENERATION = 'submissions'
+
+shared_cache = SharedCache()
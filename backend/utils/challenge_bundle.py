@@ -0,0 +1,333 @@
+"""
+Challenge bundle import/export
+
+A bundle is a ZIP archive holding challenges.json (the challenge definitions,
+with categories referenced by name) and every attachment under files/.
+Exports are streamed straight from disk; imports validate the whole bundle,
+stream attachments out of the archive and insert everything in one commit.
+"""
+import json
+import os
+import uuid
+import zipfile
+from datetime import datetime
+
+from flask import current_app
+
+from database import db
+from models.challenge import Challenge, ChallengeCategory, ChallengeFile
+from utils.blob_store import blob_path, save_stream, store_file
+from utils.precompress import schedule
+from utils.zip_stream import should_compress, stream_zip
+
+BUNDLE_VERSION = 1
+MANIFEST_NAME = 'challenges.json'
+FILES_PREFIX = 'files/'
+MAX_MANIFEST_BYTES = 16 * 1024 * 1024
+
+# Challenge columns carried in a bundle
+BUNDLE_FIELDS = [
+    'title', 'description', 'scenario', 'instructions', 'questions', 'hints',
+    'challenge_type', 'difficulty', 'author', 'series', 'points', 'time_limit',
+    'operating_system', 'file_attachments', 'suggested_tools', 'docker_image',
+    'environment_url', 'answer_type', 'correct_answer', 'answer_format',
+    'validation_regex', 'is_published', 'is_featured'
+]
+
+REQUIRED_FIELDS = ['title', 'description', 'instructions', 'challenge_type', 'difficulty', 'category']
+CATEGORY_FIELDS = ['name', 'description', 'icon', 'color']
+MAX_INTEGER = 2 ** 31 - 1
+
+class BundleError(ValueError):
+    """Raised when a bundle cannot be imported; errors lists per-challenge problems"""
+    
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or []
+
+class LimitedReader:
+    """File-like wrapper that raises BundleError once more than limit bytes are read"""
+    
+    def __init__(self, source, limit, name):
+        self.source = source
+        self.remaining = limit
+        self.name = name
+    
+    def read(self, size=-1):
+        # Never ask for more than one byte past the limit, so a bomb stops early
+        if size is None or size < 0 or size > self.remaining + 1:
+            size = self.remaining + 1
+        block = self.source.read(size)
+        self.remaining -= len(block)
+        if self.remaining < 0:
+            raise BundleError(f'{self.name} is larger than the upload size limit')
+        return block
+
+def export_bundle(challenges, upload_dir):
+    """Yield a bundle archive for the given challenges as byte chunks"""
+    manifest = []
+    files = []
+    
+    for challenge in challenges:
+        entry = {field: getattr(challenge, field) for field in BUNDLE_FIELDS}
+        entry['slug'] = challenge.slug
+        entry['category'] = {
+            'name': challenge.category.name,
+            'description': challenge.category.description,
+            'icon': challenge.category.icon,
+            'color': challenge.category.color
+        }
+        manifest.append(entry)
+        
+        for attachment in challenge.file_attachments or []:
+            filename = attachment.get('filename')
+            path = os.path.join(upload_dir, filename) if filename else None
+            if path and os.path.isfile(path):
+                files.append((FILES_PREFIX + filename, path, should_compress(filename)))
+    
+    document = {
+        'version': BUNDLE_VERSION,
+        'exported_at': datetime.utcnow().isoformat(),
+        'challenges': manifest
+    }
+    entries = [(MANIFEST_NAME, json.dumps(document, indent=2).encode('utf-8'), True)]
+    entries.extend(files)
+    
+    return stream_zip(entries)
+
+def validate_entry(entry, members, allowed_file, max_bytes):
+    """Return the first problem with a bundle entry, or None if it can be imported
+    
+    members maps archive names to their ZipInfo.
+    """
+    if not isinstance(entry, dict):
+        return 'Entry must be an object'
+    
+    for field in REQUIRED_FIELDS:
+        if not entry.get(field):
+            return f'{field} is required'
+    
+    for field in BUNDLE_FIELDS:
+        if field in entry:
+            problem = column_problem(Challenge.__table__.columns[field], field, entry[field])
+            if problem:
+                return problem
+    
+    category = entry['category']
+    if not isinstance(category, dict) or not isinstance(category.get('name'), str) or not category['name']:
+        return 'category.name is required'
+    for field in CATEGORY_FIELDS:
+        if field in category:
+            problem = column_problem(ChallengeCategory.__table__.columns[field], f'category.{field}', category[field])
+            if problem:
+                return problem
+    
+    questions = entry.get('questions') or []
+    if not isinstance(questions, list):
+        return 'questions must be a list'
+    for i, question in enumerate(questions):
+        if not isinstance(question, dict):
+            return f'Question {i+1} must be an object'
+        if not question.get('question'):
+            return f'Question {i+1} text is required'
+        if not question.get('correct_answer'):
+            return f'Question {i+1} correct answer is required'
+    
+    attachments = entry.get('file_attachments') or []
+    if not isinstance(attachments, list):
+        return 'file_attachments must be a list'
+    for attachment in attachments:
+        if not isinstance(attachment, dict):
+            return 'Each attachment must be an object'
+        filename = attachment.get('filename')
+        if not isinstance(filename, str) or not filename or not allowed_file(filename):
+            return f'Attachment {attachment.get("name") or filename!r} has an invalid filename'
+        if FILES_PREFIX + filename not in members:
+            return f'Attachment {filename} is missing from the bundle'
+        if members[FILES_PREFIX + filename].file_size > max_bytes:
+            return f'Attachment {filename} is larger than the upload size limit'
+    
+    return None
+
+def column_problem(column, name, value):
+    """Return why a manifest value would not fit its database column, or None
+    
+    JSON columns in a bundle (questions, hints, attachments, tools) are lists.
+    """
+    if value is None:
+        return None if column.nullable else f'{name} is required'
+    
+    if isinstance(column.type, db.Boolean):
+        if not isinstance(value, bool):
+            return f'{name} must be true or false'
+    elif isinstance(column.type, db.Integer):
+        # bool is an int subclass, but true/false is not a number
+        if not isinstance(value, int) or isinstance(value, bool) or not 0 <= value <= MAX_INTEGER:
+            return f'{name} must be a whole number between 0 and {MAX_INTEGER}'
+    elif isinstance(column.type, db.JSON):
+        if not isinstance(value, list):
+            return f'{name} must be a list'
+    else:
+        if not isinstance(value, str):
+            return f'{name} must be a string'
+        length = getattr(column.type, 'length', None)
+        if length and len(value) > length:
+            return f'{name} must be at most {length} characters'
+    return None
+
+def resolve_categories(entries):
+    """Map category name to id, creating missing categories in the session"""
+    wanted = {}
+    for entry in entries:
+        wanted.setdefault(entry['category']['name'], entry['category'])
+    
+    existing = ChallengeCategory.query.filter(ChallengeCategory.name.in_(wanted)).all()
+    categories = {category.name: category for category in existing}
+    
+    for name, data in wanted.items():
+        if name not in categories:
+            category = ChallengeCategory(
+                name=name,
+                description=data.get('description', ''),
+                icon=data.get('icon', ''),
+                color=data.get('color', '#3B82F6')
+            )
+            db.session.add(category)
+            categories[name] = category
+    
+    db.session.flush()
+    return {name: category.id for name, category in categories.items()}
+
+def extract_attachment(archive, attachment, upload_dir, max_bytes):
+    """Stream one attachment out of the archive into the blob store under a fresh filename
+    
+    At most max_bytes are decompressed, whatever the archive claims. Returns
+    the attachment entry and the paths to remove if the import is rolled back
+    (the new link, plus the blob when its content was new).
+    """
+    extension = attachment['filename'].rsplit('.', 1)[1].lower()
+    
+    with archive.open(FILES_PREFIX + attachment['filename']) as source:
+        temp_path, sha256, size_bytes = save_stream(LimitedReader(source, max_bytes, attachment['filename']))
+    unique_filename, sha256, size_bytes, deduplicated = store_file(temp_path, extension, sha256, size_bytes)
+    
+    written = [os.path.join(upload_dir, unique_filename)]
+    if not deduplicated:
+        written.append(blob_path(sha256))
+    
+    stored = dict(attachment)
+    stored.update({
+        'id': str(uuid.uuid4()),
+        'filename': unique_filename,
+        'size': f"{round(size_bytes / (1024 * 1024), 2)} MB",
+        'size_bytes': size_bytes,
+        'sha256': sha256,
+        'uploaded_at': datetime.utcnow().isoformat()
+    })
+    if 'url' in stored:
+        stored['url'] = f'/api/files/download/{unique_filename}'
+    
+    return stored, written
+
+def import_bundle(stream, user_id, upload_dir, allowed_file):
+    """Import every challenge in a bundle in a single transaction
+
+    Raises BundleError without touching the database or disk if any entry is
+    invalid. Returns the created challenges.
+    """
+    try:
+        archive = zipfile.ZipFile(stream)
+    except zipfile.BadZipFile:
+        raise BundleError('Bundle is not a valid zip archive')
+    
+    with archive:
+        try:
+            if archive.getinfo(MANIFEST_NAME).file_size > MAX_MANIFEST_BYTES:
+                raise BundleError(f'{MANIFEST_NAME} is too large')
+            with archive.open(MANIFEST_NAME) as manifest:
+                document = json.loads(LimitedReader(manifest, MAX_MANIFEST_BYTES, MANIFEST_NAME).read())
+        except BundleError:
+            raise
+        except KeyError:
+            raise BundleError(f'{MANIFEST_NAME} is missing from the bundle')
+        except ValueError:
+            raise BundleError(f'{MANIFEST_NAME} is not valid JSON')
+        
+        if not isinstance(document, dict) or document.get('version') != BUNDLE_VERSION:
+            raise BundleError(f'Unsupported bundle version, expected {BUNDLE_VERSION}')
+        
+        entries = document.get('challenges')
+        if not isinstance(entries, list) or not entries:
+            raise BundleError('Bundle contains no challenges')
+        
+        # Sizes come from the archive directory; extraction enforces them too.
+        # Each attachment is an upload, so it gets the per-file limit; the
+        # bundle as a whole has its own
+        max_bytes = current_app.config['UPLOAD_MAX_BYTES']
+        members = {info.filename: info for info in archive.infolist()}
+        errors = []
+        for i, entry in enumerate(entries):
+            problem = validate_entry(entry, members, allowed_file, max_bytes)
+            if problem:
+                title = entry.get('title') if isinstance(entry, dict) else None
+                errors.append({'index': i, 'title': title, 'error': problem})
+        if errors:
+            raise BundleError('Bundle validation failed', errors)
+        
+        total_bytes = sum(
+            members[FILES_PREFIX + attachment['filename']].file_size
+            for entry in entries
+            for attachment in entry.get('file_attachments') or []
+        )
+        if total_bytes > current_app.config['BUNDLE_MAX_BYTES']:
+            raise BundleError('Bundle attachments are larger than the bundle size limit')
+        
+        os.makedirs(upload_dir, exist_ok=True)
+        written = []
+        
+        try:
+            category_ids = resolve_categories(entries)
+            slugs = Challenge.create_unique_slugs([entry['title'] for entry in entries])
+            now = datetime.utcnow()
+            
+            challenges = []
+            for entry, slug in zip(entries, slugs):
+                attachments = []
+                for attachment in entry.get('file_attachments') or []:
+                    stored, paths = extract_attachment(archive, attachment, upload_dir, max_bytes)
+                    written.extend(paths)
+                    attachments.append(stored)
+                
+                fields = {field: entry[field] for field in BUNDLE_FIELDS if field in entry}
+                fields.update({
+                    'file_attachments': attachments,
+                    'slug': slug,
+                    'category_id': category_ids[entry['category']['name']],
+                    'created_by': user_id
+                })
+                fields.setdefault('answer_type', 'structured')
+                
+                challenge = Challenge(**fields)
+                if challenge.is_published:
+                    challenge.publish_date = now
+                challenges.append(challenge)
+            
+            db.session.add_all(challenges)
+            db.session.flush()
+            for challenge in challenges:
+                ChallengeFile.sync(challenge)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for path in written:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            raise
+    
+    for challenge in challenges:
+        for attachment in challenge.file_attachments:
+            schedule(attachment['sha256'], attachment['filename'])
+    
+    return challenges
@@ -0,0 +1,83 @@
+"""
+Disk writes and incremental hashing for resumable chunked uploads
+
+Chunks are streamed from the request straight into the partial file at their
+offset. Each worker keeps a SHA-256 object per upload and feeds it while
+writing whenever the chunk continues where that hasher stopped. When a chunk
+lands on another worker, finalize catches the hasher up from disk, so every
+byte is read back at most once per worker instead of the whole file being
+re-hashed at the end.
+"""
+import hashlib
+import os
+import threading
+import time
+
+COPY_BUFFER_SIZE = 64 * 1024
+HASHER_IDLE_SECONDS = 6 * 3600
+
+class ChunkTooLarge(ValueError):
+    """The request body exceeded the per-chunk or remaining-size limit"""
+
+_hashers = {}
+_lock = threading.Lock()
+
+def _get_hasher(upload_id):
+    with _lock:
+        # Forget uploads abandoned long ago so the map cannot grow forever
+        cutoff = time.time() - HASHER_IDLE_SECONDS
+        for stale_id in [key for key, entry in _hashers.items() if entry['touched_at'] < cutoff]:
+            del _hashers[stale_id]
+        
+        entry = _hashers.setdefault(upload_id, {'offset': 0, 'hasher': hashlib.sha256(), 'touched_at': time.time()})
+        entry['touched_at'] = time.time()
+        return entry
+
+def write_chunk(upload_id, path, offset, stream, limit):
+    """Copy stream into path at offset, at most limit bytes; returns bytes written"""
+    entry = _get_hasher(upload_id)
+    # Hash a copy so a rejected chunk leaves the stored state untouched
+    hasher = entry['hasher'].copy() if entry['offset'] == offset else None
+    written = 0
+    
+    mode = 'r+b' if os.path.exists(path) else 'wb'
+    with open(path, mode) as f:
+        f.seek(offset)
+        while True:
+            block = stream.read(COPY_BUFFER_SIZE)
+            if not block:
+                break
+            written += len(block)
+            if written > limit:
+                # Drop whatever this chunk wrote so the offset stays valid
+                f.truncate(offset)
+                raise ChunkTooLarge(f'Chunk exceeds the {limit} byte limit')
+            f.write(block)
+            if hasher is not None:
+                hasher.update(block)
+        f.truncate(offset + written)
+    
+    if hasher is not None:
+        entry['offset'], entry['hasher'] = offset + written, hasher
+    
+    return written
+
+def finish_hash(upload_id, path, size):
+    """Hex SHA-256 of the completed file, reading only bytes this worker has not hashed"""
+    entry = _get_hasher(upload_id)
+    if entry['offset'] > size:
+        entry['offset'], entry['hasher'] = 0, hashlib.sha256()
+    
+    with open(path, 'rb') as f:
+        f.seek(entry['offset'])
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+            entry['hasher'].update(block)
+    entry['offset'] = size
+    
+    digest = entry['hasher'].hexdigest()
+    discard(upload_id)
+    return digest
+
+def discard(upload_id):
+    with _lock:
+        _hashers.pop(upload_id, None)
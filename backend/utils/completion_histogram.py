@@ -0,0 +1,101 @@
+"""
+Streaming completion-time histogram for per-challenge timing statistics
+
+Completion times (in minutes) are counted into a fixed set of log-spaced
+buckets, so recording a solve, merging two histograms and reading a
+percentile all take constant time regardless of how many solves exist.
+"""
+import math
+
+# Bucket 0 holds everything up to MIN_MINUTES, bucket i holds
+# (MIN_MINUTES * GROWTH ** (i - 1), MIN_MINUTES * GROWTH ** i] and the last
+# bucket also absorbs anything slower (48 buckets cover roughly 12 days).
+BUCKET_COUNT = 48
+MIN_MINUTES = 0.5
+GROWTH = 1.25
+
+def bucket_index(minutes):
+    """Return the bucket a completion time falls into"""
+    if minutes <= MIN_MINUTES:
+        return 0
+    index = math.ceil(math.log(minutes / MIN_MINUTES, GROWTH))
+    return min(index, BUCKET_COUNT - 1)
+
+def bucket_bounds(index):
+    """Return the (lower, upper) bounds in minutes of a bucket"""
+    if index == 0:
+        return 0.0, MIN_MINUTES
+    return MIN_MINUTES * GROWTH ** (index - 1), MIN_MINUTES * GROWTH ** index
+
+class CompletionHistogram:
+    """Mergeable fixed-bucket histogram of completion times"""
+
+    def __init__(self, counts=None):
+        self.counts = [0] * BUCKET_COUNT
+        if counts:
+            for index, count in enumerate(counts[:BUCKET_COUNT]):
+                self.counts[index] = int(count or 0)
+
+    @classmethod
+    def from_json(cls, data):
+        """Build a histogram from its persisted form"""
+        return cls(data if isinstance(data, list) else None)
+
+    def to_json(self):
+        """Compact persisted form: bucket counts with trailing zeros trimmed"""
+        counts = list(self.counts)
+        while counts and counts[-1] == 0:
+            counts.pop()
+        return counts
+
+    @property
+    def total(self):
+        return sum(self.counts)
+
+    def add(self, minutes, count=1):
+        """Record a completion time"""
+        if minutes is None or minutes < 0:
+            return
+        self.counts[bucket_index(minutes)] += count
+
+    def merge(self, other):
+        """Add the counts of another histogram into this one"""
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        return self
+
+    def percentile(self, q):
+        """Estimate the completion time at quantile q (0-1)"""
+        total = self.total
+        if total == 0:
+            return None
+
+        target = max(min(q, 1.0), 0.0) * total
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count == 0:
+                continue
+            if cumulative + count >= target:
+                lower, upper = bucket_bounds(index)
+                fraction = (target - cumulative) / count
+                return round(lower + (upper - lower) * fraction, 2)
+            cumulative += count
+
+        return round(bucket_bounds(BUCKET_COUNT - 1)[1], 2)
+
+    def faster_than_percent(self, minutes):
+        """Percentage of recorded completions slower than the given time"""
+        total = self.total
+        if total == 0 or minutes is None:
+            return None
+
+        index = bucket_index(minutes)
+        slower = sum(self.counts[index + 1:])
+
+        # Assume completions are spread evenly within the shared bucket
+        lower, upper = bucket_bounds(index)
+        if upper > lower:
+            position = min(max((minutes - lower) / (upper - lower), 0.0), 1.0)
+            slower += self.counts[index] * (1 - position)
+
+        return round(slower / total * 100, 1)
@@ -0,0 +1,262 @@
+"""
+Per-user download concurrency and bandwidth limits
+
+Every download takes a lease before its first byte. The per-user concurrency
+limit is checked against live leases, and each download is assigned a
+fair-share rate: the per-user rate split across that user's downloads,
+capped by the total budget split evenly across active users, then across
+each user's downloads. One user with ten parallel connections therefore gets
+the same bandwidth as a user with one.
+
+Leases live with the shared cache (one Redis key, or a locked JSON file when
+Redis is not configured) so all workers see them. Downloads the worker sends
+itself are paced by ThrottledBody, which renews the lease and picks up a new
+fair share every second, and release the lease when they end. Offloaded
+downloads (X-Accel-Redirect) get their rate once, via X-Accel-Limit-Rate, and
+a lease sized from the file length at that rate, since the worker does not
+see them finish.
+
+The throttled counter only counts downloads that were actually held back:
+paced bodies that had to sleep, and offloaded downloads whose share was cut
+below what a lone download would get.
+"""
+import json
+import os
+import tempfile
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:
+    WatchError = None
+
+STATE_KEY = 'downloads:state'
+
+# Offloaded downloads without a rate limit are assumed to run at least this fast
+ASSUMED_RATE = 1024 * 1024
+MIN_LEASE_SECONDS = 30
+RENEW_INTERVAL = 1
+
+class DownloadRejected(Exception):
+    """The user already has the maximum number of downloads running"""
+    
+    def __init__(self, retry_after):
+        super().__init__('Too many concurrent downloads')
+        self.retry_after = retry_after
+
+class DownloadLease:
+    def __init__(self, lease_id, user_id, rate):
+        self.id = lease_id
+        self.user_id = user_id
+        self.rate = rate  # bytes per second, None when unlimited
+
+class DownloadLimiter:
+    """Leases, fair-share rates and counters for challenge file downloads"""
+    
+    def __init__(self, app=None):
+        self.max_per_user = 0
+        self.user_rate = 0
+        self.total_rate = 0
+        self.redis = None
+        self.path = None
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        self.max_per_user = app.config.get('DOWNLOAD_MAX_CONCURRENT_PER_USER', 0)
+        self.user_rate = app.config.get('DOWNLOAD_USER_RATE', 0)
+        self.total_rate = app.config.get('DOWNLOAD_TOTAL_RATE', 0)
+        
+        cache = app.extensions['shared_cache']
+        self.redis = cache.redis
+        self.path = os.path.join(cache.directory, 'download-leases.json')
+        app.extensions['download_limiter'] = self
+    
+    @property
+    def enabled(self):
+        return bool(self.max_per_user or self.user_rate or self.total_rate)
+    
+    def _transact(self, update):
+        """Apply update(state) to the shared state atomically and return its result"""
+        if self.redis is not None:
+            while True:
+                with self.redis.pipeline() as pipe:
+                    try:
+                        pipe.watch(STATE_KEY)
+                        raw = pipe.get(STATE_KEY)
+                        state = json.loads(raw) if raw else {}
+                        result = update(state)
+                        pipe.multi()
+                        pipe.set(STATE_KEY, json.dumps(state))
+                        pipe.execute()
+                        return result
+                    except WatchError:
+                        continue
+        
+        with open(self.path + '.lock', 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(self.path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {}
+            
+            result = update(state)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.path)
+            return result
+    
+    @staticmethod
+    def _live_leases(state, now):
+        leases = state.setdefault('leases', {})
+        for lease_id in [key for key, lease in leases.items() if lease['expires'] < now]:
+            del leases[lease_id]
+        return leases
+    
+    def _fair_rate(self, leases, user_id):
+        """Rate for one of user_id's downloads given the current leases"""
+        mine = sum(1 for lease in leases.values() if lease['user'] == user_id) or 1
+        users = len({lease['user'] for lease in leases.values()}) or 1
+        
+        rates = []
+        if self.user_rate:
+            rates.append(self.user_rate / mine)
+        if self.total_rate:
+            rates.append(self.total_rate / users / mine)
+        return max(int(min(rates)), 1) if rates else None
+    
+    def acquire(self, user_id, size_bytes=None):
+        """Start a download; raises DownloadRejected when the user is at the limit
+        
+        size_bytes sizes the lease for downloads the worker will not see end.
+        """
+        def update(state):
+            now = time.time()
+            leases = self._live_leases(state, now)
+            counters = state.setdefault('counters', {})
+            
+            mine = [lease['expires'] for lease in leases.values() if lease['user'] == user_id]
+            if self.max_per_user and len(mine) >= self.max_per_user:
+                counters['rejected'] = counters.get('rejected', 0) + 1
+                return None, max(int(min(mine) - now), 1)
+            
+            lease_id = uuid.uuid4().hex
+            leases[lease_id] = {'user': user_id, 'expires': now + MIN_LEASE_SECONDS}
+            rate = self._fair_rate(leases, user_id)
+            if size_bytes:
+                leases[lease_id]['expires'] = now + max(MIN_LEASE_SECONDS, size_bytes / (rate or ASSUMED_RATE))
+            
+            counters['started'] = counters.get('started', 0) + 1
+            return DownloadLease(lease_id, user_id, rate), None
+        
+        lease, retry_after = self._transact(update)
+        if lease is None:
+            raise DownloadRejected(retry_after)
+        return lease
+    
+    def renew(self, lease):
+        """Keep a running download's lease alive; returns its current fair-share rate"""
+        def update(state):
+            now = time.time()
+            leases = self._live_leases(state, now)
+            leases[lease.id] = {'user': lease.user_id, 'expires': now + MIN_LEASE_SECONDS}
+            return self._fair_rate(leases, lease.user_id)
+        
+        lease.rate = self._transact(update)
+        return lease.rate
+    
+    def release(self, lease, throttled=False):
+        """End a download; throttled counts it as one that had to be slowed down"""
+        def update(state):
+            state.setdefault('leases', {}).pop(lease.id, None)
+            if throttled:
+                counters = state.setdefault('counters', {})
+                counters['throttled'] = counters.get('throttled', 0) + 1
+        
+        self._transact(update)
+    
+    def record_offloaded(self, lease):
+        """Count an offloaded download as throttled when its share is below the uncontended rate
+        
+        The proxy paces these, so the worker never sees whether they would have
+        gone faster; a share cut by other downloads is the best signal it has.
+        """
+        if not lease.rate or lease.rate >= self._fair_rate({}, lease.user_id):
+            return
+        
+        def update(state):
+            counters = state.setdefault('counters', {})
+            counters['throttled'] = counters.get('throttled', 0) + 1
+        
+        self._transact(update)
+    
+    def stats(self):
+        """Limits, active downloads and counters for the admin dashboard"""
+        def update(state):
+            leases = self._live_leases(state, time.time())
+            per_user = {}
+            for lease in leases.values():
+                per_user[lease['user']] = per_user.get(lease['user'], 0) + 1
+            return {
+                'limits': {
+                    'max_concurrent_per_user': self.max_per_user,
+                    'user_rate': self.user_rate,
+                    'total_rate': self.total_rate
+                },
+                'active_downloads': len(leases),
+                'active_users': len(per_user),
+                'busiest_users': sorted(per_user.items(), key=lambda item: -item[1])[:10],
+                'counters': dict(state.get('counters', {}))
+            }
+        
+        return self._transact(update)
+
+class ThrottledBody:
+    """Response iterable that paces a download to its lease's rate and ends the lease on close"""
+    
+    def __init__(self, limiter, lease, body):
+        self.limiter = limiter
+        self.lease = lease
+        self.body = body
+        self.throttled = False
+    
+    def __iter__(self):
+        rate = self.lease.rate
+        window_start = last_renew = time.monotonic()
+        window_sent = 0
+        
+        for chunk in self.body:
+            yield chunk
+            window_sent += len(chunk)
+            now = time.monotonic()
+            
+            if now - last_renew >= RENEW_INTERVAL:
+                last_renew = now
+                new_rate = self.limiter.renew(self.lease)
+                if new_rate != rate:
+                    # Others started or finished; pace from here at the new share
+                    rate, window_start, window_sent = new_rate, now, 0
+            
+            if rate:
+                delay = window_sent / rate - (now - window_start)
+                if delay > 0:
+                    self.throttled = True
+                    time.sleep(delay)
+    
+    def close(self):
+        try:
+            if hasattr(self.body, 'close'):
+                self.body.close()
+        finally:
+            self.limiter.release(self.lease, self.throttled)
+
+download_limiter = DownloadLimiter()
@@ -0,0 +1,104 @@
+"""
+Per-process cache of the users behind JWTs
+
+Most protected routes only need the caller's username, active flag and admin
+flag, so each worker keeps those in a bounded LRU for IDENTITY_CACHE_TTL
+seconds instead of loading the user row on every request. Writes that change
+them call invalidate(user_id), which drops the entry here and bumps the
+shared identities generation; other workers notice the bump within
+GENERATION_CHECK_INTERVAL seconds and clear their cache.
+
+Unknown ids are not cached, so a deleted user's id never shadows a new row.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask_jwt_extended import get_jwt_identity
+
+from database import db
+from models.user import User
+from utils.cache import shared_cache
+
+IDENTITIES_GENERATION = 'identities'
+GENERATION_CHECK_INTERVAL = 1
+
+Identity = namedtuple('Identity', ['id', 'username', 'is_active', 'is_admin'])
+
+class IdentityCache:
+    """TTL/LRU map of user id to Identity, cleared when the shared generation moves"""
+    
+    def __init__(self, app=None):
+        self.ttl = 30
+        self.max_entries = 10000
+        self._entries = OrderedDict()  # user id -> (Identity, expires_at)
+        self._lock = threading.Lock()
+        self._generation = None
+        self._checked_at = 0
+        self._epoch = 0  # Advanced by every removal so in-flight loads are not stored
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        self.ttl = app.config.get('IDENTITY_CACHE_TTL', 30)
+        self.max_entries = app.config.get('IDENTITY_CACHE_SIZE', 10000)
+        app.extensions['identity_cache'] = self
+    
+    def _sync_generation(self):
+        now = time.monotonic()
+        if now - self._checked_at < GENERATION_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        
+        generation = shared_cache.get_generation(IDENTITIES_GENERATION)
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+                self._epoch += 1
+    
+    @staticmethod
+    def _load(user_id):
+        row = db.session.query(
+            User.id, User.username, User.is_active, User.is_admin
+        ).filter(User.id == user_id).first()
+        return Identity(*row) if row else None
+    
+    def get(self, user_id):
+        """Identity for user_id, or None if there is no such user"""
+        if not self.ttl:
+            return self._load(user_id)
+        
+        self._sync_generation()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                return entry[0]
+            epoch = self._epoch
+        
+        identity = self._load(user_id)
+        if identity is None:
+            return None
+        
+        with self._lock:
+            if epoch == self._epoch:
+                self._entries[user_id] = (identity, now + self.ttl)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return identity
+    
+    def invalidate(self, user_id):
+        """Forget a user here and in every other worker; call after the change is committed"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._epoch += 1
+        shared_cache.bump_generation(IDENTITIES_GENERATION)
+
+identity_cache = IdentityCache()
+
+def current_identity():
+    """Identity of the user the request's JWT belongs to, or None"""
+    return identity_cache.get(int(get_jwt_identity()))
@@ -0,0 +1,88 @@
+"""
+Precompressed variants of text attachments
+
+Logs, CSV, JSON, XML, SQL dumps and plain text usually shrink 5-20x. Once such
+an attachment is stored, a background thread writes <blob>.gz and, when the
+optional zstandard package is installed, <blob>.zst next to the blob. Since
+blobs are content-addressed, each distinct file is compressed once no matter
+how many challenges attach it. download_file picks the variant the client
+accepts through negotiate().
+"""
+import gzip
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.blob_store import COPY_BUFFER_SIZE, blob_path, variant_path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_EXTENSIONS = {'log', 'csv', 'json', 'xml', 'sql', 'txt'}
+GZIP_LEVEL = 9
+ZSTD_LEVEL = 19
+
+# Keep a variant only if it saves at least this fraction of the original
+MIN_SAVING = 0.1
+
+# One background compressor per worker process; threads start on first use
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='precompress')
+
+def is_compressible(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+def available_encodings():
+    """Encodings in order of preference (smallest output first)"""
+    return ['zstd', 'gzip'] if zstandard is not None else ['gzip']
+
+def schedule(sha256, filename):
+    """Queue variant generation for a stored attachment if its type is compressible"""
+    if not sha256 or not is_compressible(filename):
+        return None
+    
+    targets = [(encoding, variant_path(sha256, encoding)) for encoding in available_encodings()]
+    return _executor.submit(compress_blob, blob_path(sha256), targets)
+
+def compress_blob(source, targets):
+    """Write each missing variant of source; runs off the request thread"""
+    try:
+        original_size = os.path.getsize(source)
+    except OSError:
+        return
+    
+    for encoding, target in targets:
+        if os.path.exists(target):
+            continue
+        
+        temp_path = f'{target}.{os.getpid()}.tmp'
+        try:
+            with open(source, 'rb') as src, open(temp_path, 'wb') as dest:
+                if encoding == 'zstd':
+                    zstandard.ZstdCompressor(level=ZSTD_LEVEL).copy_stream(src, dest)
+                else:
+                    # mtime=0 makes the output depend on the content only
+                    with gzip.GzipFile(fileobj=dest, mode='wb', compresslevel=GZIP_LEVEL, mtime=0) as gz:
+                        shutil.copyfileobj(src, gz, COPY_BUFFER_SIZE)
+            
+            if os.path.getsize(temp_path) <= original_size * (1 - MIN_SAVING):
+                os.replace(temp_path, target)
+            else:
+                os.remove(temp_path)
+        except Exception as e:
+            print(f"Precompression of {source} ({encoding}) failed: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+def negotiate(sha256, filename, accept_encodings):
+    """(encoding, path) of the best variant the client accepts, or (None, None)"""
+    if not sha256 or not is_compressible(filename):
+        return None, None
+    
+    for encoding in available_encodings():
+        if accept_encodings[encoding] > 0:
+            path = variant_path(sha256, encoding)
+            if os.path.exists(path):
+                return encoding, path
+    return None, None
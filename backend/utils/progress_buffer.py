@@ -0,0 +1,198 @@
+"""
+Write-behind buffer for high-frequency UserProgress updates
+
+Heartbeats and time tracking are merged in memory per (user, challenge) and
+written back periodically as one batched UPDATE, instead of committing on
+every interaction. Pending updates are also flushed when the process exits.
+
+It also remembers which (user, challenge) pairs already have a progress row
+and when each pair last sent a heartbeat, so a heartbeat normally touches
+neither the database nor the disk. Last-beat times live in Redis (with a
+TTL) when it is configured, so every worker sees the same value, and in
+process memory otherwise.
+"""
+import atexit
+import json
+import math
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, update
+
+from database import db
+from utils.cache import shared_cache
+
+# Bounds on the in-memory maps; past them, expired beats are pruned and known pairs forgotten
+MAX_TRACKED_PAIRS = 100000
+# An entry that fails this many flushes on its own is dropped
+MAX_FLUSH_ATTEMPTS = 3
+
+class ProgressWriteBuffer:
+    """Coalesces time-spent and last-accessed updates for periodic bulk writes"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.interval = 30
+        self._pending = {}
+        self._known_rows = set()
+        self._beats = {}  # (user, challenge) -> (last beat, expires at)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('PROGRESS_FLUSH_INTERVAL', 30)
+        app.extensions['progress_buffer'] = self
+        atexit.register(self.shutdown)
+
+    def record(self, user_id, challenge_id, time_spent=0.0, accessed_at=None):
+        """Merge an update into the pending entry for this user and challenge"""
+        if not math.isfinite(time_spent):
+            return
+        accessed_at = accessed_at or datetime.utcnow()
+        key = (user_id, challenge_id)
+
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = {'time_spent': time_spent, 'last_accessed': accessed_at}
+            else:
+                entry['time_spent'] += time_spent
+                entry['last_accessed'] = max(entry['last_accessed'], accessed_at)
+
+        self._ensure_worker()
+
+    def has_progress_row(self, user_id, challenge_id):
+        """Whether this process has already seen the progress row for this pair"""
+        return (user_id, challenge_id) in self._known_rows
+
+    def mark_progress_row(self, user_id, challenge_id):
+        with self._lock:
+            if len(self._known_rows) >= MAX_TRACKED_PAIRS:
+                self._known_rows.clear()
+            self._known_rows.add((user_id, challenge_id))
+
+    def swap_beat(self, user_id, challenge_id, now, ttl):
+        """Store the time of a heartbeat; return the previous one within ttl, or None"""
+        redis = shared_cache.redis
+        if redis is not None:
+            try:
+                pipe = redis.pipeline()
+                pipe.getset(f'heartbeat:{user_id}:{challenge_id}', json.dumps(now))
+                pipe.expire(f'heartbeat:{user_id}:{challenge_id}', int(ttl))
+                previous = pipe.execute()[0]
+                return json.loads(previous) if previous is not None else None
+            except Exception as e:
+                print(f"Heartbeat swap failed: {e}")
+                return None
+
+        key = (user_id, challenge_id)
+        monotonic = time.monotonic()
+        with self._lock:
+            previous = self._beats.get(key)
+            if len(self._beats) >= MAX_TRACKED_PAIRS:
+                self._beats = {k: v for k, v in self._beats.items() if v[1] > monotonic}
+                if len(self._beats) >= MAX_TRACKED_PAIRS:
+                    self._beats.clear()
+            self._beats[key] = (now, monotonic + ttl)
+        if previous is None or previous[1] <= monotonic:
+            return None
+        return previous[0]
+
+    def pending_time_spent(self, user_id, challenge_id):
+        """Time (minutes) recorded for a user and challenge but not yet flushed"""
+        with self._lock:
+            entry = self._pending.get((user_id, challenge_id))
+            return entry['time_spent'] if entry else 0.0
+
+    def flush(self):
+        """Write all pending updates in one batched UPDATE; returns rows written
+
+        If the batch fails, each entry is retried on its own so one bad row
+        cannot hold back the rest. Entries that still fail are queued again and
+        dropped after MAX_FLUSH_ATTEMPTS flushes.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return 0
+
+        table = db.metadata.tables['user_progress']
+        statement = update(table).where(
+            table.c.user_id == bindparam('b_user_id'),
+            table.c.challenge_id == bindparam('b_challenge_id')
+        ).values(
+            time_spent=table.c.time_spent + bindparam('b_time_spent'),
+            last_accessed=bindparam('b_last_accessed')
+        )
+        params = {
+            (user_id, challenge_id): {
+                'b_user_id': user_id,
+                'b_challenge_id': challenge_id,
+                'b_time_spent': entry['time_spent'],
+                'b_last_accessed': entry['last_accessed']
+            } for (user_id, challenge_id), entry in pending.items()
+        }
+
+        failed = {}
+        with self.app.app_context():
+            try:
+                db.session.execute(statement, list(params.values()))
+                db.session.commit()
+                return len(params)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Progress buffer flush failed, retrying rows one by one: {e}")
+
+            for key, row in params.items():
+                try:
+                    db.session.execute(statement, [row])
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    failed[key] = pending[key]
+                    print(f"Progress buffer flush failed for {key}: {e}")
+
+        # Put failed updates back so the next flush retries them
+        with self._lock:
+            for key, entry in failed.items():
+                attempts = entry.get('attempts', 0) + 1
+                if attempts >= MAX_FLUSH_ATTEMPTS:
+                    print(f"Dropping progress update for {key} after {attempts} failed flushes")
+                    continue
+                current = self._pending.get(key)
+                if current is None:
+                    self._pending[key] = dict(entry, attempts=attempts)
+                else:
+                    current['time_spent'] += entry['time_spent']
+                    current['last_accessed'] = max(current['last_accessed'], entry['last_accessed'])
+                    current['attempts'] = max(current.get('attempts', 0), attempts)
+
+        return len(params) - len(failed)
+
+    def shutdown(self):
+        """Stop the flush thread and write anything still pending"""
+        self._stop.set()
+        if self.app is not None:
+            self.flush()
+
+    def _ensure_worker(self):
+        # Started lazily so each forked worker process gets its own thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='progress-buffer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+progress_buffer = ProgressWriteBuffer()
@@ -0,0 +1,73 @@
+"""
+Short-lived signed download URLs for challenge attachments
+
+An authenticated request gets a URL that carries everything needed to serve
+the file: the user it was issued to, the expiry, the content hash and the
+original name. The signature covers all of them, so the signed route checks
+it with no database access and repeated or parallel downloads need no login
+lookup.
+
+FILE_URL_SIGNATURE selects the scheme:
+
+    'hmac'         HMAC-SHA256, verified by the backend
+    'secure-link'  nginx secure_link_md5 format, so nginx can verify and serve
+                   the file itself; the backend accepts the same tokens
+"""
+import base64
+import hashlib
+import hmac
+import time
+from urllib.parse import quote, urlencode
+
+from flask import current_app
+
+SIGNED_ROUTE = '/api/files/signed/'
+
+def _encode(digest):
+    return base64.urlsafe_b64encode(digest).decode('ascii').rstrip('=')
+
+def signature(filename, user_id, expires, sha256, quoted_name):
+    """Token for one URL; quoted_name is the name exactly as it appears in the query string"""
+    secret = current_app.config['FILE_URL_SECRET']
+    
+    if current_app.config['FILE_URL_SIGNATURE'] == 'secure-link':
+        # Matches: secure_link_md5 "$secure_link_expires$uri$arg_uid$arg_h$arg_name <secret>";
+        material = f'{expires}{SIGNED_ROUTE}{filename}{user_id}{sha256}{quoted_name} {secret}'
+        return _encode(hashlib.md5(material.encode('utf-8')).digest())
+    
+    message = '\n'.join([str(expires), filename, str(user_id), sha256, quoted_name])
+    return _encode(hmac.new(secret.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).digest())
+
+def make_url(filename, user_id, sha256, original_name):
+    """Signed URL for a download; returns (url, expires)"""
+    expires = int(time.time()) + current_app.config['FILE_URL_TTL']
+    quoted_name = quote(original_name, safe='')
+    params = {
+        'uid': user_id,
+        'expires': expires,
+        'h': sha256 or '',
+        'sig': signature(filename, user_id, expires, sha256 or '', quoted_name)
+    }
+    
+    # name is appended pre-quoted so the signed and transmitted forms are identical
+    return f'{SIGNED_ROUTE}{filename}?{urlencode(params)}&name={quoted_name}', expires
+
+def verify(filename, args):
+    """Check a signed URL's query arguments; returns (valid, error, status)"""
+    user_id = args.get('uid', '')
+    expires = args.get('expires', '')
+    sha256 = args.get('h', '')
+    name = args.get('name', '')
+    token = args.get('sig', '')
+    
+    if not (user_id.isdigit() and expires.isdigit() and token):
+        return False, 'Invalid download link', 403
+    
+    expected = signature(filename, user_id, int(expires), sha256, quote(name, safe=''))
+    if not hmac.compare_digest(expected, token):
+        return False, 'Invalid download link', 403
+    
+    if int(expires) < time.time():
+        return False, 'Download link has expired', 410
+    
+    return True, None, 200
@@ -0,0 +1,133 @@
+"""
+Line previews of large text attachments
+
+Files are memory-mapped, never read whole. Each file gets a sparse index of
+(line number, byte offset) checkpoints about every INDEX_STRIDE bytes, built
+lazily: a request only extends the index as far as the lines it asks for.
+Counting newlines between checkpoints runs in C on one stride-sized slice at
+a time, so memory stays bounded even for a file with no newlines, and
+a lookup bisects the checkpoints and skips at most one block's worth of lines,
+so a preview from the middle of a multi-gigabyte log costs about the same as
+one from the top once the index reaches it.
+
+Indexes are cached per worker by inode, so every hard link to the same blob
+shares one index, and a changed file (new size or mtime) starts over.
+"""
+import bisect
+import mmap
+import os
+import threading
+from array import array
+from collections import OrderedDict
+
+PREVIEW_EXTENSIONS = {'txt', 'log', 'csv', 'json', 'xml', 'sql', 'html', 'css', 'js'}
+INDEX_STRIDE = 64 * 1024
+MAX_PREVIEW_LINES = 1000
+MAX_LINE_BYTES = 4096
+INDEX_CACHE_SIZE = 64
+BINARY_SNIFF_BYTES = 8192
+
+class NotTextError(ValueError):
+    """The file looks binary, so a line preview makes no sense"""
+
+class LineIndex:
+    """Sparse line-offset index for one file, extended on demand"""
+    
+    def __init__(self, size):
+        self.size = size
+        self.lines = array('q', [0])    # line number (0-based) at each checkpoint
+        self.offsets = array('q', [0])  # byte offset where that line starts
+        self.complete = size == 0
+        self.lock = threading.Lock()
+    
+    @property
+    def total_lines(self):
+        return self.lines[-1] if self.complete else None
+    
+    def extend_to(self, mm, line):
+        """Add checkpoints until one is past line or the file is exhausted"""
+        while not self.complete and self.lines[-1] <= line:
+            start = self.offsets[-1]
+            newline = mm.find(b'\n', min(start + INDEX_STRIDE, self.size) - 1)
+            end = self.size if newline == -1 else newline + 1
+            
+            # A checkpoint can span far more than a stride when lines are
+            # huge, so count in stride-sized slices rather than copying it whole
+            counted = 0
+            for block_start in range(start, end, INDEX_STRIDE):
+                counted += mm[block_start:min(block_start + INDEX_STRIDE, end)].count(b'\n')
+            if end == self.size:
+                # A last line without a trailing newline still counts
+                if self.size and mm[self.size - 1:self.size] != b'\n':
+                    counted += 1
+                self.complete = True
+            self.lines.append(self.lines[-1] + counted)
+            self.offsets.append(end)
+    
+    def seek(self, mm, line):
+        """Byte offset where line (0-based) starts, or None past the end"""
+        with self.lock:
+            self.extend_to(mm, line)
+        
+        if self.complete and line >= self.lines[-1]:
+            return None
+        
+        position = bisect.bisect_right(self.lines, line) - 1
+        offset = self.offsets[position]
+        for _ in range(line - self.lines[position]):
+            offset = mm.find(b'\n', offset) + 1
+        return offset
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def get_index(stat):
+    key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = LineIndex(stat.st_size)
+            while len(_indexes) > INDEX_CACHE_SIZE:
+                _indexes.popitem(last=False)
+        else:
+            _indexes.move_to_end(key)
+        return index
+
+def is_previewable(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in PREVIEW_EXTENSIONS
+
+def preview_lines(path, start=1, count=100):
+    """Lines start..start+count-1 (1-based) of a text file, without reading it whole"""
+    count = max(1, min(count, MAX_PREVIEW_LINES))
+    start = max(1, start)
+    
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        result = {'start': start, 'lines': [], 'truncated_lines': [], 'size_bytes': stat.st_size}
+        if stat.st_size == 0:
+            result.update({'has_more': False, 'total_lines': 0})
+            return result
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if b'\0' in mm[:BINARY_SNIFF_BYTES]:
+                raise NotTextError('File does not look like text')
+            
+            index = get_index(stat)
+            offset = index.seek(mm, start - 1)
+            line_number = start
+            
+            while offset is not None and offset < stat.st_size and len(result['lines']) < count:
+                newline = mm.find(b'\n', offset)
+                end = stat.st_size if newline == -1 else newline
+                if end - offset > MAX_LINE_BYTES:
+                    result['truncated_lines'].append(line_number)
+                    end = offset + MAX_LINE_BYTES
+                
+                result['lines'].append(mm[offset:end].decode('utf-8', errors='replace').rstrip('\r'))
+                offset = stat.st_size if newline == -1 else newline + 1
+                line_number += 1
+            
+            result['has_more'] = offset is not None and offset < stat.st_size
+            result['total_lines'] = index.total_lines
+    
+    return result
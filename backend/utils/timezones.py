@@ -0,0 +1,36 @@
+"""
+Timezone helpers for per-user activity dates
+
+Timestamps are stored as naive UTC datetimes; activity days are bucketed in
+the user's own timezone, falling back to the ACTIVITY_TIMEZONE setting.
+"""
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from flask import current_app
+
+DEFAULT_TIMEZONE = 'UTC'
+
+def is_valid_timezone(name):
+    """Check whether name is a known IANA timezone"""
+    if not name or not isinstance(name, str):
+        return False
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+def get_timezone(name=None):
+    """Resolve a timezone name, falling back to the configured default"""
+    for candidate in (name, current_app.config.get('ACTIVITY_TIMEZONE'), DEFAULT_TIMEZONE):
+        if is_valid_timezone(candidate):
+            return ZoneInfo(candidate)
+    return timezone.utc
+
+def local_date(utc_datetime, tz):
+    """Calendar date of a naive UTC datetime in the given timezone"""
+    return utc_datetime.replace(tzinfo=timezone.utc).astimezone(tz).date()
+
+def local_today(tz):
+    """Today's date in the given timezone"""
+    return local_date(datetime.utcnow(), tz)
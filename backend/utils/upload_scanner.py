@@ -0,0 +1,212 @@
+"""
+Integrity scan of the upload store
+
+One pass over uploads/ with os.scandir, checked against the attachment
+metadata loaded up front:
+
+    challenges/  attachment filenames no challenge references (orphans)
+    blobs/       blobs and variants without a file_blobs row (orphans)
+    partial/     chunks of abandoned or finished uploads, stray temp files
+
+Attachments whose file is gone and blob rows without data are reported as
+missing. Disk usage is summed as entries are visited, counting each inode
+once so hard-linked attachments are not charged twice. Nothing younger than
+the grace period is treated as an orphan, since files are uploaded before
+the challenge that uses them is saved.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from database import db
+from models.challenge import Challenge, ChallengeFile
+from models.upload import FileBlob, StoredFile, UploadSession
+from utils.blob_store import VARIANT_SUFFIXES, get_blob_dir, get_temp_dir, release, remove_released
+from utils.chunked_upload import discard
+
+# Entries listed per category in the report; counts and sizes cover everything
+REPORT_LIMIT = 200
+
+class ScanReport:
+    """Running totals and findings of one scan"""
+    
+    def __init__(self):
+        self.usage = {'challenges': 0, 'blobs': 0, 'variants': 0, 'partial': 0}
+        self.disk_bytes = 0
+        self.seen_inodes = set()
+        self.findings = {}
+        self.reclaimed_bytes = 0
+        self.entries = 0
+    
+    def add_usage(self, area, stat):
+        self.entries += 1
+        self.usage[area] += stat.st_size
+        inode = (stat.st_dev, stat.st_ino)
+        if inode not in self.seen_inodes:
+            self.seen_inodes.add(inode)
+            self.disk_bytes += stat.st_size
+    
+    def add(self, category, item, size_bytes=0):
+        finding = self.findings.setdefault(category, {'count': 0, 'bytes': 0, 'items': []})
+        finding['count'] += 1
+        finding['bytes'] += size_bytes
+        if len(finding['items']) < REPORT_LIMIT:
+            finding['items'].append(item)
+    
+    def to_dict(self, reclaim):
+        usage = dict(self.usage)
+        usage['on_disk'] = self.disk_bytes
+        usage['tracked_blobs'] = int(db.session.query(db.func.coalesce(db.func.sum(FileBlob.size_bytes), 0)).scalar())
+        return {
+            'mode': 'reclaim' if reclaim else 'report',
+            'entries_scanned': self.entries,
+            'usage_bytes': usage,
+            'findings': self.findings,
+            'reclaimed_bytes': self.reclaimed_bytes
+        }
+
+def load_references():
+    """Attachment filenames referenced by any challenge, with their owners"""
+    referenced = {}
+    rows = db.session.query(Challenge.id, Challenge.file_attachments).filter(
+        Challenge.file_attachments.isnot(None)
+    ).yield_per(500)
+    for challenge_id, attachments in rows:
+        for attachment in attachments or []:
+            if isinstance(attachment, dict) and attachment.get('filename'):
+                referenced[attachment['filename']] = (challenge_id, attachment.get('name'))
+    
+    # Indexed rows normally mirror the JSON; include them in case a sync was skipped
+    for challenge_id, filename, name in db.session.query(ChallengeFile.challenge_id, ChallengeFile.filename, ChallengeFile.name):
+        referenced.setdefault(filename, (challenge_id, name))
+    return referenced
+
+def scan_uploads(reclaim=False, grace_seconds=None, progress=None):
+    """Scan (and optionally clean) the upload store; returns the report dict
+    
+    progress, if given, is called with the number of entries visited so far.
+    """
+    if grace_seconds is None:
+        grace_seconds = current_app.config['UPLOAD_ORPHAN_GRACE_HOURS'] * 3600
+    cutoff = time.time() - grace_seconds
+    report = ScanReport()
+    
+    referenced = load_references()
+    # A hard link shares its blob's mtime, so deduplicated uploads are aged by their row
+    stored_at = {filename: created_at for filename, created_at in db.session.query(StoredFile.filename, StoredFile.created_at)}
+    blob_hashes = {sha256 for sha256, in db.session.query(FileBlob.sha256)}
+    sessions = {upload.id: upload for upload in UploadSession.query.filter_by(status='uploading')}
+    stale_before = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    
+    def visited():
+        if progress and report.entries % 500 == 0:
+            progress(report.entries)
+    
+    # Attachment filenames
+    upload_dir = os.path.join(current_app.root_path, 'uploads', 'challenges')
+    present = set()
+    for entry in scan_dir(upload_dir):
+        stat = entry.stat()
+        report.add_usage('challenges', stat)
+        present.add(entry.name)
+        
+        created_at = stored_at.get(entry.name)
+        is_old = created_at < stale_before if created_at else stat.st_mtime < cutoff
+        if entry.name not in referenced and is_old:
+            report.add('orphan_attachments', entry.name, stat.st_size)
+            if reclaim:
+                released = release(entry.name)
+                db.session.commit()
+                freed_blob = released[1] if len(released) > 1 else None
+                if freed_blob:
+                    report.reclaimed_bytes += file_size(freed_blob)
+                    blob_hashes.discard(os.path.basename(freed_blob))
+                elif created_at is None:
+                    report.reclaimed_bytes += stat.st_size
+                remove_released(released)
+        visited()
+    
+    for filename, (challenge_id, name) in referenced.items():
+        if filename not in present:
+            report.add('missing_attachments', {'challenge_id': challenge_id, 'filename': filename, 'name': name})
+    
+    # Content-addressed blobs and their precompressed variants
+    present_blobs = set()
+    for shard in scan_dir(get_blob_dir(), files=False):
+        for entry in scan_dir(shard.path):
+            stat = entry.stat()
+            sha256, variant = split_variant(entry.name)
+            report.add_usage('variants' if variant else 'blobs', stat)
+            
+            if sha256 in blob_hashes:
+                if not variant:
+                    present_blobs.add(sha256)
+            elif stat.st_mtime < cutoff:
+                report.add('orphan_blobs', entry.name, stat.st_size)
+                if reclaim:
+                    os.remove(entry.path)
+                    report.reclaimed_bytes += stat.st_size
+            visited()
+    
+    for sha256 in blob_hashes - present_blobs:
+        report.add('missing_blobs', sha256)
+    
+    # Chunked uploads in progress and temporary files
+    for entry in scan_dir(get_temp_dir()):
+        stat = entry.stat()
+        report.add_usage('partial', stat)
+        
+        upload_id, _, suffix = entry.name.partition('.')
+        upload = sessions.pop(upload_id, None) if suffix == 'part' else None
+        if upload is not None and upload.updated_at >= stale_before:
+            visited()
+            continue
+        
+        if stat.st_mtime < cutoff:
+            report.add('stale_partials', entry.name, stat.st_size)
+            if reclaim:
+                os.remove(entry.path)
+                report.reclaimed_bytes += stat.st_size
+                if upload is not None:
+                    discard(upload.id)
+                    db.session.delete(upload)
+                    db.session.commit()
+        visited()
+    
+    # Sessions left without a partial file can never be finished
+    for upload in sessions.values():
+        if upload.updated_at < stale_before:
+            report.add('stale_partials', f'{upload.id}.part (missing)')
+            if reclaim:
+                discard(upload.id)
+                db.session.delete(upload)
+                db.session.commit()
+    
+    if progress:
+        progress(report.entries)
+    return report.to_dict(reclaim)
+
+def scan_dir(path, files=True):
+    """Directory entries of path (regular files, or subdirectories), nothing if it is absent"""
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False) if files else entry.is_dir(follow_symlinks=False):
+                    yield entry
+    except FileNotFoundError:
+        return
+
+def split_variant(name):
+    """(sha256, encoding) for a blob file name; encoding is None for the blob itself"""
+    for encoding, suffix in VARIANT_SUFFIXES.items():
+        if name.endswith(suffix):
+            return name[:-len(suffix)], encoding
+    return name, None
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
@@ -0,0 +1,192 @@
+"""
+Bulk user provisioning
+
+Rows come from CSV (header row required) or JSON (a list, or {"users": [...]}).
+Every row is validated first, then checked for existing usernames and emails
+with set-based queries. Valid rows are hashed, in the caller's thread or
+process pool if one is given, and inserted in batches, yielding one result per row as
+each batch is committed.
+"""
+import csv
+import io
+import json
+import re
+
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+
+from database import db
+from models.user import User
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+MIN_PASSWORD_LENGTH = 6
+IMPORT_FIELDS = ['username', 'email', 'password', 'first_name', 'last_name', 'bio', 'is_admin']
+TEXT_FIELDS = ['username', 'email', 'password', 'first_name', 'last_name', 'bio']
+LOOKUP_CHUNK_SIZE = 500
+
+def parse_rows(data, fmt):
+    """Parse an uploaded CSV or JSON document into a list of row dicts"""
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    
+    if fmt == 'csv':
+        return [dict(row) for row in csv.DictReader(io.StringIO(data))]
+    
+    if fmt == 'json':
+        document = json.loads(data)
+        rows = document.get('users') if isinstance(document, dict) else document
+        if not isinstance(rows, list):
+            raise ValueError('JSON must be a list of users or {"users": [...]}')
+        return rows
+    
+    raise ValueError(f'Unsupported format: {fmt}')
+
+def detect_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return extension if extension in ('csv', 'json') else None
+
+def parse_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y')
+    return bool(value)
+
+def clean_row(row):
+    """Normalise a raw row and return (values, error)"""
+    if not isinstance(row, dict):
+        return None, 'Row must be an object'
+    
+    values = {}
+    for field in IMPORT_FIELDS:
+        value = row.get(field)
+        values[field] = value.strip() if isinstance(value, str) else value
+    
+    # JSON rows can carry numbers, lists or objects where text is expected
+    for field in TEXT_FIELDS:
+        if values[field] is not None and not isinstance(values[field], str):
+            return values, f'{field} must be a string'
+    
+    for field in ('username', 'email', 'password'):
+        if not values[field]:
+            return values, f'{field} is required'
+    
+    if not EMAIL_PATTERN.match(values['email']):
+        return values, 'Invalid email format'
+    
+    if len(values['password']) < MIN_PASSWORD_LENGTH:
+        return values, f'Password must be at least {MIN_PASSWORD_LENGTH} characters long'
+    
+    values['is_admin'] = parse_bool(values['is_admin'])
+    return values, None
+
+def find_taken(usernames, emails):
+    """Return the usernames and emails that already exist, in a few IN queries"""
+    taken_usernames = set()
+    taken_emails = set()
+    usernames = list(usernames)
+    emails = list(emails)
+    
+    for start in range(0, max(len(usernames), len(emails)), LOOKUP_CHUNK_SIZE):
+        username_chunk = usernames[start:start + LOOKUP_CHUNK_SIZE]
+        email_chunk = emails[start:start + LOOKUP_CHUNK_SIZE]
+        rows = db.session.query(User.username, User.email).filter(
+            db.or_(User.username.in_(username_chunk), User.email.in_(email_chunk))
+        )
+        for username, email in rows:
+            taken_usernames.add(username)
+            taken_emails.add(email)
+    
+    return taken_usernames, taken_emails
+
+def result(index, values, status, error=None, user_id=None):
+    entry = {
+        'row': index + 1,
+        'username': values.get('username') if values else None,
+        'status': status
+    }
+    if error:
+        entry['error'] = error
+    if user_id:
+        entry['id'] = user_id
+    return entry
+
+def import_users(rows, batch_size=200, executor=None):
+    """Create users from rows, yielding a result per row then a {'summary': ...} entry
+    
+    executor, if given, hashes passwords in parallel: the admin endpoint passes
+    a thread pool, the command-line importer a process pool. Without one
+    passwords are hashed inline.
+    """
+    summary = {'total': len(rows), 'created': 0, 'skipped': 0, 'failed': 0}
+    pending = []
+    seen_usernames = set()
+    seen_emails = set()
+    
+    for index, row in enumerate(rows):
+        values, error = clean_row(row)
+        if error:
+            summary['failed'] += 1
+            yield result(index, values, 'error', error)
+            continue
+        
+        # Duplicates within the file itself
+        if values['username'] in seen_usernames or values['email'] in seen_emails:
+            summary['skipped'] += 1
+            yield result(index, values, 'skipped', 'Duplicate username or email in import')
+            continue
+        
+        seen_usernames.add(values['username'])
+        seen_emails.add(values['email'])
+        pending.append((index, values))
+    
+    taken_usernames, taken_emails = find_taken(seen_usernames, seen_emails)
+    to_create = []
+    for index, values in pending:
+        if values['username'] in taken_usernames:
+            summary['skipped'] += 1
+            yield result(index, values, 'skipped', 'Username already taken')
+        elif values['email'] in taken_emails:
+            summary['skipped'] += 1
+            yield result(index, values, 'skipped', 'Email already registered')
+        else:
+            to_create.append((index, values))
+    
+    for start in range(0, len(to_create), batch_size):
+        batch = to_create[start:start + batch_size]
+        passwords = [values['password'] for _, values in batch]
+        if executor is not None:
+            hashes = list(executor.map(generate_password_hash, passwords, chunksize=8))
+        else:
+            hashes = [generate_password_hash(password) for password in passwords]
+        
+        users = []
+        for (index, values), password_hash in zip(batch, hashes):
+            users.append(User(
+                username=values['username'],
+                email=values['email'],
+                password_hash=password_hash,
+                first_name=values['first_name'],
+                last_name=values['last_name'],
+                bio=values['bio'],
+                is_admin=values['is_admin'],
+                is_active=True,
+                is_verified=False
+            ))
+        
+        try:
+            db.session.add_all(users)
+            db.session.flush()
+            user_ids = [user.id for user in users]
+            db.session.commit()
+        except IntegrityError:
+            # Someone created a clashing account since the lookup
+            db.session.rollback()
+            for index, values in batch:
+                summary['failed'] += 1
+                yield result(index, values, 'error', 'Username or email was taken during import')
+            continue
+        
+        for (index, values), user_id in zip(batch, user_ids):
+            summary['created'] += 1
+            yield result(index, values, 'created', user_id=user_id)
+    
+    yield {'summary': summary}
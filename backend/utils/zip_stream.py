@@ -0,0 +1,86 @@
+"""
+Streaming ZIP writer
+
+Builds a ZIP archive as a generator of byte chunks, so it can be sent as a
+response while it is being written. Nothing is spooled to a temp file and
+memory stays bounded by the read chunk size.
+"""
+import time
+import zipfile
+
+CHUNK_SIZE = 64 * 1024
+
+# Formats that are already compressed and gain nothing from deflate
+COMPRESSED_EXTENSIONS = {
+    'zip', 'rar', '7z', 'gz', 'bz2', 'jpg', 'jpeg', 'png', 'gif',
+    'mp3', 'mp4', 'avi', 'mov', 'pcapng', 'docx', 'xlsx', 'pptx'
+}
+
+def should_compress(filename):
+    return filename.rsplit('.', 1)[-1].lower() not in COMPRESSED_EXTENSIONS
+
+def unique_arcname(name, used):
+    """name, or name (2), name (3)... so entries with the same name do not collide"""
+    stem, dot, extension = name.rpartition('.')
+    if not dot:
+        stem, extension = name, ''
+    candidate = name
+    counter = 2
+    while candidate.lower() in used:
+        candidate = f"{stem} ({counter}){dot}{extension}"
+        counter += 1
+    used.add(candidate.lower())
+    return candidate
+
+class _StreamBuffer:
+    """Write-only, unseekable sink that zipfile writes into and we drain"""
+    
+    def __init__(self):
+        self.data = bytearray()
+    
+    def write(self, data):
+        self.data += data
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        data = bytes(self.data)
+        self.data.clear()
+        return data
+
+def stream_zip(entries, chunk_size=CHUNK_SIZE):
+    """Yield a ZIP archive of entries as byte chunks
+
+    entries is an iterable of (arcname, source, compress) where source is
+    either bytes or a path on disk, and compress selects deflate over store.
+    """
+    buffer = _StreamBuffer()
+    
+    # zipfile falls back to data descriptors because the buffer cannot seek
+    with zipfile.ZipFile(buffer, 'w', allowZip64=True) as archive:
+        for arcname, source, compress in entries:
+            if isinstance(source, (bytes, bytearray)):
+                info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+                info.file_size = len(source)
+            else:
+                info = zipfile.ZipInfo.from_file(source, arcname)
+            info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+            
+            with archive.open(info, 'w') as dest:
+                if isinstance(source, (bytes, bytearray)):
+                    dest.write(source)
+                else:
+                    with open(source, 'rb') as f:
+                        for chunk in iter(lambda: f.read(chunk_size), b''):
+                            dest.write(chunk)
+                            data = buffer.drain()
+                            if data:
+                                yield data
+            
+            data = buffer.drain()
+            if data:
+                yield data
+    
+    yield buffer.drain()
@@ -87,8 +87,8 @@ const ChallengeManagementModal = ({ isOpen, onClose, onSuccess }) => {
     }
 
     try {
-      await adminAPI.clearChallengeSubmissions(challenge.id)
-      toast.success(`Successfully cleared ${challenge.total_attempts} submissions`)
+      const response = await adminAPI.clearChallengeSubmissions(challenge.id)
+      toast.success(response.data.message)
       fetchChallenges()
       onSuccess()
     } catch (error) {
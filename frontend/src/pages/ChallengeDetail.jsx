@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
 import { 
   ArrowLeft, 
@@ -23,6 +23,9 @@ import { useAuth } from '../hooks/useAuth'
 import toast from 'react-hot-toast'
 import ChallengeLeaderboard from '../components/ChallengeLeaderboard'
 
+// How often time spent on the page is reported while it is visible
+const HEARTBEAT_INTERVAL_MS = 60000
+
 const ChallengeDetail = () => {
   const { slug } = useParams()
   const navigate = useNavigate()
@@ -37,12 +40,47 @@ const ChallengeDetail = () => {
   const [visibleQuestionHints, setVisibleQuestionHints] = useState({})
   const [submission, setSubmission] = useState(null)
   const [recentSolves, setRecentSolves] = useState([])
+  const lastHeartbeat = useRef(null)
 
   useEffect(() => {
     fetchChallenge()
     fetchRecentSolves()
   }, [slug])
 
+  // Report time spent while the challenge is open in a visible tab
+  useEffect(() => {
+    if (!user || !challenge?.id) return
+
+    const sendHeartbeat = () => {
+      const now = Date.now()
+      const seconds = Math.round((now - lastHeartbeat.current) / 1000)
+      lastHeartbeat.current = now
+      if (seconds > 0) {
+        challengesAPI.sendHeartbeat(challenge.id, seconds).catch(() => {})
+      }
+    }
+
+    const handleVisibilityChange = () => {
+      if (document.visibilityState === 'visible') {
+        lastHeartbeat.current = Date.now()
+      } else {
+        sendHeartbeat()
+      }
+    }
+
+    lastHeartbeat.current = Date.now()
+    const interval = setInterval(() => {
+      if (document.visibilityState === 'visible') sendHeartbeat()
+    }, HEARTBEAT_INTERVAL_MS)
+    document.addEventListener('visibilitychange', handleVisibilityChange)
+
+    return () => {
+      clearInterval(interval)
+      document.removeEventListener('visibilitychange', handleVisibilityChange)
+      if (document.visibilityState === 'visible') sendHeartbeat()
+    }
+  }, [user, challenge?.id])
+
   const fetchChallenge = async () => {
     try {
       setLoading(true)
@@ -192,23 +230,41 @@ const ChallengeDetail = () => {
 
   const handleFileDownload = async (filename, originalName) => {
     try {
-      const response = await filesAPI.downloadFile(filename)
+      // Short-lived signed link; the browser streams the file itself
+      const response = await filesAPI.getDownloadUrl(filename)
+      const link = document.createElement('a')
+      link.href = response.data.url
+      link.download = originalName || filename
+      document.body.appendChild(link)
+      link.click()
+      document.body.removeChild(link)
+      
+      toast.success('Download started')
+    } catch (error) {
+      console.error('Error downloading file:', error)
+      toast.error('Failed to download file')
+    }
+  }
+
+  const handleDownloadAll = async () => {
+    try {
+      const response = await filesAPI.downloadChallengeArchive(challenge.id)
       
       // Create blob and download
-      const blob = new Blob([response.data])
+      const blob = new Blob([response.data], { type: 'application/zip' })
       const url = window.URL.createObjectURL(blob)
       const link = document.createElement('a')
       link.href = url
-      link.download = originalName || filename
+      link.download = `${challenge.slug}-files.zip`
       document.body.appendChild(link)
       link.click()
       document.body.removeChild(link)
       window.URL.revokeObjectURL(url)
       
-      toast.success('File downloaded successfully')
+      toast.success('Files downloaded successfully')
     } catch (error) {
-      console.error('Error downloading file:', error)
-      toast.error('Failed to download file')
+      console.error('Error downloading files:', error)
+      toast.error('Failed to download files')
     }
   }
 
@@ -481,10 +537,21 @@ const ChallengeDetail = () => {
               {/* Challenge Files */}
               {files.length > 0 && (
                 <div className="bg-gray-800 rounded-lg p-6">
-                  <h3 className="text-xl font-bold text-white mb-6 flex items-center">
-                    <FileText className="h-6 w-6 text-blue-400 mr-3" />
-                    Challenge Files
-                  </h3>
+                  <div className="flex items-center justify-between mb-6">
+                    <h3 className="text-xl font-bold text-white flex items-center">
+                      <FileText className="h-6 w-6 text-blue-400 mr-3" />
+                      Challenge Files
+                    </h3>
+                    {files.length > 1 && (
+                      <button
+                        onClick={handleDownloadAll}
+                        className="bg-gray-700 hover:bg-gray-600 text-white px-4 py-2 rounded-lg font-medium text-sm flex items-center transition-colors duration-200"
+                      >
+                        <Download className="h-4 w-4 mr-2" />
+                        Download All (.zip)
+                      </button>
+                    )}
+                  </div>
                   <div className="grid gap-4">
                     {files.map((file, index) => (
                       <div key={index} className="border border-gray-700 rounded-lg p-6 bg-gray-700/30 hover:bg-gray-700/50 transition-colors">
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
 import { useAuth } from '../hooks/useAuth'
-import { progressAPI, challengesAPI } from '../utils/api'
+import { challengesAPI, dashboardAPI } from '../utils/api'
 import { 
   Target, 
   Trophy, 
@@ -30,15 +30,19 @@ const Dashboard = () => {
     try {
       setLoading(true)
       
-      // Fetch user stats and recent progress
-      const [statsResponse, progressResponse, challengesResponse] = await Promise.all([
-        progressAPI.getUserStats(),
-        progressAPI.getMyProgress(),
+      // Fetch user stats and recent progress in one bundle
+      const [bundleResponse, challengesResponse] = await Promise.all([
+        dashboardAPI.bootstrap({
+          parts: 'user_stats,my_progress',
+          progress_page: 1,
+          progress_per_page: 5
+        }),
         challengesAPI.getChallenges({ featured: true, per_page: 6 })
       ])
 
-      setStats(statsResponse.data)
-      setRecentProgress(progressResponse.data.progress.slice(0, 5))
+      const { bundle } = bundleResponse.data
+      setStats(bundle.user_stats.data)
+      setRecentProgress(bundle.my_progress.data.progress)
       setFeaturedChallenges(challengesResponse.data.challenges)
     } catch (error) {
       console.error('Failed to fetch dashboard data:', error)
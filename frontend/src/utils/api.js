@@ -107,6 +107,7 @@ export const challengesAPI = {
   startChallenge: (id) => api.post(`/challenges/${id}/start`),
   submitAnswer: (id, answerData) => api.post(`/challenges/${id}/submit`, answerData),
   getHint: (id) => api.post(`/challenges/${id}/hint`),
+  sendHeartbeat: (id, seconds) => api.post(`/challenges/${id}/heartbeat`, { seconds }),
   getRecentSolves: (id) => api.get(`/challenges/${id}/recent-solves`),
   getChallengeLeaderboard: (id) => api.get(`/challenges/${id}/leaderboard`),
 }
@@ -115,29 +116,57 @@ export const challengesAPI = {
 export const progressAPI = {
   getLeaderboard: (params = {}) => api.get('/progress/leaderboard', { params }),
   getUserStats: () => api.get('/progress/user-stats'),
-  getBookmarks: () => api.get('/progress/bookmarks'),
+  getBookmarks: (params = {}) => api.get('/progress/bookmarks', { params }),
   toggleBookmark: (challengeId) => api.post(`/progress/bookmarks/${challengeId}`),
   updateNotes: (challengeId, notes) => api.put(`/progress/notes/${challengeId}`, { notes }),
-  getMyProgress: () => api.get('/challenges/my-progress'),
+  getMyProgress: (params = {}) => api.get('/challenges/my-progress', { params }),
   getRecentSolves: (challengeId) => api.get(`/challenges/${challengeId}/recent-solves`),
 }
 
+// Dashboard API
+export const dashboardAPI = {
+  // parts: comma-separated subset of profile,user_stats,my_progress,bookmarks,categories
+  bootstrap: (params = {}) => api.get('/dashboard/bootstrap', { params }),
+}
+
 // Admin API
 export const adminAPI = {
   checkSetup: () => api.get('/admin/setup/check'),
   setupAdmin: (adminData) => api.post('/admin/setup', adminData),
-  getDashboard: () => api.get('/admin/dashboard'),
+  getDashboard: (params = {}) => api.get('/admin/dashboard', { params }),
+  getChallengeFunnel: (params = {}) => api.get('/admin/analytics/funnel', { params }),
   createCategory: (categoryData) => api.post('/admin/categories', categoryData),
   createChallenge: (challengeData) => api.post('/admin/challenges', challengeData),
   updateChallenge: (id, challengeData) => api.put(`/admin/challenges/${id}`, challengeData),
   deleteChallenge: (id) => api.delete(`/admin/challenges/${id}`),
   clearChallengeSubmissions: (id) => api.delete(`/admin/challenges/${id}/submissions`),
   getAllChallenges: (params = {}) => api.get('/admin/challenges', { params }),
+  exportChallenges: (params = {}) => api.get('/admin/challenges/export', { params, responseType: 'blob' }),
+  importChallenges: (bundleFile) => {
+    const formData = new FormData();
+    formData.append('bundle', bundleFile);
+    return api.post('/admin/challenges/import', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    });
+  },
   getAllUsers: (params = {}) => api.get('/admin/users', { params }),
+  searchUsers: (params = {}) => api.get('/admin/users/search', { params }),
   toggleUserActive: (userId) => api.post(`/admin/users/${userId}/toggle-active`),
   toggleUserAdmin: (userId) => api.post(`/admin/users/${userId}/toggle-admin`),
   createUser: (userData) => api.post('/admin/users', userData),
+  importUsers: (usersFile) => {
+    const formData = new FormData();
+    formData.append('file', usersFile);
+    return api.post('/admin/users/import', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+      responseType: 'text',
+    });
+  },
   deleteUser: (userId) => api.delete(`/admin/users/${userId}`),
+  getJobs: (params = {}) => api.get('/admin/jobs', { params }),
+  getJob: (jobId) => api.get(`/admin/jobs/${jobId}`),
+  scanUploads: (reclaim = false) => api.post('/admin/uploads/scan', { reclaim }),
+  getDownloadStats: () => api.get('/admin/downloads'),
 }
 
 // Files API
@@ -150,7 +179,20 @@ export const filesAPI = {
   downloadFile: (filename) => api.get(`/files/download/${filename}`, {
     responseType: 'blob',
   }),
-  listFiles: () => api.get('/files/list'),
+  getDownloadUrl: (filename) => api.get(`/files/download-url/${filename}`),
+  previewFile: (filename, params = {}) => api.get(`/files/preview/${filename}`, { params }),
+  downloadChallengeArchive: (challengeId) => api.get(`/files/challenge/${challengeId}/archive`, {
+    responseType: 'blob',
+  }),
+  startUpload: (data) => api.post('/files/uploads', data),
+  getUpload: (uploadId) => api.get(`/files/uploads/${uploadId}`),
+  uploadChunk: (uploadId, offset, chunk) => api.put(`/files/uploads/${uploadId}`, chunk, {
+    params: { offset },
+    headers: { 'Content-Type': 'application/octet-stream' },
+  }),
+  finalizeUpload: (uploadId, data = {}) => api.post(`/files/uploads/${uploadId}/finalize`, data),
+  cancelUpload: (uploadId) => api.delete(`/files/uploads/${uploadId}`),
+  listFiles: (params = {}) => api.get('/files/list', { params }),
   deleteFile: (filename) => api.delete(`/files/delete/${filename}`),
 }
 